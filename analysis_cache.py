@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Постоянный кэш анализов позиций: хэш-таблица в mmap-файле со слотами
+фиксированного размера (офлайн-инструменты: parallel_search, book_builder,
+blunders).
+- Ключ — канонический образ позиции (8 симметрий подошвы, symmetry.canonical):
+  128-битный code хранится в слоте целиком (коллизий нет), индекс слота —
+  Zobrist-ключ канонического образа по таблице mainGPT5ninght
+  (gen_tables.zobrist_keys: тот же ключ, что у TT бота для этой доски).
+- Значение — оценка со стороны хода, глубина, лучший ход (столбец в системе
+  канона, чтобы годился для любого образа).
+- Открытая адресация: PROBE слотов подряд от индекса. Если все заняты,
+  вытесняется наименее ценный (не форсированный и с меньшей глубиной).
+  Форсированный результат (|v| >= WIN_BOUND) годится для любой глубины,
+  остальные — только если глубина записи не меньше запрошенной.
+- Читать могут сколько угодно процессов одновременно (mmap только на
+  чтение, без копирования и блокировок); писатель один — flock(LOCK_EX)
+  на файле, второй писатель получает ошибку. Запись слота не атомарна,
+  поэтому у каждого слота crc32: читатель пропускает недописанный слот.
+- Размер задаётся при создании (--slots, степень двойки), файл не растёт.
+
+Формат: заголовок HEADER (magic, версия, число слотов, размер слота),
+затем слоты SLOT: code_lo, code_hi, value, depth, best, flags, crc32.
+
+Пример:
+  python analysis_cache.py init analysis.cache --slots 1048576
+  python analysis_cache.py stats analysis.cache
+  python analysis_cache.py get analysis.cache --moves "1,1 2,2 1,2"
+  python blunders.py bb.txt --cache analysis.cache
+"""
+
+import argparse
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from arena import EMPTY, parse_moves, replay_moves
+from gen_tables import zobrist_keys
+from symmetry import CELL_PERMS, board_cells, cells_code, move_from_canonical, move_to_canonical
+
+MAGIC = b"C4AC"
+VERSION = 1
+HEADER = struct.Struct("<4sIQI44x")      # 64 байта
+SLOT = struct.Struct("<QQiBBH4x")       # полезная часть слота, за ней crc32
+SLOT_SIZE = SLOT.size + 4               # 32 байта
+CRC = struct.Struct("<I")
+
+DEFAULT_SLOTS = 1 << 20                 # 32 МБ
+PROBE = 8
+NO_MOVE = 255
+F_USED = 1
+WIN_BOUND = 9_000
+MASK64 = (1 << 64) - 1
+
+_PIECE, _STM = zobrist_keys()
+# ключ клетки i = z*16 + y*4 + x для игрока p: _CELL_KEYS[i][p - 1]
+_CELL_KEYS = [_PIECE[i // 16][(i // 4) % 4][i % 4] for i in range(64)]
+
+
+def forced(value):
+    return value >= WIN_BOUND or value <= -WIN_BOUND
+
+
+def canonical_key(board):
+    """(code канона, индекс симметрии t, Zobrist канонического образа)."""
+    cells = board_cells(board)
+    code, t = None, 0
+    for k, perm in enumerate(CELL_PERMS):
+        c = cells_code(cells, perm)
+        if code is None or c < code:
+            code, t = c, k
+    h, stones, i, rest = 0, 0, 0, code
+    while rest:
+        p = rest & 3
+        if p:
+            h ^= _CELL_KEYS[i][p - 1]
+            stones += 1
+        rest >>= 2
+        i += 1
+    if stones & 1:
+        h ^= _STM  # ход второго (P2), как в TT бота
+    return code, t, h
+
+
+class AnalysisCache:
+    """
+    Кэш в mmap-файле. writable=True — единственный писатель (flock), файл
+    создаётся при отсутствии. path="" — анонимная память процесса (без диска).
+    """
+
+    def __init__(self, path="", writable=False, slots=DEFAULT_SLOTS):
+        self.path = path
+        self.writable = writable or not path
+        self._fd = None
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError("slots: нужна степень двойки")
+        if not path:
+            self.slots = slots
+            self._mm = mmap.mmap(-1, HEADER.size + slots * SLOT_SIZE)
+            self._mm[:HEADER.size] = HEADER.pack(MAGIC, VERSION, slots, SLOT_SIZE)
+        else:
+            self._open_file(path, writable, slots)
+        self.mask = self.slots - 1
+        self.hits = self.misses = self.stores = 0
+
+    def _open_file(self, path, writable, slots):
+        if writable:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(self._fd)
+                raise RuntimeError(f"{path}: кэш уже открыт другим писателем")
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, HEADER.size + slots * SLOT_SIZE)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, VERSION, slots, SLOT_SIZE), 0)
+        else:
+            self._fd = os.open(path, os.O_RDONLY)
+        magic, version, n, slot_size = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            os.close(self._fd)
+            raise RuntimeError(f"{path}: не файл кэша анализов версии {VERSION}")
+        self.slots = n
+        self._mm = mmap.mmap(self._fd, HEADER.size + n * SLOT_SIZE,
+                             access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+    # ---------- слоты ----------
+
+    def _read(self, s):
+        """(code, value, depth, best) занятого целого слота или None."""
+        off = HEADER.size + s * SLOT_SIZE
+        mm = self._mm
+        if CRC.unpack_from(mm, off + SLOT.size)[0] != zlib.crc32(mm[off:off + SLOT.size]):
+            return None
+        lo, hi, value, depth, best, flags = SLOT.unpack_from(mm, off)
+        if not flags & F_USED:
+            return None
+        return lo | (hi << 64), value, depth, best
+
+    def _write(self, s, code, value, depth, best):
+        payload = SLOT.pack(code & MASK64, code >> 64, value, depth, best, F_USED)
+        off = HEADER.size + s * SLOT_SIZE
+        self._mm[off:off + SLOT_SIZE] = payload + CRC.pack(zlib.crc32(payload))
+
+    # ---------- API ----------
+
+    def lookup(self, board):
+        """(оценка, глубина, лучший ход для этой доски или None) — без учёта глубины."""
+        code, t, h = canonical_key(board)
+        for k in range(PROBE):
+            e = self._read((h + k) & self.mask)
+            if e is not None and e[0] == code:
+                best = None if e[3] == NO_MOVE else move_from_canonical((e[3] % 4, e[3] // 4), t)
+                return e[1], e[2], best
+        return None
+
+    def get(self, board, depth):
+        """(оценка, лучший ход), если запись годится для глубины depth, иначе None."""
+        e = self.lookup(board)
+        if e is None or (e[1] < depth and not forced(e[0])):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return e[0], e[2]
+
+    def put(self, board, depth, value, best):
+        """Записать анализ (best — ход (x, y) для этой доски или None). True — записано."""
+        if not self.writable:
+            raise RuntimeError("кэш открыт только на чтение")
+        code, t, h = canonical_key(board)
+        if best is None:
+            cbest = NO_MOVE
+        else:
+            x, y = move_to_canonical(best, t)
+            cbest = y * 4 + x
+        depth = min(depth, 255)
+        rank = (forced(value), depth)
+        victim, victim_rank = None, None
+        for k in range(PROBE):
+            s = (h + k) & self.mask
+            e = self._read(s)
+            if e is None:
+                if victim_rank is None or victim_rank > (False, -1):
+                    victim, victim_rank = s, (False, -1)
+                continue
+            if e[0] == code:
+                # та же позиция: не затирать форсированный или более глубокий анализ
+                if (forced(e[1]), e[2]) > rank:
+                    return False
+                victim = s
+                break
+            r = (forced(e[1]), e[2])
+            if victim_rank is None or r < victim_rank:
+                victim, victim_rank = s, r
+        else:
+            if victim_rank > rank:
+                return False
+        self._write(victim, code, value, depth, cbest)
+        self.stores += 1
+        return True
+
+    def stats(self):
+        """Занятые слоты, из них форсированных, гистограмма глубин."""
+        used = n_forced = 0
+        depths = {}
+        for s in range(self.slots):
+            e = self._read(s)
+            if e is None:
+                continue
+            used += 1
+            n_forced += forced(e[1])
+            depths[e[2]] = depths.get(e[2], 0) + 1
+        return {"slots": self.slots, "used": used, "forced": n_forced, "depths": dict(sorted(depths.items()))}
+
+    def flush(self):
+        if self.writable and self.path:
+            self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self.flush()
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)  # снимает и flock
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Кэш анализов позиций в mmap-файле")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    i = sub.add_parser("init", help="Создать пустой кэш")
+    i.add_argument("path")
+    i.add_argument("--slots", type=int, default=DEFAULT_SLOTS, help="Число слотов (степень двойки)")
+    s = sub.add_parser("stats", help="Заполненность кэша")
+    s.add_argument("path")
+    g = sub.add_parser("get", help="Запись для позиции")
+    g.add_argument("path")
+    g.add_argument("--moves", default="", help='Ходы с пустой доски: "x,y x,y ..."')
+    args = ap.parse_args()
+
+    if args.cmd == "init":
+        if os.path.exists(args.path):
+            print(f"{args.path} уже существует")
+            return 1
+        with AnalysisCache(args.path, writable=True, slots=args.slots) as c:
+            print(f"{args.path}: {c.slots} слотов × {SLOT_SIZE} байт")
+        return 0
+
+    with AnalysisCache(args.path) as c:
+        if args.cmd == "stats":
+            st = c.stats()
+            print(f"занято {st['used']} / {st['slots']} ({st['used'] / st['slots']:.1%}), "
+                  f"форсированных {st['forced']}, по глубинам {st['depths']}")
+            return 0
+        board, player, w = replay_moves(parse_moves(args.moves))
+        if w != EMPTY:
+            print(f"Позиция уже выиграна игроком P{w}")
+            return 1
+        e = c.lookup(board)
+        if e is None:
+            print("нет в кэше")
+            return 1
+        print(f"ход P{player}: оценка {e[0]}, глубина {e[1]}, лучший {e[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
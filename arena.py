@@ -12,15 +12,26 @@
 - --debug: выводит каждый ход (кто, (x,y,z), причина, время), итог по форс-ходам.
 - Исправление для сабпроцесса: рабочая директория воркера = директория файла бота
   (чтобы относительные импорты/файлы у бота работали одинаково).
+- --anytime: бот может публиковать лучший ход после каждой итерации
+  (атрибут on_best_move, его ставит воркер; сообщения идут через ту же
+  очередь). По таймауту играется последний опубликованный ход с причиной
+  "timeout_best_so_far" вместо форс-хода; в --record — счётчик best_so_far.
+- --fork-server: на бота один шаблонный процесс (импорт и MyAI() один раз),
+  ход считает fork-ребёнок шаблона — изоляция хода сохраняется, а spawn и
+  импорт не повторяются. По таймауту ребёнок получает SIGKILL.
 """
 
 import argparse
 import importlib.util
+import inspect
+import json
 import os
+import queue
+import signal
 import time
 import traceback
 from copy import deepcopy
-from multiprocessing import Process, Queue, set_start_method
+from multiprocessing import Pipe, Process, Queue, set_start_method
 
 SIZE = 4
 EMPTY, P1, P2 = 0, 1, 2
@@ -48,17 +59,17 @@ def generate_all_lines():
                     if in_bounds(x2, y2, z2):
                         line = [(x + i*dx, y + i*dy, z + i*dz) for i in range(SIZE)]
                         lines.append(line)
-    seen = set()
-    unique = []
-    for line in lines:
-        key = tuple(line)
-        if key not in seen:
-            seen.add(key)
-            unique.append(line)
-    return unique
+    # среди DIRECTIONS нет противоположных, так что каждая линия найдена ровно один раз
+    return lines
 
 ALL_LINES = generate_all_lines()
 
+# линии через клетку: CELL_LINES[z][y][x] (4..7 линий вместо 76)
+CELL_LINES = [[[[] for _ in range(SIZE)] for _ in range(SIZE)] for _ in range(SIZE)]
+for _line in ALL_LINES:
+    for (_x, _y, _z) in _line:
+        CELL_LINES[_z][_y][_x].append(_line)
+
 def check_winner(board):
     for line in ALL_LINES:
         v = board[line[0][2]][line[0][1]][line[0][0]]
@@ -71,6 +82,23 @@ def check_winner(board):
             return v
     return EMPTY
 
+def check_winner_at(board, placed):
+    """
+    Победитель по линиям через только что занятую клетку placed = (x, y, z).
+    Если до хода победителя не было, результат совпадает с check_winner(board).
+    """
+    x, y, z = placed
+    v = board[z][y][x]
+    if v == EMPTY:
+        return EMPTY
+    for line in CELL_LINES[z][y][x]:
+        for (lx, ly, lz) in line:
+            if board[lz][ly][lx] != v:
+                break
+        else:
+            return v
+    return EMPTY
+
 def column_height(board, x, y):
     for z in range(SIZE):
         if board[z][y][x] == EMPTY:
@@ -110,6 +138,32 @@ def apply_move(board, player, move):
     board[z][y][x] = player
     return (x, y, z), reason
 
+def new_board():
+    return [[[EMPTY for _ in range(SIZE)] for _ in range(SIZE)] for _ in range(SIZE)]
+
+def replay_moves(moves):
+    """Проиграть последовательность столбцов (x, y) с пустой доски.
+    Возвращает (board, player_to_move, winner)."""
+    board = new_board()
+    current = P1
+    for mv in moves:
+        placed, reason = apply_move(board, current, tuple(mv))
+        if placed is None or reason is not None:
+            raise ValueError(f"illegal move {mv!r} in replay")
+        w = check_winner_at(board, placed)
+        current = P2 if current == P1 else P1
+        if w != EMPTY:
+            return board, current, w
+    return board, current, EMPTY
+
+def parse_moves(text):
+    """'1,1 2,2 0,3' → [(1, 1), (2, 2), (0, 3)]"""
+    out = []
+    for tok in text.replace(";", " ").split():
+        x, y = tok.split(",")
+        out.append((int(x), int(y)))
+    return out
+
 # === worker helpers (pickle-safe) ===
 def _load_bot_callable(bot_path):
     bot_path = os.path.abspath(bot_path)
@@ -132,7 +186,19 @@ def _load_bot_callable(bot_path):
                 pass
     raise RuntimeError(f"{bot_path}: no callable get_move(board) found")
 
-def _worker_get_move(bot_path, board, q):
+def call_get_move(get_move_callable, board, player, last_move):
+    """Боты сервера: get_move(board, player, last_move); старый формат README: get_move(board)."""
+    try:
+        params = inspect.signature(get_move_callable).parameters.values()
+        positional = [p for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+        varargs = any(p.kind == p.VAR_POSITIONAL for p in params)
+    except (TypeError, ValueError):
+        positional, varargs = [None, None, None], True
+    if varargs or len(positional) >= 3:
+        return get_move_callable(board, player, last_move)
+    return get_move_callable(board)
+
+def _worker_get_move(bot_path, board, player, last_move, q, anytime=False):
     try:
         # Сделаем рабочей директорией папку бота (для относительных импортов/файлов)
         bot_abs = os.path.abspath(bot_path)
@@ -143,14 +209,35 @@ def _worker_get_move(bot_path, board, q):
                 os.sys.path.insert(0, bot_dir)
 
         get_move_callable = _load_bot_callable(bot_abs)
-        mv = get_move_callable(deepcopy(board))
+        if anytime:
+            # anytime-протокол: бот с атрибутом on_best_move публикует лучший ход после каждой итерации
+            inst = getattr(get_move_callable, "__self__", None)
+            if inst is not None:
+                inst.on_best_move = lambda mv: q.put(("best", mv))
+        mv = call_get_move(get_move_callable, deepcopy(board), player, last_move)
         q.put(("ok", mv))
     except Exception as e:
         q.put(("error", f"exception: {e}\n{traceback.format_exc()}"))
 
-def timed_get_move(bot_path, board, timeout_sec=10.0):
+def _drain_queue(q):
+    """Все сообщения воркера; после terminate хвост может быть оборван — его пропускаем."""
+    msgs = []
+    while True:
+        try:
+            msgs.append(q.get_nowait())
+        except queue.Empty:
+            break
+        except Exception:
+            break
+    return msgs
+
+def timed_get_move(bot_path, board, timeout_sec=10.0, player=P1, last_move=(None, None, None), anytime=False):
+    """
+    (ok, ход | причина, время). С anytime=True по таймауту берётся последний
+    опубликованный ботом ход: (False, ("timeout_best_so_far", ход), время).
+    """
     q = Queue()
-    p = Process(target=_worker_get_move, args=(bot_path, board, q))
+    p = Process(target=_worker_get_move, args=(bot_path, board, player, last_move, q, anytime))
     start = time.perf_counter()
     p.start()
     p.join(timeout=timeout_sec)
@@ -158,17 +245,213 @@ def timed_get_move(bot_path, board, timeout_sec=10.0):
     if p.is_alive():
         p.terminate()
         p.join(0.1)
+        best = [payload for status, payload in _drain_queue(q) if status == "best"]
+        if best:
+            return False, ("timeout_best_so_far", best[-1]), elapsed
         return False, "timeout", elapsed
-    if q.empty():
+    msgs = [m for m in _drain_queue(q) if m[0] != "best"]
+    if not msgs:
         return False, "no_result", elapsed
-    status, payload = q.get()
+    status, payload = msgs[-1]
     if status == "ok":
         return True, payload, elapsed
     else:
         return False, payload, elapsed
 
-def play_game(botA_path, botB_path, first_player=1, per_move_sec=10.0, max_plies=SIZE*SIZE*SIZE, debug=False):
-    board = [[[EMPTY for _ in range(SIZE)] for _ in range(SIZE)] for _ in range(SIZE)]
+# === fork-server: шаблонный процесс на бота, fork на каждый ход (Linux) ===
+def _fork_template(bot_path, cmd_r, res_w):
+    """
+    Шаблон: один раз импортирует бота и создаёт MyAI, затем на каждый ход
+    делает fork — ребёнок считает ход на копии (copy-on-write) и умирает,
+    так что изоляция та же, что у процесса на ход, но без spawn и импорта.
+    Сообщения в res_w: (статус, seq, данные); статусы ready/error/pid/best/ok.
+    """
+    try:
+        bot_abs = os.path.abspath(bot_path)
+        bot_dir = os.path.dirname(bot_abs)
+        if bot_dir:
+            os.chdir(bot_dir)
+            if bot_dir not in os.sys.path:
+                os.sys.path.insert(0, bot_dir)
+        get_move_callable = _load_bot_callable(bot_abs)
+    except Exception as e:
+        res_w.send(("error", 0, f"exception: {e}\n{traceback.format_exc()}"))
+        return
+    inst = getattr(get_move_callable, "__self__", None)
+    # своя группа процессов: ForkServer убивает шаблон вместе с ребёнком (killpg)
+    os.setpgid(0, 0)
+    res_w.send(("ready", 0, None))
+    while True:
+        try:
+            msg = cmd_r.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        seq, board, player, last_move, anytime = msg
+        pid = os.fork()
+        if pid == 0:
+            try:
+                if anytime and inst is not None:
+                    inst.on_best_move = lambda mv: res_w.send(("best", seq, mv))
+                mv = call_get_move(get_move_callable, board, player, last_move)
+                res_w.send(("ok", seq, mv))
+            except Exception as e:
+                res_w.send(("error", seq, f"exception: {e}\n{traceback.format_exc()}"))
+            finally:
+                os._exit(0)
+        res_w.send(("pid", seq, pid))
+        os.waitpid(pid, 0)
+
+class ForkServer:
+    """
+    Ход в свежем процессе без повторного импорта: get_move() возвращает то же,
+    что timed_get_move. По таймауту ребёнок убивается SIGKILL; его запоздалые
+    сообщения отбрасываются по номеру хода seq. Каналы — однонаправленные
+    os.pipe (запись маленького сообщения атомарна, даже если писателя убили).
+    Если pid ребёнка так и не пришёл, шаблон убивается вместе с ребёнком и
+    запускается заново; умерший шаблон (EOF) помечается alive = False,
+    и fork_server_for создаёт новый.
+    """
+
+    def __init__(self, bot_path):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("fork-server needs os.fork (Linux/macOS)")
+        self.bot_path = bot_path
+        self._seq = 0
+        self._start()
+
+    def _start(self):
+        cmd_r, self._cmd_w = Pipe(duplex=False)
+        self._res_r, res_w = Pipe(duplex=False)
+        self._proc = Process(target=_fork_template, args=(self.bot_path, cmd_r, res_w), daemon=True)
+        self._proc.start()
+        cmd_r.close()
+        res_w.close()
+        self._error = None
+        self.alive = True
+        try:
+            status, _seq, payload = self._res_r.recv()
+        except EOFError:
+            status, payload = "error", "no_result"
+        if status != "ready":
+            self._error = payload
+
+    def _kill(self):
+        """Убить шаблон и его ребёнка (группа процессов шаблона), закрыть каналы."""
+        try:
+            os.killpg(self._proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self._proc.kill()
+        self._proc.join(1.0)
+        self._cmd_w.close()
+        self._res_r.close()
+
+    def _died(self, start):
+        self._kill()
+        self.alive = False
+        self._error = "no_result"
+        return False, "no_result", time.perf_counter() - start
+
+    def get_move(self, board, player, last_move, timeout_sec=10.0, anytime=False):
+        if self._error is not None:
+            return False, self._error, 0.0
+        self._seq += 1
+        seq = self._seq
+        start = time.perf_counter()
+        try:
+            self._cmd_w.send((seq, board, player, last_move, anytime))
+        except (BrokenPipeError, OSError):
+            return self._died(start)
+        deadline = start + timeout_sec
+        pid = None
+        best = None
+        while True:
+            left = deadline - time.perf_counter()
+            if left <= 0 or not self._res_r.poll(left):
+                break
+            try:
+                status, s, payload = self._res_r.recv()
+            except EOFError:
+                return self._died(start)
+            if s != seq:
+                continue  # хвост прошлого (убитого) хода
+            if status == "pid":
+                pid = payload
+            elif status == "best":
+                best = payload
+            else:
+                return status == "ok", payload, time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        # таймаут: pid приходит сразу после fork, но мог ещё не дойти
+        dead = False
+        while pid is None and self._res_r.poll(1.0):
+            try:
+                status, s, payload = self._res_r.recv()
+            except EOFError:
+                dead = True
+                break
+            if s == seq and status == "pid":
+                pid = payload
+            elif s == seq and status == "best":
+                best = payload
+        if pid is not None:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        elif dead:
+            self._died(start)
+        else:
+            # ребёнка не убить по pid, а шаблон ждёт его в waitpid — следующий ход
+            # платил бы за него: перезапускаем шаблон вместе с ребёнком
+            self._kill()
+            self._start()
+        if anytime and best is not None:
+            return False, ("timeout_best_so_far", best), elapsed
+        return False, "timeout", elapsed
+
+    def close(self):
+        if not self.alive:
+            return
+        try:
+            self._cmd_w.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self._proc.join(1.0)
+        if self._proc.is_alive():
+            self._proc.kill()
+            self._proc.join(0.1)
+        self._cmd_w.close()
+        self._res_r.close()
+
+# шаблоны живут всю сессию (между партиями): bot_path → ForkServer
+_FORK_SERVERS = {}
+
+def fork_server_for(bot_path):
+    path = os.path.abspath(bot_path)
+    srv = _FORK_SERVERS.get(path)
+    if srv is None or not srv.alive:
+        # умерший шаблон (EOF) уже убит и закрыт — заменяем новым
+        srv = _FORK_SERVERS[path] = ForkServer(path)
+    return srv
+
+def close_fork_servers():
+    while _FORK_SERVERS:
+        _FORK_SERVERS.popitem()[1].close()
+
+def play_game(botA_path, botB_path, first_player=1, per_move_sec=10.0, max_plies=SIZE*SIZE*SIZE, debug=False,
+              moves_out=None, opening=None, anytime=False, events_out=None, fork_server=False):
+    """
+    moves_out — необязательный список, куда дописываются сыгранные (x, y).
+    opening — ходы (x, y), которые ставятся до партии (по очереди с P1); в moves_out тоже попадают.
+    anytime — по таймауту играть последний опубликованный ботом ход (не форс-ход);
+    events_out — список, куда пишутся (ход №, игрок, причина) всех ходов не «ok».
+    fork_server — ход в fork от шаблонного процесса бота (fork_server_for), а не spawn + импорт;
+    шаблоны переиспользуются между партиями, закрывает их close_fork_servers().
+    """
+    board = new_board()
     if first_player == 1:
         Pmap = {P1: botA_path, P2: botB_path}
         names = {P1: os.path.basename(botA_path), P2: os.path.basename(botB_path)}
@@ -178,6 +461,16 @@ def play_game(botA_path, botB_path, first_player=1, per_move_sec=10.0, max_plies
 
     current = P1
     plies = 0
+    last_move = (None, None, None)
+    for mv in opening or ():
+        placed, invalid_reason = apply_move(board, current, tuple(mv))
+        if placed is None or invalid_reason is not None:
+            raise ValueError(f"opening move {mv}: {invalid_reason}")
+        plies += 1
+        last_move = placed
+        if moves_out is not None:
+            moves_out.append((placed[0], placed[1]))
+        current = P2 if current == P1 else P1
     time_p1 = 0.0
     time_p2 = 0.0
     forced_p1 = 0
@@ -185,14 +478,20 @@ def play_game(botA_path, botB_path, first_player=1, per_move_sec=10.0, max_plies
 
     while plies < max_plies:
         bot_path = Pmap[current]
-        ok, result, elapsed = timed_get_move(bot_path, board, per_move_sec)
+        if fork_server:
+            ok, result, elapsed = fork_server_for(bot_path).get_move(board, current, last_move, per_move_sec, anytime)
+        else:
+            ok, result, elapsed = timed_get_move(bot_path, board, per_move_sec, current, last_move, anytime)
         if current == P1:
             time_p1 += elapsed
         else:
             time_p2 += elapsed
 
         reason = None
-        if not ok:
+        if not ok and isinstance(result, tuple):
+            # превышение лимита, но ход — лучший из опубликованных ботом
+            reason, move = result
+        elif not ok:
             reason = f"forced_{result}"
             if current == P1: forced_p1 += 1
             else: forced_p2 += 1
@@ -215,11 +514,16 @@ def play_game(botA_path, botB_path, first_player=1, per_move_sec=10.0, max_plies
             return 0, plies, reason or "full_draw", time_p1, time_p2, forced_p1, forced_p2
 
         plies += 1
+        last_move = placed
+        if moves_out is not None:
+            moves_out.append((placed[0], placed[1]))
+        if events_out is not None and reason is not None:
+            events_out.append((plies, current, reason))
         if debug:
             x, y, z = placed
             print(f"[DEBUG] Ход {plies}: P{current} {names[current]} → ({x},{y},{z}); {reason or 'ok'}; t={elapsed:.3f}s")
 
-        winner = check_winner(board)
+        winner = check_winner_at(board, placed)
         if winner != EMPTY:
             if debug:
                 print(f"[DEBUG] Победа: P{winner} {names[winner]} на ходу {plies}")
@@ -231,6 +535,20 @@ def play_game(botA_path, botB_path, first_player=1, per_move_sec=10.0, max_plies
         print("[DEBUG] max_plies_reached")
     return 0, plies, "max_plies_reached", time_p1, time_p2, forced_p1, forced_p2
 
+def game_record(black, white, moves, winner, reason, per_move, times, forced):
+    """Одна партия в формате JSONL-записи (его же читают bench/tune/blunders)."""
+    return {
+        "black": black,
+        "white": white,
+        "moves": [list(m) for m in moves],
+        "winner": winner,
+        "plies": len(moves),
+        "reason": reason,
+        "per_move": per_move,
+        "time": list(times),
+        "forced": list(forced),
+    }
+
 def main():
     try:
         set_start_method("spawn")
@@ -242,6 +560,11 @@ def main():
     ap.add_argument("botB", help="Путь ко второму боту .py")
     ap.add_argument("--per-move", type=float, default=10.0, help="Секунд на ход (по умолчанию 10.0)")
     ap.add_argument("--debug", action="store_true", help="Подробный вывод по каждому ходу")
+    ap.add_argument("--record", default="", help="Дописать партии в JSONL (ходы, победитель, время)")
+    ap.add_argument("--fork-server", action="store_true",
+                    help="Шаблонный процесс на бота и fork на каждый ход (Linux): без spawn и повторного импорта")
+    ap.add_argument("--anytime", action="store_true",
+                    help="По таймауту играть последний опубликованный ботом ход (timeout_best_so_far), а не форс-ход")
     args = ap.parse_args()
 
     botA_path = os.path.abspath(args.botA)
@@ -249,8 +572,26 @@ def main():
     nameA = os.path.basename(botA_path)
     nameB = os.path.basename(botB_path)
 
-    w1, p1, _r1, t1_p1, t1_p2, f1_p1, f1_p2 = play_game(botA_path, botB_path, first_player=1, per_move_sec=args.per_move, debug=args.debug)
-    w2, p2, _r2, t2_p1, t2_p2, f2_p1, f2_p2 = play_game(botA_path, botB_path, first_player=2, per_move_sec=args.per_move, debug=args.debug)
+    moves1, moves2 = [], []
+    events1, events2 = [], []
+    w1, p1, _r1, t1_p1, t1_p2, f1_p1, f1_p2 = play_game(botA_path, botB_path, first_player=1, per_move_sec=args.per_move, debug=args.debug, moves_out=moves1,
+                                                        anytime=args.anytime, events_out=events1, fork_server=args.fork_server)
+    w2, p2, _r2, t2_p1, t2_p2, f2_p1, f2_p2 = play_game(botA_path, botB_path, first_player=2, per_move_sec=args.per_move, debug=args.debug, moves_out=moves2,
+                                                        anytime=args.anytime, events_out=events2, fork_server=args.fork_server)
+    close_fork_servers()
+
+    def best_so_far(events):
+        return [sum(1 for _n, pl, r in events if pl == side and r.startswith("timeout_best_so_far")) for side in (P1, P2)]
+
+    if args.record:
+        rec1 = game_record(nameA, nameB, moves1, w1, _r1, args.per_move, (t1_p1, t1_p2), (f1_p1, f1_p2))
+        rec2 = game_record(nameB, nameA, moves2, w2, _r2, args.per_move, (t2_p1, t2_p2), (f2_p1, f2_p2))
+        if args.anytime:
+            rec1["best_so_far"] = best_so_far(events1)
+            rec2["best_so_far"] = best_so_far(events2)
+        with open(args.record, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec1) + "\n")
+            f.write(json.dumps(rec2) + "\n")
 
     def winner_name(game_idx, w):
         if w == 0:
@@ -267,6 +608,11 @@ def main():
     if args.debug:
         print(f"[DEBUG] Игра 1: forced P1={f1_p1}, P2={f1_p2}")
         print(f"[DEBUG] Игра 2: forced P1={f2_p1}, P2={f2_p2}")
+    if args.anytime:
+        # превышения лимита видны и без --debug: ход бота сыгран, но лимит нарушен
+        b1, b2 = best_so_far(events1), best_so_far(events2)
+        if any(b1) or any(b2):
+            print(f"Таймауты с ходом best-so-far: игра 1 P1={b1[0]}, P2={b1[1]}; игра 2 P1={b2[0]}, P2={b2[1]}")
 
     a_wins = (1 if winner_name(1, w1) == nameA else 0) + (1 if winner_name(2, w2) == nameA else 0)
     b_wins = (1 if winner_name(1, w1) == nameB else 0) + (1 if winner_name(2, w2) == nameB else 0)
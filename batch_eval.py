@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пакетная (NumPy) оценка позиций для офлайн-инструментов: подбор весов,
+разметка датасетов, анализ. В боты не входит — там numpy недоступен.
+
+Позиции — массив (N, 64) int8, клетка i = z*16 + y*4 + x, значения 0/1/2.
+Линии — матрица индексов (76, 4); X[:, LINE_IDX] даёт (N, 76, 4) за одну
+выборку, дальше всё — счётчики и табличные веса по (камней me, камней opp).
+
+Результаты совпадают со скалярными оценками до единицы:
+  eval_board_batch(X, me, "mainGPT5ninght") == mainGPT5ninght.eval_board
+  eval_board_batch(X, me, "main")           == main.eval_board
+  evaluate_batch(X, me)                     == mainGpt1.evaluate
+
+Проверка и замер:
+  python batch_eval.py --check 5000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+import local_driver
+
+# боты, импортирующие серверный framework, локально получают local_driver
+sys.modules.setdefault("framework", local_driver)
+
+import main as _main  # noqa: E402
+import mainGPT5ninght as _gpt5  # noqa: E402
+import mainGpt1 as _gpt1  # noqa: E402
+
+WIN_SCORE = 10_000
+
+
+def line_index(lines) -> np.ndarray:
+    """[(x,y,z)×4] → (L, 4) индексов клеток."""
+    return np.array([[z * 16 + y * 4 + x for (x, y, z) in line] for line in lines], dtype=np.intp)
+
+
+# порядок линий важен для совпадения winner() (первая полная линия)
+LINE_IDXS = {
+    "mainGPT5ninght": line_index(_gpt5.LINES),
+    "main": line_index(_main.LINES),
+    "mainGpt1": line_index(_gpt1.LINES),
+}
+LINE_IDX = LINE_IDXS["mainGPT5ninght"]
+
+
+def _center_height_weights(w_center: int = 1, w_height: int = 1) -> np.ndarray:
+    """w_center*cent + w_height*z для каждой клетки, как в eval_board."""
+    w = np.zeros(64, dtype=np.int64)
+    for z in range(4):
+        for y in range(4):
+            for x in range(4):
+                w[z * 16 + y * 4 + x] = w_center * (3 - int(abs(x - 1.5) + abs(y - 1.5))) + w_height * z
+    return w
+
+
+CENTER_HEIGHT = _center_height_weights()
+
+# клетки четырёх центральных колонок (evaluate даёт +1 за каждую неполную)
+CENTER_COLUMNS = np.array([[z * 16 + y * 4 + x for z in range(4)] for (x, y) in ((1, 1), (2, 1), (1, 2), (2, 2))],
+                          dtype=np.intp)
+
+
+def _pair_table(weight) -> np.ndarray:
+    """Плоская таблица (25,): вес линии по индексу c_me*5 + c_opp."""
+    t = np.zeros(25, dtype=np.int64)
+    for m in range(5):
+        for o in range(5):
+            t[m * 5 + o] = weight(m, o)
+    return t
+
+
+def _potential_table(w3: int, w2: int, w1: int) -> np.ndarray:
+    """Открытые линии eval_board: 3/2/1 своих → +w, чужих → −w, смешанные → 0."""
+    by_count = {3: w3, 2: w2, 1: w1}
+
+    def weight(m, o):
+        if m and o:
+            return 0
+        if o == 0:
+            return by_count.get(m, 0)
+        return -by_count.get(o, 0)
+
+    return _pair_table(weight)
+
+
+def _line_score_weight(m: int, o: int) -> int:
+    """mainGpt1.line_score как функция счётчиков."""
+    if m and o:
+        return 0
+    if m == 4:
+        return WIN_SCORE
+    if o == 4:
+        return -WIN_SCORE
+    if m:
+        return 3 ** m
+    if o:
+        return -(3 ** o)
+    return 0
+
+
+# веса берутся из секции EVAL_WEIGHTS ботов (её пишет tune_eval.py)
+EVAL_TABLES = {
+    "mainGPT5ninght": _potential_table(_gpt5.W_LINE3, _gpt5.W_LINE2, _gpt5.W_LINE1),
+    "main": _potential_table(_main.W_LINE3, _main.W_LINE2, _main.W_LINE1),
+}
+CENTER_HEIGHT_BY_PROFILE = {
+    "mainGPT5ninght": _center_height_weights(_gpt5.W_CENTER, _gpt5.W_HEIGHT),
+    "main": _center_height_weights(_main.W_CENTER, _main.W_HEIGHT),
+}
+EVALUATE_TABLE = _pair_table(_line_score_weight)
+
+
+# ---------------- примитивы ----------------
+
+def as_positions(boards) -> np.ndarray:
+    """Список досок [z][y][x] → (N, 64) int8."""
+    X = np.zeros((len(boards), 64), dtype=np.int8)
+    for n, b in enumerate(boards):
+        X[n] = [b[z][y][x] for z in range(4) for y in range(4) for x in range(4)]
+    return X
+
+
+def _me_vector(me, n: int) -> np.ndarray:
+    """me — число (для всех позиций) или массив (N,) из 1/2."""
+    return np.broadcast_to(np.asarray(me, dtype=np.int8), (n,))
+
+
+def line_counts(X: np.ndarray, line_idx: np.ndarray = LINE_IDX):
+    """Камни P1 и P2 в каждой линии: два массива (N, L) int8."""
+    G = X[:, line_idx]
+    return (G == 1).sum(axis=2, dtype=np.int8), (G == 2).sum(axis=2, dtype=np.int8)
+
+
+def _oriented(c1: np.ndarray, c2: np.ndarray, me: np.ndarray):
+    mine_is_p1 = (me == 1)[:, None]
+    return np.where(mine_is_p1, c1, c2), np.where(mine_is_p1, c2, c1)
+
+
+def first_winner(c1: np.ndarray, c2: np.ndarray) -> np.ndarray:
+    """Как winner(): игрок первой (в порядке LINES) полной линии, 0 — нет."""
+    w1 = c1 == 4
+    full = w1 | (c2 == 4)
+    first = full.argmax(axis=1)
+    rows = np.arange(len(c1))
+    return np.where(full[rows, first], np.where(w1[rows, first], 1, 2), 0)
+
+
+def center_height(X: np.ndarray, me: np.ndarray, weights: np.ndarray = CENTER_HEIGHT) -> np.ndarray:
+    """Σ веса клетки по своим камням минус по чужим (по умолчанию cent + z)."""
+    mine = (X == me[:, None]).astype(np.int64)
+    theirs = (X == (3 - me)[:, None]).astype(np.int64)
+    return (mine - theirs) @ weights
+
+
+def line_features(X: np.ndarray, me, line_idx: np.ndarray = LINE_IDX) -> np.ndarray:
+    """
+    Признаки оценки: (N, 7) — открытые линии с 1/2/3 своими камнями,
+    с 1/2/3 чужими, и центр/высота. eval_board = признаки · веса
+    (пока на доске нет победы).
+    """
+    X = np.asarray(X, dtype=np.int8)
+    me = _me_vector(me, len(X))
+    cm, co = _oriented(*line_counts(X, line_idx), me)
+    open_m = co == 0
+    open_o = cm == 0
+    cols = [(open_m & (cm == k)).sum(axis=1) for k in (1, 2, 3)]
+    cols += [(open_o & (co == k)).sum(axis=1) for k in (1, 2, 3)]
+    cols.append(center_height(X, me))
+    return np.stack(cols, axis=1).astype(np.int64)
+
+
+# ---------------- оценки ----------------
+
+def eval_board_batch(X, me, profile: str = "mainGPT5ninght") -> np.ndarray:
+    """eval_board(board, me) ботов mainGPT5ninght/main для всех позиций сразу."""
+    X = np.asarray(X, dtype=np.int8)
+    me = _me_vector(me, len(X))
+    c1, c2 = line_counts(X, LINE_IDXS[profile])
+    cm, co = _oriented(c1, c2, me)
+    score = EVAL_TABLES[profile][cm.astype(np.intp) * 5 + co].sum(axis=1)
+    score += center_height(X, me, CENTER_HEIGHT_BY_PROFILE[profile])
+    w = first_winner(c1, c2)
+    return np.where(w == 0, score, np.where(w == me, WIN_SCORE, -WIN_SCORE))
+
+
+def evaluate_batch(X, me) -> np.ndarray:
+    """mainGpt1.evaluate(board, me) для всех позиций сразу."""
+    X = np.asarray(X, dtype=np.int8)
+    me = _me_vector(me, len(X))
+    cm, co = _oriented(*line_counts(X, LINE_IDXS["mainGpt1"]), me)
+    score = EVALUATE_TABLE[cm.astype(np.intp) * 5 + co].sum(axis=1)
+    score += (X[:, CENTER_COLUMNS] == 0).any(axis=2).sum(axis=1)
+    return score
+
+
+# ---------------- проверка ----------------
+
+def random_boards(n: int, seed: int = 0):
+    """Случайные позиции с гравитацией; игра идёт и после победы (проверка порядка линий)."""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < n:
+        board = [[[0] * 4 for _ in range(4)] for _ in range(4)]
+        heights = [0] * 16
+        player = 1
+        for _ in range(rng.randint(0, 64)):
+            c = rng.choice([c for c in range(16) if heights[c] < 4])
+            board[heights[c]][c // 4][c % 4] = player
+            heights[c] += 1
+            player = 3 - player
+        out.append(board)
+    return out
+
+
+def check(n: int, seed: int = 0) -> bool:
+    boards = random_boards(n, seed)
+    X = as_positions(boards)
+    me = np.array([1 + (i & 1) for i in range(n)], dtype=np.int8)
+    ok = True
+    cases = (
+        ("mainGPT5ninght.eval_board", _gpt5.eval_board, lambda: eval_board_batch(X, me, "mainGPT5ninght")),
+        ("main.eval_board", _main.eval_board, lambda: eval_board_batch(X, me, "main")),
+        ("mainGpt1.evaluate", _gpt1.evaluate, lambda: evaluate_batch(X, me)),
+    )
+    for name, scalar, batch in cases:
+        t0 = time.perf_counter()
+        ref = [scalar(b, int(m)) for b, m in zip(boards, me)]
+        t1 = time.perf_counter()
+        got = batch()
+        t2 = time.perf_counter()
+        bad = [i for i in range(n) if int(got[i]) != ref[i]]
+        rate_s = n / (t1 - t0) if t1 > t0 else float("inf")
+        rate_b = n / (t2 - t1) if t2 > t1 else float("inf")
+        print(f"{name:28s} {'OK' if not bad else f'РАСХОЖДЕНИЙ {len(bad)}'}  "
+              f"scalar {rate_s:,.0f} поз/с, batch {rate_b:,.0f} поз/с (×{rate_b / rate_s:.0f})")
+        for i in bad[:5]:
+            print(f"  #{i} me={me[i]}: scalar={ref[i]} batch={int(got[i])}")
+        ok = ok and not bad
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Пакетная NumPy-оценка позиций 4x4x4")
+    ap.add_argument("--check", type=int, default=2000, help="Сверить со скалярными оценками на N случайных позициях")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    return 0 if check(args.check, args.seed) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк поиска на фиксированном наборе позиций.
+- build: собрать версионированный набор позиций (bench_positions.json)
+  из логов сервера (bb.txt) и JSONL арены (arena.py --record); если позиций
+  не хватает, набор добирается детерминированными случайными партиями.
+- run: прогнать get_move каждого бота по набору с фиксированной глубиной
+  и/или CPU-бюджетом, записать JSON-отчёт: ход, CPU/wall на ход и
+  статистику поиска, если бот её отдаёт (атрибут stats с as_dict()).
+- --baseline: сравнить с сохранённым отчётом; замедление больше
+  --max-slowdown или рост узлов — код выхода 1.
+
+Пример:
+  python bench.py build --source bb.txt --source games.jsonl --count 200
+  python bench.py run mainGPT5ninght.py main.py --depth 4 --cpu 1e9 --out report.json
+  python bench.py run mainGPT5ninght.py --depth 4 --cpu 1e9 --baseline report.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import local_driver
+from arena import EMPTY, _load_bot_callable, call_get_move, column_height, replay_moves
+from games import game_positions, load_games
+from symmetry import canonical
+
+# боты, импортирующие серверный framework, локально получают local_driver
+sys.modules.setdefault("framework", local_driver)
+
+SUITE_VERSION = 1
+DEFAULT_SUITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_positions.json")
+
+
+# ---------------- build ----------------
+
+def _random_game_positions(rng, max_plies=40):
+    moves = []
+    out = []
+    for _ in range(max_plies):
+        board, player, w = replay_moves(moves)
+        if w != EMPTY:
+            break
+        legal = [(x, y) for y in range(4) for x in range(4) if board[3][y][x] == EMPTY]
+        if not legal:
+            break
+        out.append((list(moves), player))
+        moves.append(rng.choice(legal))
+    return out
+
+
+def build_suite(sources, count, seed=0, min_ply=2):
+    rng = random.Random(seed)
+    candidates = []
+    seen = set()
+
+    def add(moves, player, source):
+        board, _p, w = replay_moves(moves)
+        if w != EMPTY or all(board[3][y][x] != EMPTY for y in range(4) for x in range(4)):
+            return
+        key = canonical(board)[0]
+        if key in seen:
+            return
+        seen.add(key)
+        candidates.append({"moves": [list(m) for m in moves], "player": player, "source": source})
+
+    for path in sources:
+        for gi, rec in enumerate(load_games(path)):
+            for ply, prefix, player, _mv in game_positions(rec):
+                if ply >= min_ply:
+                    add(prefix, player, f"{os.path.basename(path)}#{gi}")
+
+    if len(candidates) > count:
+        candidates = sorted(rng.sample(candidates, count), key=lambda c: (c["source"], len(c["moves"])))
+    while len(candidates) < count:
+        for moves, player in _random_game_positions(rng):
+            if len(moves) >= min_ply and len(candidates) < count:
+                add(moves, player, "random")
+
+    candidates = [dict(id=f"p{i:03d}", **c) for i, c in enumerate(candidates)]
+    return {"version": SUITE_VERSION, "seed": seed, "positions": candidates}
+
+
+def write_suite(path, suite):
+    """Одна позиция на строку — набор остаётся читаемым в diff."""
+    rows = ",\n".join("  " + json.dumps(p, ensure_ascii=False) for p in suite["positions"])
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'{{"version": {suite["version"]}, "seed": {suite["seed"]}, "positions": [\n{rows}\n]}}\n')
+
+
+# ---------------- run ----------------
+
+def _bot_factory(bot_path):
+    inst = getattr(_load_bot_callable(bot_path), "__self__", None)
+    if inst is None:
+        raise RuntimeError(f"{bot_path}: get_move is not a MyAI method")
+    return type(inst)
+
+
+def _configure(ai, depth, cpu):
+    if depth is not None and hasattr(ai, "depth"):
+        ai.depth = depth
+    if cpu is not None and hasattr(ai, "cpu_limit"):
+        ai.cpu_limit = cpu
+        if hasattr(ai, "wall_limit"):
+            ai.wall_limit = max(ai.wall_limit, cpu * 4)
+
+
+def _stats_dict(ai):
+    st = getattr(ai, "stats", None)
+    if st is None:
+        return {}
+    if hasattr(st, "as_dict"):
+        return st.as_dict()
+    return dict(st) if isinstance(st, dict) else {}
+
+
+def _last_move(board, moves):
+    if not moves:
+        return (None, None, None)
+    x, y = moves[-1]
+    h = column_height(board, x, y)
+    return (x, y, (4 if h is None else h) - 1)
+
+
+def run_bot(bot_path, suite, depth=None, cpu=None, verbose=False):
+    cls = _bot_factory(bot_path)
+    rows = []
+    for pos in suite["positions"]:
+        board, player, _w = replay_moves(pos["moves"])
+        ai = cls()
+        _configure(ai, depth, cpu)
+        if hasattr(ai, "collect_stats"):
+            ai.collect_stats = True
+        last = _last_move(board, pos["moves"])
+        c0, w0 = time.process_time(), time.perf_counter()
+        move = call_get_move(ai.get_move, board, player, last)
+        cpu_s, wall_s = time.process_time() - c0, time.perf_counter() - w0
+        row = {"id": pos["id"], "move": list(move), "cpu": round(cpu_s, 4), "wall": round(wall_s, 4)}
+        # позиции из blunders.py: лучший ход и сыгранная в партии ошибка
+        if "best" in pos:
+            row["best_hit"] = int(list(move) in pos["best"])
+        if "avoid" in pos:
+            row["blunder"] = int(list(move) in pos["avoid"])
+        row.update(_stats_dict(ai))
+        rows.append(row)
+        if verbose:
+            print(f"  {pos['id']}: {tuple(move)} cpu={cpu_s:.3f}s")
+    return {"positions": rows, "summary": summarize(rows)}
+
+
+# не складываются по позициям (best_value — оценка, а не счётчик)
+_NOT_SUMMED = ("id", "move", "cpu", "wall", "best_value")
+
+
+def summarize(rows):
+    summary = {"positions": len(rows), "cpu": round(sum(r["cpu"] for r in rows), 4),
+               "wall": round(sum(r["wall"] for r in rows), 4)}
+    numeric = set()
+    for r in rows:
+        for k, v in r.items():
+            if k not in _NOT_SUMMED and isinstance(v, (int, float)) and not isinstance(v, bool):
+                numeric.add(k)
+    for k in sorted(numeric):
+        summary[k] = sum(r.get(k, 0) for r in rows)
+    if summary.get("tt_probes"):
+        summary["tt_hit_rate"] = round(summary.get("tt_hits", 0) / summary["tt_probes"], 4)
+    if "depth" in summary and rows:
+        summary["depth_avg"] = round(summary.pop("depth") / len(rows), 3)
+    return summary
+
+
+def diff_reports(base, cur, max_slowdown=0.10):
+    """Сравнение двух отчётов. Возвращает (строки, есть_регрессия)."""
+    lines = []
+    regression = False
+    for bot, data in cur["bots"].items():
+        old = base.get("bots", {}).get(bot)
+        if old is None:
+            lines.append(f"{bot}: нет в baseline")
+            continue
+        s_old, s_new = old["summary"], data["summary"]
+        for k in sorted(set(s_old) | set(s_new)):
+            a, b = s_old.get(k), s_new.get(k)
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)) or a == b:
+                continue
+            rel = (b - a) / a if a else float("inf")
+            lines.append(f"{bot}: {k} {a} → {b} ({rel:+.1%})")
+            if k in ("cpu", "nodes") and rel > max_slowdown:
+                regression = True
+        old_moves = {r["id"]: r["move"] for r in old["positions"]}
+        changed = [r["id"] for r in data["positions"] if old_moves.get(r["id"]) not in (None, r["move"])]
+        if changed:
+            lines.append(f"{bot}: ход изменился в {len(changed)} позициях: {', '.join(changed[:20])}")
+    return lines, regression
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк ботов на фиксированных позициях")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="Собрать набор позиций")
+    b.add_argument("--source", action="append", default=[], help="bb.txt-лог или JSONL арены (можно несколько)")
+    b.add_argument("--count", type=int, default=200)
+    b.add_argument("--seed", type=int, default=0)
+    b.add_argument("--out", default=DEFAULT_SUITE)
+
+    r = sub.add_parser("run", help="Прогнать ботов по набору")
+    r.add_argument("bots", nargs="+", help="Пути к ботам .py")
+    r.add_argument("--suite", default=DEFAULT_SUITE)
+    r.add_argument("--depth", type=int, default=None, help="Фиксированная (максимальная) глубина")
+    r.add_argument("--cpu", type=float, default=None, help="CPU-бюджет на ход, с (1e9 — без лимита)")
+    r.add_argument("--limit", type=int, default=0, help="Только первые N позиций")
+    r.add_argument("--out", default="", help="Сохранить JSON-отчёт")
+    r.add_argument("--baseline", default="", help="Сравнить с сохранённым отчётом")
+    r.add_argument("--max-slowdown", type=float, default=0.10)
+    r.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        suite = build_suite(args.source or ["bb.txt"], args.count, args.seed)
+        write_suite(args.out, suite)
+        sources = {}
+        for p in suite["positions"]:
+            src = p["source"].split("#")[0]
+            sources[src] = sources.get(src, 0) + 1
+        print(f"{len(suite['positions'])} позиций → {args.out}: {sources}")
+        return 0
+
+    with open(args.suite, encoding="utf-8") as f:
+        suite = json.load(f)
+    if args.limit:
+        suite = dict(suite, positions=suite["positions"][:args.limit])
+    report = {"suite_version": suite["version"], "depth": args.depth, "cpu": args.cpu, "bots": {}}
+    for bot in args.bots:
+        name = os.path.basename(bot)
+        print(f"{name}: {len(suite['positions'])} позиций")
+        report["bots"][name] = run_bot(os.path.abspath(bot), suite, args.depth, args.cpu, args.verbose)
+        print(f"  {report['bots'][name]['summary']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        lines, regression = diff_reports(base, report, args.max_slowdown)
+        for line in lines:
+            print(line)
+        if regression:
+            print("РЕГРЕССИЯ производительности")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Битборд-ядро 4x4x4 с гравитацией (офлайн-инструменты: perft, решатель).
+
+Клетка (x, y, z) → бит i = z*16 + y*4 + x; столбец c = y*4 + x занимает
+биты c, c+16, c+32, c+48. У каждого игрока своя 64-битная маска камней,
+высоты столбцов хранятся отдельно. Победа проверяется только по линиям
+через последнюю поставленную клетку.
+"""
+
+from typing import List, Optional
+
+from arena import ALL_LINES
+
+LINE_MASKS: List[int] = []
+for _line in ALL_LINES:
+    _m = 0
+    for (_x, _y, _z) in _line:
+        _m |= 1 << (_z * 16 + _y * 4 + _x)
+    LINE_MASKS.append(_m)
+
+# маски линий, проходящих через клетку i
+CELL_LINE_MASKS: List[List[int]] = [[m for m in LINE_MASKS if m >> i & 1] for i in range(64)]
+
+# центр-сначала (как в ботах)
+COLUMN_ORDER = sorted(range(16), key=lambda c: (abs(c % 4 - 1.5) + abs(c // 4 - 1.5), c))
+
+
+class Position:
+    """Позиция: stones[0] — камни P1, stones[1] — камни P2, side — 1/2 (чей ход)."""
+
+    __slots__ = ("stones", "heights", "side", "count")
+
+    def __init__(self):
+        self.stones = [0, 0]
+        self.heights = [0] * 16
+        self.side = 1
+        self.count = 0
+
+    @classmethod
+    def from_board(cls, board, side: int) -> "Position":
+        pos = cls()
+        for z in range(4):
+            for y in range(4):
+                for x in range(4):
+                    v = board[z][y][x]
+                    if v:
+                        pos.stones[v - 1] |= 1 << (z * 16 + y * 4 + x)
+                        pos.heights[y * 4 + x] = z + 1
+                        pos.count += 1
+        pos.side = side
+        return pos
+
+    def copy(self) -> "Position":
+        pos = Position()
+        pos.stones = self.stones[:]
+        pos.heights = self.heights[:]
+        pos.side = self.side
+        pos.count = self.count
+        return pos
+
+    def legal_columns(self) -> List[int]:
+        h = self.heights
+        return [c for c in COLUMN_ORDER if h[c] < 4]
+
+    def play(self, c: int) -> int:
+        """Сходить в столбец c за side. Возвращает индекс клетки."""
+        i = self.heights[c] * 16 + c
+        self.stones[self.side - 1] |= 1 << i
+        self.heights[c] += 1
+        self.side = 3 - self.side
+        self.count += 1
+        return i
+
+    def undo(self, c: int) -> None:
+        self.heights[c] -= 1
+        self.side = 3 - self.side
+        self.count -= 1
+        self.stones[self.side - 1] &= ~(1 << (self.heights[c] * 16 + c))
+
+    def is_win_at(self, i: int, player: int) -> bool:
+        s = self.stones[player - 1]
+        for m in CELL_LINE_MASKS[i]:
+            if s & m == m:
+                return True
+        return False
+
+    def winning_columns(self, player: int) -> List[int]:
+        """Столбцы, ход в которые сразу выигрывает за player."""
+        s = self.stones[player - 1]
+        out = []
+        for c in range(16):
+            h = self.heights[c]
+            if h < 4:
+                i = h * 16 + c
+                bit = 1 << i
+                for m in CELL_LINE_MASKS[i]:
+                    if (s | bit) & m == m:
+                        out.append(c)
+                        break
+        return out
+
+    def full(self) -> bool:
+        return self.count >= 64
+
+    def key(self) -> int:
+        """Точный ключ позиции (камни обоих игроков; чей ход следует из count)."""
+        return self.stones[0] | (self.stones[1] << 64)
+
+
+def column_xy(c: int):
+    return (c % 4, c // 4)
+
+
+def xy_column(x: int, y: int) -> int:
+    return y * 4 + x
+
+
+def winner_of(pos: Position) -> Optional[int]:
+    for m in LINE_MASKS:
+        if pos.stones[0] & m == m:
+            return 1
+        if pos.stones[1] & m == m:
+            return 2
+    return None
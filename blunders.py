@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск решающей ошибки проигравшего в записанных партиях (bb.txt, JSONL
+арены/selfplay/турнира) и генерация из них позиций для bench.py.
+- Анализируются только позиции, где ход за проигравшим, с конца партии
+  назад: пока поиск (MyAI.analyse движка, глубина --depth) видит
+  форсированный проигрыш, идём дальше назад. Первая с конца позиция, где
+  проигрыша не видно, — решающая ошибка: сыгранный ход переводит её в
+  проигранную, лучший ход анализа — «лучше было».
+- Если проигрыш виден до начала окна (--window полуходов от конца), ошибки
+  в окне нет: партия проиграна раньше (или горизонта не хватило).
+- Позиции раздаются пулу процессов (parallel_search.make_pool): за раунд
+  каждой незавершённой партии выдаётся следующая позиция назад, при
+  свободных воркерах — несколько вперёд (спекулятивно).
+- Общий кэш анализов по каноническому ключу (8 симметрий подошвы,
+  analysis_cache.py): повторяющиеся дебюты и одинаковые позиции в разных
+  партиях считаются один раз; с --cache кэш — mmap-файл, который
+  переживает запуски и общий с parallel_search/book_builder. Форсированный
+  результат годится для любой глубины, остальное — если глубина не меньше.
+
+Оценки — со стороны хода; |v| >= WIN_BOUND — форсированный исход
+(как в mainGPT5ninght и parallel_search).
+
+Пример:
+  python blunders.py bb.txt games.jsonl --depth 6 --workers 8 --report blunders.jsonl \\
+      --suite-out blunder_positions.json --cache analysis.cache
+  python bench.py run mainGPT5ninght.py --suite blunder_positions.json --depth 4 --cpu 1e9
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import set_start_method
+
+import parallel_search
+from analysis_cache import AnalysisCache
+from arena import EMPTY, P1, P2, replay_moves
+from bench import SUITE_VERSION, write_suite
+from games import game_positions, load_games
+from symmetry import canonical, move_from_canonical, move_to_canonical
+
+WIN_BOUND = 9_000
+
+
+def outcome(value):
+    """+1 — форсированная победа стороны хода, -1 — проигрыш, 0 — не ясно."""
+    return 1 if value >= WIN_BOUND else (-1 if value <= -WIN_BOUND else 0)
+
+
+# ---------------- анализ ----------------
+
+def _analyse_task(task):
+    """В воркере пула parallel_search: (id, доска, сторона, глубина) → (id, лучший ход, оценка)."""
+    tid, board, player, depth = task
+    best, value = parallel_search._engine.analyse(board, player, depth)
+    return tid, best, value
+
+
+def _transfer(move, src, dst):
+    """Ход на доске src → тот же ход на её симметричном образе dst."""
+    return move_from_canonical(move_to_canonical(move, canonical(src)[1]), canonical(dst)[1])
+
+
+class GameScan:
+    """Обратный проход по позициям проигравшего одной партии."""
+
+    def __init__(self, gid, source, rec, window):
+        self.gid, self.source, self.rec = gid, source, rec
+        self.loser = P2 if rec["winner"] == P1 else P1
+        self.plies = [(ply, prefix, mv) for ply, prefix, player, mv in game_positions(rec)
+                      if player == self.loser and ply >= len(rec["moves"]) - window]
+        self.plies.reverse()
+        self.pos = 0             # следующая позиция проигравшего (с конца)
+        self.results = {}        # индекс в self.plies → (оценка, лучший ход)
+        self.done = None         # итоговая запись отчёта
+
+    def pending(self, ahead):
+        """Индексы позиций, которые стоит посчитать сейчас (не больше ahead)."""
+        out = []
+        i = self.pos
+        while i < len(self.plies) and len(out) < ahead:
+            if i not in self.results:
+                out.append(i)
+            i += 1
+        return out
+
+    def advance(self, depth):
+        """Идти назад, пока позиции посчитаны и проиграны; при находке — заполнить done."""
+        while self.done is None and self.pos in self.results:
+            value, best = self.results[self.pos]
+            ply, prefix, mv = self.plies[self.pos]
+            if outcome(value) >= 0:
+                self.done = {
+                    "game": self.gid, "source": self.source, "black": self.rec.get("black"),
+                    "white": self.rec.get("white"), "winner": self.rec["winner"], "loser": self.loser,
+                    "ply": ply, "moves": [list(m) for m in prefix], "played": list(mv), "better": list(best),
+                    "value": value, "before": "win" if outcome(value) > 0 else "unclear", "depth": depth,
+                }
+            else:
+                self.pos += 1
+        if self.done is None and self.pos >= len(self.plies):
+            self.done = {
+                "game": self.gid, "source": self.source, "black": self.rec.get("black"),
+                "white": self.rec.get("white"), "winner": self.rec["winner"], "loser": self.loser,
+                "ply": None, "depth": depth,
+                "lost_from": self.plies[-1][0] if self.plies else None,
+            }
+        return self.done is not None
+
+
+def find_blunders(games, depth, window, pool, workers, cache, verbose=True):
+    """games: [(id, source, rec)] с победителем. → записи отчёта в порядке games."""
+    scans = [GameScan(gid, src, rec, window) for gid, src, rec in games]
+    active = [s for s in scans if not s.advance(depth)]
+    analysed = hits = 0
+    start = time.perf_counter()
+    while active:
+        ahead = max(1, -(-workers // len(active)))
+        tasks, owners = [], {}
+        for s in active:
+            for i in s.pending(ahead):
+                _ply, prefix, _mv = s.plies[i]
+                board, player, _w = replay_moves(prefix)
+                hit = cache.get(board, depth)
+                if hit is not None:
+                    s.results[i] = hit
+                    hits += 1
+                    continue
+                tid = len(tasks)
+                # одинаковые позиции внутри раунда (другой образ той же доски) — одной задачей
+                code = canonical(board)[0]
+                if code in owners:
+                    owners[code][1].append((s, i, board))
+                    continue
+                owners[code] = (tid, [(s, i, board)])
+                tasks.append((tid, board, player, depth))
+        by_tid = {tid: group for tid, group in owners.values()}
+        for tid, best, value in pool.imap_unordered(_analyse_task, tasks):
+            analysed += 1
+            group = by_tid[tid]
+            cache.put(group[0][2], depth, value, best)
+            for s, i, board in group:
+                s.results[i] = (value, _transfer(best, group[0][2], board))
+        active = [s for s in active if not s.advance(depth)]
+        if verbose and tasks:
+            print(f"  посчитано {analysed} позиций (из кэша {hits}), партий в работе {len(active)}, "
+                  f"{time.perf_counter() - start:.0f} с")
+    return [s.done for s in scans]
+
+
+def suite_positions(report):
+    """Найденные ошибки → позиции набора bench.py (best — лучший ход, avoid — сыгранный)."""
+    out = []
+    seen = set()
+    for r in report:
+        if r.get("ply") is None:
+            continue
+        board, _p, _w = replay_moves(r["moves"])
+        code = canonical(board)[0]
+        if code in seen:
+            continue
+        seen.add(code)
+        out.append({"id": f"b{len(out):03d}", "moves": r["moves"], "player": r["loser"],
+                    "source": f"{r['source']}@{r['ply']}", "best": [r["better"]], "avoid": [r["played"]]})
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Решающие ошибки проигравших в записанных партиях")
+    ap.add_argument("sources", nargs="+", help="bb.txt-логи и JSONL партий")
+    ap.add_argument("--depth", type=int, default=6, help="Глубина MyAI.analyse")
+    ap.add_argument("--window", type=int, default=24, help="Сколько полуходов от конца партии проверять")
+    ap.add_argument("--workers", type=int, default=0, help="Процессов (по умолчанию — все ядра)")
+    ap.add_argument("--engine", default=parallel_search.DEFAULT_ENGINE, help="Бот с MyAI.analyse")
+    ap.add_argument("--cache", default="", help="Файл analysis_cache.py (читается и дописывается)")
+    ap.add_argument("--limit", type=int, default=0, help="Только первые N партий")
+    ap.add_argument("--report", default="", help="Отчёт JSONL: по записи на партию")
+    ap.add_argument("--suite-out", default="", help="Набор позиций для bench.py run --suite")
+    args = ap.parse_args()
+
+    games = []
+    for path in args.sources:
+        for gi, rec in enumerate(load_games(path)):
+            if rec.get("winner", EMPTY) != EMPTY and rec["moves"]:
+                games.append((len(games), f"{os.path.basename(path)}#{gi}", rec))
+    if args.limit:
+        games = games[:args.limit]
+    print(f"{len(games)} результативных партий, глубина {args.depth}, окно {args.window}")
+
+    workers = args.workers or os.cpu_count() or 1
+    cache = AnalysisCache(args.cache, writable=True)
+    pool = parallel_search.make_pool(workers, args.engine)
+    try:
+        report = find_blunders(games, args.depth, args.window, pool, workers, cache)
+    finally:
+        pool.close()
+        pool.join()
+        cache.close()
+
+    found = 0
+    for r in report:
+        if r["ply"] is None:
+            lost = "" if r["lost_from"] is None else f" (проигрыш виден с полухода {r['lost_from']})"
+            print(f"{r['source']}: в окне ошибки нет{lost}")
+            continue
+        found += 1
+        print(f"{r['source']}: P{r['loser']} полуход {r['ply']}: {tuple(r['played'])} → лучше {tuple(r['better'])} "
+              f"(оценка {r['value']}, было: {r['before']})")
+    print(f"ошибок найдено: {found} из {len(report)}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            for r in report:
+                f.write(json.dumps(r) + "\n")
+    if args.suite_out:
+        positions = suite_positions(report)
+        write_suite(args.suite_out, {"version": SUITE_VERSION, "seed": 0, "positions": positions})
+        print(f"{len(positions)} позиций → {args.suite_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Генератор дебютной книги для main.py.
+- Обходит первые --plies полуходов за обе стороны: в узлах «своей» стороны
+  идём только по лучшему ходу, в узлах соперника — по всем ответам.
+- Позиции дедуплицируются по симметриям D4 (symmetry.canonical).
+- Каждая позиция считается глубоким параллельным поиском (parallel_search);
+  с --cache результаты копятся в analysis_cache.py и переживают перезапуск.
+- Формат: отсортированные записи struct "<QB" (64-бит ключ позиции,
+  столбец хода c = y*4 + x в канонической системе) → base64.
+- --embed main.py вшивает строку в секцию OPENING_BOOK (файлы на сервере
+  читать нельзя, поэтому книга — литерал в исходнике).
+
+Пример:
+  python book_builder.py --plies 6 --depth 8 --workers 32 --out book.json --embed main.py
+"""
+
+import argparse
+import base64
+import json
+import os
+import struct
+import time
+from multiprocessing import set_start_method
+
+from analysis_cache import AnalysisCache
+from arena import EMPTY, P1, P2, apply_move, check_winner, new_board
+from codegen import replace_section, wrap_string
+from parallel_search import DEFAULT_ENGINE, make_pool, parallel_analyse, root_moves
+from symmetry import book_key, canonical, move_from_canonical, move_to_canonical
+
+ENTRY = struct.Struct("<QB")
+
+
+def encode_book(entries):
+    """{key: (x, y)} → base64-строка."""
+    blob = b"".join(ENTRY.pack(k, mv[1] * 4 + mv[0]) for k, mv in sorted(entries.items()))
+    return base64.b64encode(blob).decode("ascii")
+
+
+def decode_book(text):
+    """base64-строка → {key: (x, y)}."""
+    blob = base64.b64decode(text) if text else b""
+    out = {}
+    for k, c in ENTRY.iter_unpack(blob):
+        out[k] = (c % 4, c // 4)
+    return out
+
+
+def save_json(path, entries, meta):
+    data = {"meta": meta, "entries": {str(k): list(mv) for k, mv in sorted(entries.items())}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {int(k): tuple(mv) for k, mv in data["entries"].items()}, data.get("meta", {})
+
+
+def embed(path, entries):
+    replace_section(path, "OPENING_BOOK", wrap_string("_OPENING_BOOK_B64", encode_book(entries)),
+                    tool="book_builder.py")
+
+
+def _play(board, player, move):
+    child = [[row[:] for row in layer] for layer in board]
+    apply_move(child, player, move)
+    return child
+
+
+def build_book(plies, depth, workers=None, engine_path=DEFAULT_ENGINE, known=None, verbose=True, cache=None):
+    """
+    Построить книгу {key: ход в канонической системе}.
+    known — уже посчитанные записи (возобновление/дополнение книги).
+    cache — analysis_cache.AnalysisCache для parallel_analyse.
+    """
+    entries = dict(known or {})
+    pool = make_pool(workers, engine_path)
+    start = time.perf_counter()
+    try:
+        # фронт: (board, player_to_move, ply, book_side); book_side — за кого играет книга
+        frontier = [(new_board(), P1, 0, P1), (new_board(), P1, 0, P2)]
+        seen = set()
+        while frontier:
+            nxt = []
+            for board, player, ply, side in frontier:
+                code, t = canonical(board)
+                if (code, side) in seen:
+                    continue
+                seen.add((code, side))
+                key = book_key(code)
+                if player == side and key not in entries:
+                    res = parallel_analyse(board, player, depth, pool=pool, cache=cache)
+                    if res["best"] is None:
+                        continue
+                    entries[key] = move_to_canonical(res["best"], t)
+                    if verbose:
+                        print(f"[{len(entries)}] ply={ply} best={res['best']} value={res['value']} "
+                              f"t={time.perf_counter() - start:.1f}s")
+                if ply + 1 >= plies:
+                    continue
+                opp = P2 if player == P1 else P1
+                if player == side:
+                    # ход книги хранится в канонической системе — переводим обратно
+                    children = [move_from_canonical(entries[key], t)]
+                else:
+                    children = root_moves(board)
+                for mv in children:
+                    child = _play(board, player, mv)
+                    if check_winner(child) == EMPTY:
+                        nxt.append((child, opp, ply + 1, side))
+            frontier = nxt
+    finally:
+        pool.close()
+        pool.join()
+    return entries
+
+
+def main():
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+
+    ap = argparse.ArgumentParser(description="Генератор дебютной книги 4x4x4")
+    ap.add_argument("--plies", type=int, default=6, help="Сколько первых полуходов покрыть (по умолчанию 6)")
+    ap.add_argument("--depth", type=int, default=8, help="Глубина поиска на позицию (по умолчанию 8)")
+    ap.add_argument("--workers", type=int, default=0, help="Число процессов (по умолчанию — все ядра)")
+    ap.add_argument("--engine", default=DEFAULT_ENGINE, help="Бот с MyAI.analyse")
+    ap.add_argument("--out", default="book.json", help="JSON-копия книги (для дополнения и просмотра)")
+    ap.add_argument("--resume", action="store_true", help="Начать с записей из --out")
+    ap.add_argument("--embed", default="", help="Вшить книгу в файл бота (секция OPENING_BOOK)")
+    ap.add_argument("--cache", default="", help="Файл analysis_cache.py (читается и дописывается)")
+    args = ap.parse_args()
+
+    known = {}
+    if args.resume and os.path.exists(args.out):
+        known, _meta = load_json(args.out)
+    cache = AnalysisCache(args.cache, writable=True) if args.cache else None
+    try:
+        entries = build_book(args.plies, args.depth, workers=args.workers or None,
+                             engine_path=args.engine, known=known, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    save_json(args.out, entries, {"plies": args.plies, "depth": args.depth, "engine": os.path.basename(args.engine)})
+    blob = encode_book(entries)
+    print(f"Книга: {len(entries)} позиций, {len(blob)} символов base64")
+    if args.embed:
+        embed(args.embed, entries)
+        print(f"Вшито в {args.embed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сверка однопроходного analyze_tactics ботов с прежней прелюдией get_move
+(_immediate_win → блок → _find_own_fork → _find_block_opp_fork → _is_safe).
+- Эталон — помощники maineeWIN.MyAI: в нём прелюдия осталась в исходном
+  виде, в main.py/mainGPT5ninght.py её заменил analyze_tactics. Первый
+  найденный ход зависит от порядка valid_moves (у mainGPT5ninght он
+  другой), поэтому эталон обходит ходы в порядке проверяемого бота.
+- Сравниваются решения, как их видит get_move: стадия и ход
+  (win/block/fork/block_fork), а если ни одна не сработала — список
+  safe-ходов, по которым идёт поиск.
+- Позиции — из случайных партий (--games, --seed), все до победы или
+  заполнения доски.
+- Расхождение печатается с ходами позиции, код выхода 1.
+
+Пример:
+  python check_tactics.py --games 300
+  python check_tactics.py main.py --games 1000 --seed 7
+"""
+
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+
+import local_driver
+from arena import EMPTY, replay_moves
+
+# боты импортируют серверный framework; локально его роль играет local_driver
+sys.modules.setdefault("framework", local_driver)
+
+import maineeWIN  # noqa: E402
+
+DEFAULT_BOTS = ("main.py", "mainGPT5ninght.py")
+
+
+def reference_prelude(ref, board, player):
+    """Решение прежней прелюдии: (стадия, ход) или ("safe", кандидаты поиска)."""
+    opp = 3 - player
+    for stage, find in (("win", lambda: ref._immediate_win(board, player)),
+                        ("block", lambda: ref._immediate_win(board, opp)),
+                        ("fork", lambda: ref._find_own_fork(board, player)),
+                        ("block_fork", lambda: ref._find_block_opp_fork(board, player))):
+        mv = find()
+        if mv is not None:
+            return stage, tuple(mv)
+    return "safe", [m for m in maineeWIN.valid_moves(board) if ref._is_safe(board, player, m[0], m[1])]
+
+
+def tactics_prelude(module, board, player):
+    """То же по analyze_tactics бота."""
+    tac = module.analyze_tactics(board, player)
+    opp = 3 - player
+    for mvs, stage in ((tac.wins[player], "win"), (tac.wins[opp], "block"),
+                       (tac.forks[player], "fork"), (tac.forks[opp], "block_fork")):
+        if mvs:
+            return stage, tuple(mvs[0])
+    return "safe", list(tac.safe)
+
+
+def random_positions(games, seed):
+    """Префиксы ходов случайных партий (позиции, где ещё есть ход и нет победителя)."""
+    rng = random.Random(seed)
+    for _g in range(games):
+        moves = []
+        while True:
+            board, _player, w = replay_moves(moves)
+            legal = [(x, y) for y in range(4) for x in range(4) if board[3][y][x] == EMPTY]
+            if w != EMPTY or not legal:
+                break
+            yield list(moves)
+            moves.append(rng.choice(legal))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="analyze_tactics против прежней прелюдии get_move")
+    ap.add_argument("bots", nargs="*", default=list(DEFAULT_BOTS), help="Боты с analyze_tactics")
+    ap.add_argument("--games", type=int, default=300, help="Случайных партий")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    ref = maineeWIN.MyAI()
+    bad = 0
+    for path in args.bots:
+        module = importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+        # помощники эталона берут valid_moves из глобалов maineeWIN
+        maineeWIN.valid_moves = module.valid_moves
+        n = 0
+        t_ref = t_new = 0.0
+        for moves in random_positions(args.games, args.seed):
+            board, player, _w = replay_moves(moves)
+            t = time.process_time()
+            want = reference_prelude(ref, board, player)
+            t_ref += time.process_time() - t
+            t = time.process_time()
+            got = tactics_prelude(module, board, player)
+            t_new += time.process_time() - t
+            n += 1
+            if got != want:
+                bad += 1
+                print(f"{path}: расхождение на {moves}: эталон {want}, analyze_tactics {got}")
+        print(f"{path}: {n} позиций, прелюдия {t_ref:.1f} с → analyze_tactics {t_new:.1f} с")
+    print("OK" if not bad else f"расхождений: {bad}")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Вставка сгенерированных литералов в файлы ботов.
+
+main.py нельзя читать файлы во время игры (open запрещён), поэтому всё,
+что строится офлайн (книга, таблицы, веса), вшивается в исходник между
+маркерами:
+
+    # --- BEGIN GENERATED: NAME (tool.py) ---
+    ...
+    # --- END GENERATED: NAME ---
+
+replace_section() переписывает только содержимое между маркерами.
+"""
+
+import os
+
+
+def _markers(name):
+    return f"# --- BEGIN GENERATED: {name}", f"# --- END GENERATED: {name} ---"
+
+
+def replace_section(path, name, body, tool="codegen.py"):
+    """Заменить тело секции name в файле path на body (строка с кодом)."""
+    begin, end = _markers(name)
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    i = text.find(begin)
+    j = text.find(end)
+    if i < 0 or j < 0 or j < i:
+        raise ValueError(f"{path}: section {name} not found")
+    head = text[:i]
+    tail = text[j:]
+    if not body.endswith("\n"):
+        body += "\n"
+    new_text = f"{head}{begin} ({tool}) ---\n{body}{tail}"
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(new_text)
+    os.replace(tmp, path)
+
+
+def wrap_string(name, value, width=76):
+    """Длинная строка → присваивание name = ("..." "...") по строкам width."""
+    if not value:
+        return f'{name} = ""\n'
+    parts = [value[i:i + width] for i in range(0, len(value), width)]
+    lines = [f"{name} = ("]
+    lines.extend(f'    "{p}"' for p in parts)
+    lines.append(")")
+    return "\n".join(lines) + "\n"
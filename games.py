@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Чтение записанных партий для офлайн-инструментов.
+
+Поддерживаются два источника:
+  - лог сервера (как bb.txt): строки «N手目  имя : 黒|白 : (x, y)»,
+    новая партия начинается с «1手目»;
+  - JSONL арены (arena.py --record, selfplay): одна партия на строку,
+    формат arena.game_record().
+
+Все партии приводятся к записи arena.game_record(): black, white, moves,
+winner (0/1/2 — по фактическому переигрыванию ходов), plies, reason.
+"""
+
+import json
+import re
+
+from arena import EMPTY, P1, P2, apply_move, check_winner_at, new_board
+
+_LOG_MOVE = re.compile(r"(\d+)手目\s+(\S+)\s*:\s*(\S+)\s*:\s*\((\d+),\s*(\d+)\)")
+
+
+def load_records(path):
+    """JSONL с партиями (пустые строки пропускаются)."""
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                out.append(json.loads(line))
+    return out
+
+
+def parse_server_log(path):
+    games = []
+    cur = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            m = _LOG_MOVE.search(line)
+            if not m:
+                continue
+            num, name, color = int(m.group(1)), m.group(2), m.group(3)
+            if num == 1 or cur is None:
+                cur = {"black": None, "white": None, "moves": [], "reason": "server_log"}
+                games.append(cur)
+            if color == "黒":
+                cur["black"] = name
+            else:
+                cur["white"] = name
+            cur["moves"].append([int(m.group(4)), int(m.group(5))])
+    for g in games:
+        g["winner"], g["plies"] = replay_result(g["moves"])
+        g["moves"] = g["moves"][:g["plies"]]
+    return games
+
+
+def replay_result(moves):
+    """(победитель 0/1/2, число сыгранных ходов) — переигрывание с пустой доски."""
+    board = new_board()
+    current = P1
+    for i, mv in enumerate(moves):
+        placed, reason = apply_move(board, current, tuple(mv))
+        if placed is None or reason is not None:
+            return EMPTY, i
+        w = check_winner_at(board, placed)
+        if w != EMPTY:
+            return w, i + 1
+        current = P2 if current == P1 else P1
+    return EMPTY, len(moves)
+
+
+def load_games(path):
+    """Партии из файла любого поддерживаемого формата."""
+    with open(path, encoding="utf-8") as f:
+        head = f.read(4096).lstrip()
+    if head.startswith("{"):
+        return load_records(path)
+    return parse_server_log(path)
+
+
+def game_positions(rec):
+    """Позиции перед каждым ходом партии: (ply, moves_prefix, player_to_move, played_move)."""
+    moves = [tuple(m) for m in rec["moves"]]
+    player = P1
+    for ply, mv in enumerate(moves):
+        yield ply, moves[:ply], player, mv
+        player = P2 if player == P1 else P1
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Генератор постоянных таблиц ботов (секция TABLES).
+
+Арена и сервер импортируют бота заново на каждый ход, поэтому всё, что
+бот раньше строил при импорте/создании MyAI (76 линий, индекс клетка →
+линии, ключи Zobrist, перестановки симметрий), вшивается готовыми
+литералами. Здесь — эталонные построения; бот получает только результат.
+
+Таблицы:
+  LINES          — 76 линий [(x, y, z)×4], порядок как в прежнем gen_lines()
+  CELL_LINES     — CELL_LINES[z][y][x]: индексы линий через клетку
+  LINE_MASKS     — 64-битные маски линий (бит i = z*16 + y*4 + x)
+  ZOBRIST        — ZOBRIST_PIECE[z][y][x][p-1], ZOBRIST_STM (random.Random(0xC0FFEE))
+  COL_PERMS      — _COL_PERMS: 8 симметрий подошвы, столбец c=y*4+x → образ
+  LMR            — LMR_DEFAULT: lmr_table(SEARCH_PARAMS) mainGPT5ninght (при
+                   смене lmr_* в SEARCH_PARAMS секцию нужно перегенерировать)
+
+Пример:
+  python gen_tables.py                 # переписать секции TABLES в ботах
+  python gen_tables.py --check         # секции совпадают с эталоном?
+  python gen_tables.py --bench 20 --bench-bot /tmp/old/mainGPT5ninght.py
+"""
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+
+from codegen import replace_section, wrap_string
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# какие таблицы нужны какому боту
+TARGETS = {
+    "main.py": ("LINES", "CELL_LINES", "COL_PERMS"),
+    "mainGPT5ninght.py": ("LINES", "CELL_LINES", "LINE_MASKS", "ZOBRIST", "COL_PERMS", "LMR"),
+}
+
+ZOBRIST_SEED = 0xC0FFEE
+
+
+# ---------------- эталонные построения ----------------
+
+def gen_lines():
+    """Полный набор из 76 победных линий для 4x4x4."""
+    L = []
+    # По оси X (для каждого y,z)
+    for y in range(4):
+        for z in range(4):
+            L.append([(i, y, z) for i in range(4)])
+    # По оси Y (для каждого x,z)
+    for x in range(4):
+        for z in range(4):
+            L.append([(x, i, z) for i in range(4)])
+    # По оси Z (для каждого x,y)
+    for x in range(4):
+        for y in range(4):
+            L.append([(x, y, i) for i in range(4)])
+    # Диагонали в каждой плоскости z
+    for z in range(4):
+        L.append([(i, i, z) for i in range(4)])
+        L.append([(i, 3 - i, z) for i in range(4)])
+    # Диагонали в каждой плоскости y (x-z)
+    for y in range(4):
+        L.append([(i, y, i) for i in range(4)])
+        L.append([(i, y, 3 - i) for i in range(4)])
+    # Диагонали в каждой плоскости x (y-z)
+    for x in range(4):
+        L.append([(x, i, i) for i in range(4)])
+        L.append([(x, i, 3 - i) for i in range(4)])
+    # 4 пространственные диагонали
+    L.append([(i, i, i) for i in range(4)])
+    L.append([(i, i, 3 - i) for i in range(4)])
+    L.append([(i, 3 - i, i) for i in range(4)])
+    L.append([(3 - i, i, i) for i in range(4)])
+    return L
+
+
+def cell_lines(lines):
+    cl = [[[[] for _ in range(4)] for _ in range(4)] for _ in range(4)]
+    for li, line in enumerate(lines):
+        for (x, y, z) in line:
+            cl[z][y][x].append(li)
+    return cl
+
+
+def line_masks(lines):
+    return [sum(1 << (z * 16 + y * 4 + x) for (x, y, z) in line) for line in lines]
+
+
+def zobrist_keys(seed=ZOBRIST_SEED):
+    """Тот же порядок выборки, что у прежнего MyAI._zobrist_init: z, y, x, игрок; затем ход."""
+    rnd = random.Random(seed)
+    piece = [[[[rnd.getrandbits(64) for _ in range(2)] for _ in range(4)] for _ in range(4)] for _ in range(4)]
+    return piece, rnd.getrandbits(64)
+
+
+def d4_column_perms():
+    """8 симметрий подошвы 4x4 (ось z гравитация фиксирует): столбец c=y*4+x → образ."""
+    maps = [
+        lambda x, y: (x, y), lambda x, y: (3 - y, x),
+        lambda x, y: (3 - x, 3 - y), lambda x, y: (y, 3 - x),
+        lambda x, y: (3 - x, y), lambda x, y: (x, 3 - y),
+        lambda x, y: (y, x), lambda x, y: (3 - y, 3 - x),
+    ]
+    perms = []
+    for f in maps:
+        perm = [0] * 16
+        for y in range(4):
+            for x in range(4):
+                nx, ny = f(x, y)
+                perm[y * 4 + x] = ny * 4 + nx
+        perms.append(perm)
+    return perms
+
+
+# ---------------- литералы ----------------
+# Таблицы хранятся hex-строками и распаковываются одним выражением: такой
+# исходник компилируется в разы быстрее вложенных списков/кортежей (без .pyc
+# сервер и арена компилируют бота на каждом ходу), а распаковка — десятки мкс.
+
+def _hex_literal(name, text, width=76):
+    return wrap_string(name, text, width).rstrip("\n").split("\n")
+
+
+def _render_lines(lines):
+    cells = "".join(f"{z * 16 + y * 4 + x:02x}" for line in lines for (x, y, z) in line)
+    return (["# 76 линий по 4 клетки (i = z*16 + y*4 + x, по 2 hex-цифры)"]
+            + _hex_literal("_LINES_HEX", cells)
+            + ["LINES: List[List[Tuple[int, int, int]]] = [",
+               "    [(c & 3, c >> 2 & 3, c >> 4) for c in bytes.fromhex(_LINES_HEX[i:i + 8])]",
+               "    for i in range(0, len(_LINES_HEX), 8)",
+               "]"])
+
+
+def _render_cell_lines(cl):
+    cells = ",".join("".join(f"{li:02x}" for li in cl[z][y][x])
+                     for z in range(4) for y in range(4) for x in range(4))
+    return (["# индексы линий LINES через клетку: CELL_LINES[z][y][x] (клетки через запятую)"]
+            + _hex_literal("_CELL_LINES_HEX", cells)
+            + ["_cell_lines = [list(bytes.fromhex(h)) for h in _CELL_LINES_HEX.split(\",\")]",
+               "CELL_LINES: List[List[List[List[int]]]] = [",
+               "    [_cell_lines[z * 16 + y * 4:z * 16 + y * 4 + 4] for y in range(4)] for z in range(4)",
+               "]"])
+
+
+def _render_masks(masks):
+    return (["# маски линий LINES (бит i = z*16 + y*4 + x), по 16 hex-цифр"]
+            + _hex_literal("_LINE_MASKS_HEX", "".join(f"{m:016x}" for m in masks))
+            + ["LINE_MASKS: List[int] = [int(_LINE_MASKS_HEX[i:i + 16], 16) "
+               "for i in range(0, len(_LINE_MASKS_HEX), 16)]"])
+
+
+def _render_zobrist(piece, stm):
+    keys = [k for layer in piece for row in layer for cell in row for k in cell] + [stm]
+    return (["# ключи Zobrist: ZOBRIST_PIECE[z][y][x][игрок - 1], ZOBRIST_STM — ход второго"]
+            + _hex_literal("_ZOBRIST_HEX", "".join(f"{k:016x}" for k in keys))
+            + ["_zobrist = [int(_ZOBRIST_HEX[i:i + 16], 16) for i in range(0, len(_ZOBRIST_HEX), 16)]",
+               "ZOBRIST_PIECE: List[List[List[List[int]]]] = [[[",
+               "    _zobrist[(z * 16 + y * 4 + x) * 2:(z * 16 + y * 4 + x) * 2 + 2] for x in range(4)",
+               "] for y in range(4)] for z in range(4)]",
+               "ZOBRIST_STM = _zobrist[128]"])
+
+
+def _render_perms(perms):
+    return (["# 8 симметрий подошвы 4x4 (ось z гравитация фиксирует): столбец c=y*4+x → образ"]
+            + _hex_literal("_COL_PERMS_HEX", "".join(f"{c:x}" for p in perms for c in p))
+            + ["_COL_PERMS: List[List[int]] = [",
+               "    [int(c, 16) for c in _COL_PERMS_HEX[i:i + 16]] for i in range(0, len(_COL_PERMS_HEX), 16)",
+               "]"])
+
+
+def default_lmr():
+    """lmr_table бота при SEARCH_PARAMS по умолчанию."""
+    import local_driver
+    sys.modules.setdefault("framework", local_driver)
+    import mainGPT5ninght
+    return mainGPT5ninght.lmr_table(mainGPT5ninght.SEARCH_PARAMS)
+
+
+def _render_lmr(table):
+    return (["# сокращения LMR [d][idx] при SEARCH_PARAMS по умолчанию, по hex-цифре"]
+            + _hex_literal("_LMR_DEFAULT_HEX", "".join(f"{r:x}" for row in table for r in row))
+            + ["LMR_DEFAULT: List[List[int]] = [",
+               "    [int(c, 16) for c in _LMR_DEFAULT_HEX[i:i + 16]] for i in range(0, len(_LMR_DEFAULT_HEX), 16)",
+               "]"])
+
+
+def render(tables):
+    lines = gen_lines()
+    parts = {
+        "LINES": lambda: _render_lines(lines),
+        "CELL_LINES": lambda: _render_cell_lines(cell_lines(lines)),
+        "LINE_MASKS": lambda: _render_masks(line_masks(lines)),
+        "ZOBRIST": lambda: _render_zobrist(*zobrist_keys()),
+        "COL_PERMS": lambda: _render_perms(d4_column_perms()),
+        "LMR": lambda: _render_lmr(default_lmr()),
+    }
+    out = []
+    for name in tables:
+        out += parts[name]()
+    return "\n".join(out) + "\n"
+
+
+def _section_body(path, name="TABLES"):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    i = text.find(f"# --- BEGIN GENERATED: {name}")
+    j = text.find(f"# --- END GENERATED: {name} ---")
+    if i < 0 or j < 0:
+        raise ValueError(f"{path}: section {name} not found")
+    return text[text.index("\n", i) + 1:j]
+
+
+# ---------------- замер импорта ----------------
+
+_IMPORT_SNIPPET = r"""
+import sys, time
+path = sys.argv[1]
+sys.path.insert(0, sys.argv[2])
+import local_driver
+sys.modules.setdefault("framework", local_driver)
+with open(path, encoding="utf-8") as f:
+    src = f.read()
+t0 = time.perf_counter()
+code = compile(src, path, "exec")
+t1 = time.perf_counter()
+ns = {"__name__": "bot_under_test"}
+exec(code, ns)
+t2 = time.perf_counter()
+ns["MyAI"]()
+t3 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.3f} {(t2 - t1) * 1000:.3f} {(t3 - t2) * 1000:.3f}")
+"""
+
+
+def bench_import(path, runs=20):
+    """
+    Медианы (компиляция, выполнение модуля, MyAI()) в мс — каждый замер в
+    свежем интерпретаторе, как ход на арене. Компиляция — цена импорта без
+    .pyc (PYTHONDONTWRITEBYTECODE, read-only каталог); с кэшем остаётся exec.
+    """
+    rows = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET, path, HERE],
+                             capture_output=True, text=True, check=True).stdout.split()
+        rows.append([float(v) for v in out])
+    return tuple(statistics.median(col) for col in zip(*rows))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Вшить постоянные таблицы в ботов (секция TABLES)")
+    ap.add_argument("--check", action="store_true", help="Только проверить, что секции актуальны")
+    ap.add_argument("--bench", type=int, default=0, metavar="N", help="Замерить импорт ботов (N запусков)")
+    ap.add_argument("--bench-bot", action="append", default=[], help="Дополнительный файл для замера")
+    args = ap.parse_args()
+
+    if args.bench:
+        for path in [os.path.join(HERE, name) for name in TARGETS] + args.bench_bot:
+            comp, run, ctor = bench_import(path, args.bench)
+            print(f"{path}: компиляция {comp:.2f} мс, модуль {run:.3f} мс, MyAI() {ctor:.3f} мс")
+        return 0
+
+    stale = []
+    for name, tables in TARGETS.items():
+        path = os.path.join(HERE, name)
+        body = render(tables)
+        if args.check:
+            if _section_body(path) != body:
+                stale.append(name)
+            continue
+        replace_section(path, "TABLES", body, tool="gen_tables.py")
+        print(f"{name}: {', '.join(tables)}")
+    if stale:
+        print(f"Устарели: {', '.join(stale)} (запусти gen_tables.py)")
+        return 1
+    if args.check:
+        print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
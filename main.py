@@ -1,4 +1,7 @@
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict
+import base64
+import struct
+import time
 try:
     # боевое окружение (сервер)
     from framework import Alg3D, Board
@@ -9,42 +12,48 @@ except Exception:
 
 # ---------- 4x4x4 Connect-Four с гравитацией: утилиты ----------
 
-def gen_lines():
-    """Полный набор из 76 победных линий для 4x4x4."""
-    L = []
-    # По оси X (для каждого y,z)
-    for y in range(4):
-        for z in range(4):
-            L.append([(i, y, z) for i in range(4)])
-    # По оси Y (для каждого x,z)
-    for x in range(4):
-        for z in range(4):
-            L.append([(x, i, z) for i in range(4)])
-    # По оси Z (для каждого x,y)
-    for x in range(4):
-        for y in range(4):
-            L.append([(x, y, i) for i in range(4)])
-    # Диагонали в каждой плоскости z
-    for z in range(4):
-        L.append([(i, i, z) for i in range(4)])
-        L.append([(i, 3 - i, z) for i in range(4)])
-    # Диагонали в каждой плоскости y (x-z)
-    for y in range(4):
-        L.append([(i, y, i) for i in range(4)])
-        L.append([(i, y, 3 - i) for i in range(4)])
-    # Диагонали в каждой плоскости x (y-z)
-    for x in range(4):
-        L.append([(x, i, i) for i in range(4)])
-        L.append([(x, i, 3 - i) for i in range(4)])
-    # 4 пространственные диагонали
-    L.append([(i, i, i) for i in range(4)])
-    L.append([(i, i, 3 - i) for i in range(4)])
-    L.append([(i, 3 - i, i) for i in range(4)])
-    L.append([(3 - i, i, i) for i in range(4)])
-    return L
-
-
-LINES = gen_lines()
+# линии, индексы, ключи — постоянные литералы (gen_tables.py), не строятся при импорте
+# --- BEGIN GENERATED: TABLES (gen_tables.py) ---
+# 76 линий по 4 клетки (i = z*16 + y*4 + x, по 2 hex-цифры)
+_LINES_HEX = (
+    "000102031011121320212223303132330405060714151617242526273435363708090a0b1819"
+    "1a1b28292a2b38393a3b0c0d0e0f1c1d1e1f2c2d2e2f3c3d3e3f0004080c1014181c2024282c"
+    "3034383c0105090d1115191d2125292d3135393d02060a0e12161a1e22262a2e32363a3e0307"
+    "0b0f13171b1f23272b2f33373b3f0010203004142434081828380c1c2c3c0111213105152535"
+    "091929390d1d2d3d02122232061626360a1a2a3a0e1e2e3e03132333071727370b1b2b3b0f1f"
+    "2f3f00050a0f0c09060310151a1f1c19161320252a2f2c29262330353a3f3c39363300112233"
+    "30211203041526373425160708192a3b38291a0b0c1d2e3f3c2d1e0f0014283c3024180c0115"
+    "293d3125190d02162a3e32261a0e03172b3f33271b0f00152a3f30251a0f0c1926330316293c"
+)
+LINES: List[List[Tuple[int, int, int]]] = [
+    [(c & 3, c >> 2 & 3, c >> 4) for c in bytes.fromhex(_LINES_HEX[i:i + 8])]
+    for i in range(0, len(_LINES_HEX), 8)
+]
+# индексы линий LINES через клетку: CELL_LINES[z][y][x] (клетки через запятую)
+_CELL_LINES_HEX = (
+    "00102030384048,00142442,00182844,001c2c3139464b,0410213a,04142530,04182931,0"
+    "41c2d3b,0810223c,08142631,08182a30,081c2e3d,0c1023313e414a,0c142743,0c182b45"
+    ",0c1c2f303f4749,01112032,01152438,01192839,011d2c33,05112140,051525323a4248,"
+    "051929333b444b,051d2d46,09112241,091526333c434a,09192a323d4549,091d2e47,0d11"
+    "2333,0d15273e,0d192b3f,0d1d2f32,02122034,02162439,021a2838,021e2c35,06122141"
+    ",061625343b4349,061a29353a454a,061e2d47,0a122240,0a1626353d424b,0a1a2a343c44"
+    "48,0a1e2e46,0e122335,0e16273f,0e1a2b3e,0e1e2f34,03132036394149,03172443,031b"
+    "2845,031f2c3738474a,0713213b,07172536,071b2937,071f2d3a,0b13223d,0b172637,0b"
+    "1b2a36,0b1f2e3c,0f1323373f404b,0f172742,0f1b2b44,0f1f2f363e4648"
+)
+_cell_lines = [list(bytes.fromhex(h)) for h in _CELL_LINES_HEX.split(",")]
+CELL_LINES: List[List[List[List[int]]]] = [
+    [_cell_lines[z * 16 + y * 4:z * 16 + y * 4 + 4] for y in range(4)] for z in range(4)
+]
+# 8 симметрий подошвы 4x4 (ось z гравитация фиксирует): столбец c=y*4+x → образ
+_COL_PERMS_HEX = (
+    "0123456789abcdef37bf26ae159d048cfedcba9876543210c840d951ea62fb7332107654ba98"
+    "fedccdef89ab45670123048c159d26ae37bffb73ea62d951c840"
+)
+_COL_PERMS: List[List[int]] = [
+    [int(c, 16) for c in _COL_PERMS_HEX[i:i + 16]] for i in range(0, len(_COL_PERMS_HEX), 16)
+]
+# --- END GENERATED: TABLES ---
 
 
 def drop_z(board: List[List[List[int]]], x: int, y: int) -> Optional[int]:
@@ -81,6 +90,13 @@ def valid_moves(board: List[List[List[int]]]):
                 yield (x, y)
 
 
+# --- BEGIN GENERATED: EVAL_WEIGHTS (tune_eval.py) ---
+EVAL_WEIGHTS = (4, 40, 240, 1, 1)
+# --- END GENERATED: EVAL_WEIGHTS ---
+# открытые линии с 1/2/3 камнями одного цвета, центр (3..0), высота z
+W_LINE1, W_LINE2, W_LINE3, W_CENTER, W_HEIGHT = EVAL_WEIGHTS
+
+
 def eval_board(board: List[List[List[int]]], me: int) -> int:
     """Лёгкая оценка: центр+высота + потенциалы линий (1/2/3 в ряд)."""
     opp = 3 - me
@@ -101,7 +117,7 @@ def eval_board(board: List[List[List[int]]], me: int) -> int:
                     continue
                 cent = 3 - int(abs(x - 1.5) + abs(y - 1.5))  # ближе к центру — лучше
                 h = z                                       # выше — немного лучше
-                s = cent + h
+                s = W_CENTER * cent + W_HEIGHT * h
                 score += s if p == me else -s
 
     # Потенциалы линий
@@ -122,26 +138,256 @@ def eval_board(board: List[List[List[int]]], me: int) -> int:
         theirs = c2 if me == 1 else c1
         if theirs == 0:
             if mine == 3:
-                score += 240  # чуть усилили
+                score += W_LINE3
             elif mine == 2:
-                score += 40
+                score += W_LINE2
             elif mine == 1:
-                score += 4
+                score += W_LINE1
         elif mine == 0:
             if theirs == 3:
-                score -= 240
+                score -= W_LINE3
             elif theirs == 2:
-                score -= 40
+                score -= W_LINE2
             elif theirs == 1:
-                score -= 4
+                score -= W_LINE1
     return score
 
 
+# ---------- Нейросетевая оценка (NNUE-подобная, обучается офлайн: train_nnue.py) ----------
+# Вход — 128 признаков (клетка i = z*16+y*4+x × игрок 1/2), скрытый слой
+# hidden нейронов с clipped ReLU [0, NNUE_QA], выход — оценка за игрока 1.
+# Первый слой — аккумулятор: сумма строк W1 по занятым клеткам + b1;
+# ход добавляет одну строку (копией, откат бесплатен), лист считает
+# одно скалярное произведение на w2. Веса — int16 (struct "<h"), base64.
+# Пустая строка весов → бот оценивает eval_board.
+
+# --- BEGIN GENERATED: NNUE_WEIGHTS (train_nnue.py) ---
+_NNUE_B64 = ""
+# --- END GENERATED: NNUE_WEIGHTS ---
+
+NNUE_QA = 64        # масштаб аккумулятора: 1.0 активации = 64
+NNUE_CLAMP = 5_000  # |оценка| сети < побед (10_000 - глубина)
+
+
+def _decode_nnue(text: str):
+    """base64 "<HH" (входы, скрытые) + int16 W1, b1, w2 + int32 b2 → (W1 построчно, b1, w2, b2)."""
+    if not text:
+        return None
+    blob = base64.b64decode(text)
+    n_in, hidden = struct.unpack_from("<HH", blob, 0)
+    n = n_in * hidden + 2 * hidden
+    vals = struct.unpack_from(f"<{n}h", blob, 4)
+    (b2,) = struct.unpack_from("<i", blob, 4 + 2 * n)
+    rows = [list(vals[i * hidden:(i + 1) * hidden]) for i in range(n_in)]
+    b1 = list(vals[n_in * hidden:n_in * hidden + hidden])
+    w2 = list(vals[n_in * hidden + hidden:])
+    return rows, b1, w2, b2
+
+
+_NNUE = _decode_nnue(_NNUE_B64)
+
+
+def nnue_refresh(board: List[List[List[int]]], net=None) -> List[int]:
+    """Аккумулятор с нуля (корень поиска)."""
+    rows, b1, _w2, _b2 = net or _NNUE
+    acc = list(b1)
+    for z in range(4):
+        for y in range(4):
+            for x in range(4):
+                p = board[z][y][x]
+                if p:
+                    acc = [a + w for a, w in zip(acc, rows[(z * 16 + y * 4 + x) * 2 + p - 1])]
+    return acc
+
+
+def nnue_push(acc: List[int], x: int, y: int, z: int, p: int, net=None) -> List[int]:
+    """Аккумулятор после хода p в (x,y,z) — новый список, исходный не меняется."""
+    row = (net or _NNUE)[0][(z * 16 + y * 4 + x) * 2 + p - 1]
+    return [a + w for a, w in zip(acc, row)]
+
+
+def nnue_output(acc: List[int], net=None) -> int:
+    """Оценка за игрока 1 по готовому аккумулятору."""
+    _rows, _b1, w2, b2 = net or _NNUE
+    s = b2 * NNUE_QA
+    for a, w in zip(acc, w2):
+        if a > 0:
+            s += w * (a if a < NNUE_QA else NNUE_QA)
+    s //= NNUE_QA
+    return NNUE_CLAMP if s > NNUE_CLAMP else (-NNUE_CLAMP if s < -NNUE_CLAMP else s)
+
+
+# ---------- Дебютная книга (строится офлайн: book_builder.py) ----------
+
+# --- BEGIN GENERATED: OPENING_BOOK (book_builder.py) ---
+_OPENING_BOOK_B64 = (
+    "AAAAAAAAAAADAQAAAAAAAAAGBAAAAAAAAAAPCQAAAAAAAAAFIQAAAAAAAAAMQgAAAAAAAAAPQAIA"
+    "AAAAAAADAAQAAAAAAAAPAQgAAAAAAAAFQAgAAAAAAAAMQQgAAAAAAAAFRAgAAAAAAAAAUAgAAAAA"
+    "AAABQAkAAAAAAAAFQBgAAAAAAAAFASEAAAAAAAAMgQABAAAAAAAMhAABAAAAAAAPkAABAAAAAAAM"
+    "gAEBAAAAAAAPgAQBAAAAAAAAQAgBAAAAAAAMgBABAAAAAAAGASABAAAAAAAEgEABAAAAAAADQAAC"
+    "AAAAAAAMgQAEAAAAAAADhAAEAAAAAAAFkAAEAAAAAAAPgAEEAAAAAAAAgAQEAAAAAAANQAgEAAAA"
+    "AAAFgBAEAAAAAAAGASAEAAAAAAAGgAAFAAAAAAAPQAAIAAAAAAAMQQAIAAAAAAAKAUAIAAAAAAAP"
+    "gAARAAAAAAAAQAAhAAAAAAAPAgBBAAAAAAADgAAAAQAAAAAPQAgAAQAAAAAOgAABAQAAAAAAgAAE"
+    "AQAAAAAPAgBAAQAAAAAFBEAAAgAAAAADEEAAAgAAAAAPASAAAAEAAAAMAgAQAAEAAAADAgBAAAEA"
+    "AAADAQAAAAIAAAADBAAAgAQAAAADQAgAAAAEAAAGAAQAgAAEAAAF"
+)
+# --- END GENERATED: OPENING_BOOK ---
+
+_MASK64 = (1 << 64) - 1
+
+
+def _decode_book(text: str) -> Dict[int, int]:
+    """base64 записей struct "<QB" → {ключ позиции: столбец в канонической системе}."""
+    blob = base64.b64decode(text) if text else b""
+    return {k: c for k, c in struct.iter_unpack("<QB", blob)}
+
+
+_OPENING_BOOK = _decode_book(_OPENING_BOOK_B64)
+
+
+def book_move(board: List[List[List[int]]]) -> Optional[Tuple[int, int]]:
+    """Ход из книги: канон позиции = минимальный 2-битный код по 8 симметриям."""
+    if not _OPENING_BOOK:
+        return None
+    cells = [(z * 16 + y * 4 + x, board[z][y][x])
+             for z in range(4) for y in range(4) for x in range(4) if board[z][y][x] != 0]
+    best_code, best_t = None, 0
+    for t, perm in enumerate(_COL_PERMS):
+        code = 0
+        for i, v in cells:
+            code |= v << (2 * ((i // 16) * 16 + perm[i % 16]))
+        if best_code is None or code < best_code:
+            best_code, best_t = code, t
+    key = (best_code & _MASK64) ^ (((best_code >> 64) * 0x9E3779B97F4A7C15) & _MASK64)
+    c = _OPENING_BOOK.get(key)
+    if c is None:
+        return None
+    perm = _COL_PERMS[best_t]
+    orig = perm.index(c)
+    return (orig % 4, orig // 4)
+
+
+# ---------------------- Тактический анализ (один проход) ----------------------
+
+
+class Tactics:
+    """
+    Тактическая сводка позиции (ход за player), считается analyze_tactics:
+      wins[p]  — ходы p, выигрывающие сразу (win / block);
+      forks[p] — ходы p, после которых у p ≥2 выигрышных столбцов,
+                 а у соперника нет мгновенной победы;
+      safe     — ходы player, после которых соперник не выигрывает сразу.
+    Все списки — в порядке valid_moves.
+    Сверка с прежней прелюдией get_move — check_tactics.py.
+    """
+
+    __slots__ = ("player", "wins", "forks", "safe")
+
+    def __init__(self, player: int):
+        self.player = player
+        self.wins: Dict[int, List[Tuple[int, int]]] = {1: [], 2: []}
+        self.forks: Dict[int, List[Tuple[int, int]]] = {1: [], 2: []}
+        self.safe: List[Tuple[int, int]] = []
+
+
+def analyze_tactics(board: Board, player: int) -> Tactics:
+    """
+    Вместо winner() (76 линий) на каждый пробный ход — счётчики камней по
+    линиям. Клетка выигрывает для p, если через неё идёт линия с тремя
+    камнями p и без камней соперника. Пробный ход меняет только линии
+    через свою клетку и верх своего столбца, так что вся сводка для обеих
+    сторон — O(ходы × ходы × линии_через_клетку) без копий доски.
+    """
+    n_lines = len(LINES)
+    cnt = {1: [0] * n_lines, 2: [0] * n_lines}
+    for li, line in enumerate(LINES):
+        for (x, y, z) in line:
+            v = board[z][y][x]
+            if v == 1 or v == 2:
+                cnt[v][li] += 1
+    # верхние свободные клетки столбцов, в порядке valid_moves
+    tops = [(x, y, drop_z(board, x, y)) for (x, y) in valid_moves(board)]
+
+    def wins_of(p: int, cells) -> List[Tuple[int, int]]:
+        mine, theirs = cnt[p], cnt[3 - p]
+        out = []
+        for (x, y, z) in cells:
+            for li in CELL_LINES[z][y][x]:
+                if mine[li] == 3 and theirs[li] == 0:
+                    out.append((x, y))
+                    break
+        return out
+
+    def has_win(p: int, cells) -> bool:
+        mine, theirs = cnt[p], cnt[3 - p]
+        for (x, y, z) in cells:
+            for li in CELL_LINES[z][y][x]:
+                if mine[li] == 3 and theirs[li] == 0:
+                    return True
+        return False
+
+    t = Tactics(player)
+    t.wins[1] = wins_of(1, tops)
+    t.wins[2] = wins_of(2, tops)
+    for s in (player, 3 - player):
+        row = cnt[s]
+        for i, (x, y, z) in enumerate(tops):
+            lines = CELL_LINES[z][y][x]
+            for li in lines:
+                row[li] += 1
+            cells = tops[:i] + tops[i + 1:]
+            if z < 3:
+                cells.append((x, y, z + 1))
+            if not has_win(3 - s, cells):
+                if s == player:
+                    t.safe.append((x, y))
+                if len(wins_of(s, cells)) >= 2:
+                    t.forks[s].append((x, y))
+            for li in lines:
+                row[li] -= 1
+    return t
+
+
+# ------------------------- Статистика поиска -------------------------
+
+class SearchStats:
+    """
+    Счётчики одного get_move (MyAI(collect_stats=True)). При выключенном
+    сборе MyAI.stats = None, а в поиске остаётся только `st is not None`.
+    """
+
+    def __init__(self):
+        self.stage = ""
+        self.nodes = 0
+        self.cutoffs_by_index = [0] * 16
+        self.depth = 0
+        self.best_value = 0
+        self.cpu = 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "stage": self.stage,
+            "nodes": self.nodes,
+            "cutoffs": sum(self.cutoffs_by_index),
+            "first_move_cutoffs": self.cutoffs_by_index[0],
+            "depth": self.depth,
+            "best_value": self.best_value,
+            "cutoffs_by_index": list(self.cutoffs_by_index),
+        }
+
+
 # ------------------------------- ИИ -------------------------------
 
 class MyAI(Alg3D):
-    def __init__(self, depth: int = 2):
+    def __init__(self, depth: int = 2, collect_stats: bool = False, use_nnue: bool = True):
         self.depth = depth
+        # листья оценивает сеть, если её веса вшиты (иначе eval_board)
+        self.use_nnue = use_nnue
+        # статистика последнего get_move (None, если сбор выключен)
+        self.collect_stats = collect_stats
+        self.stats: Optional[SearchStats] = None
+        # тактические сводки по коду позиции (живут между ходами партии)
+        self._tactics_cache: Dict[int, Tactics] = {}
 
 
     # --- роль-зависимые дебюты (первый/второй ход) ---
@@ -196,133 +442,22 @@ class MyAI(Alg3D):
 
     # --- примитивы ---
 
-    def _immediate_win(self, board: Board, player: int) -> Optional[Tuple[int, int]]:
-        """Есть ли ход, который выигрывает сразу."""
-        for (x, y) in valid_moves(board):
-            z = drop_z(board, x, y)
-            if z is None:
-                continue
-            board[z][y][x] = player
-            if winner(board) == player:
-                board[z][y][x] = 0
-                return (x, y)
-            board[z][y][x] = 0
-        return None
+    TACTICS_CACHE_SIZE = 4096
 
-    def _my_immediate_wins_in_position(self, board: Board, player: int) -> List[Tuple[int,int]]:
-        """Вернуть все (x,y), которыми я выиграю немедленно в текущей позиции."""
-        wins = []
-        for (x, y) in valid_moves(board):
-            z = drop_z(board, x, y)
-            if z is None:
-                continue
-            board[z][y][x] = player
-            if winner(board) == player:
-                wins.append((x, y))
-            board[z][y][x] = 0
-        return wins
-
-    def _creates_fork(self, board: Board, player: int, x: int, y: int) -> bool:
-        """
-        Проверка «двойной угрозы» (fork):
-        после нашего хода у нас ≥2 разных немедленных выигрыша (если бы мы ходили сразу).
-        Оппонент может закрыть только один.
-        """
-        z = drop_z(board, x, y)
-        if z is None:
-            return False
-        board[z][y][x] = player
-
-        # Безопасность: не отдаём opp немедленный win
-        opp = 3 - player
-        opp_win = self._immediate_win(board, opp)
-        if opp_win is not None:
-            board[z][y][x] = 0
-            return False
-
-        my_wins = self._my_immediate_wins_in_position(board, player)
-        board[z][y][x] = 0
-        # Должно быть как минимум 2 в разных столбцах
-        if len(my_wins) < 2:
-            return False
-        cols = {(cx, cy) for (cx, cy) in my_wins}
-        return len(cols) >= 2
-
-    def _find_own_fork(self, board: Board, player: int) -> Optional[Tuple[int,int]]:
-        for (x, y) in valid_moves(board):
-            if self._creates_fork(board, player, x, y):
-                return (x, y)
-        return None
-
-    def _find_block_opp_fork(self, board: Board, player: int) -> Optional[Tuple[int,int]]:
-        """Если у соперника есть форк-ход, попробуем его заблокировать или контрфоркнуть."""
-        opp = 3 - player
-
-        # Список всех opp-форков
-        opp_forks = []
-        for (x, y) in valid_moves(board):
-            if self._creates_fork(board, opp, x, y):
-                opp_forks.append((x, y))
-        if not opp_forks:
-            return None
-
-        # 1) Если есть ход, который уничтожает ВСЕ opp-форки (или создаёт наш мгновенный win/форк)
-        #    — берём такой.
-        # 1a) наш немедленный win/форк — приоритет
-        my_win = self._immediate_win(board, player)
-        if my_win:
-            return my_win
-        my_fork = self._find_own_fork(board, player)
-        if my_fork:
-            return my_fork
-
-        # 1b) блок: попробуем походить в один из opp-форк-столбцов
-        for (bx, by) in opp_forks:
-            z = drop_z(board, bx, by)
-            if z is not None:
-                # простой блок
-                return (bx, by)
-
-        # 2) если не можем прямым блоком — ищем «мешающий» ход:
-        #    ход, после которого у opp не останется немедленного форка
-        for (x, y) in valid_moves(board):
-            z = drop_z(board, x, y)
-            if z is None:
-                continue
-            board[z][y][x] = player
-            # после нашего хода у opp ещё есть форк?
-            still_fork = False
-            for (ox, oy) in valid_moves(board):
-                if self._creates_fork(board, opp, ox, oy):
-                    still_fork = True
-                    break
-            board[z][y][x] = 0
-            if not still_fork:
-                return (x, y)
-
-        # fallback: хотя бы блокируем один из их форков
-        return opp_forks[0]
-
-    def _is_safe(self, board: Board, player: int, x: int, y: int) -> bool:
-        """После нашего хода соперник не получает немедленную победу."""
-        opp = 3 - player
-        z = drop_z(board, x, y)
-        if z is None:
-            return False
-        board[z][y][x] = player
-        safe = True
-        for (ox, oy) in valid_moves(board):
-            oz = drop_z(board, ox, oy)
-            if oz is None:
-                continue
-            board[oz][oy][ox] = opp
-            if winner(board) == opp:
-                safe = False
-            board[oz][oy][ox] = 0
-            if not safe:
-                break
-        board[z][y][x] = 0
-        return safe
+    def _tactics(self, board: Board, player: int) -> Tactics:
+        """analyze_tactics с мемоизацией по 2-битному коду позиции и стороне хода."""
+        key = player
+        for z in range(4):
+            for y in range(4):
+                for x in range(4):
+                    key = (key << 2) | board[z][y][x]
+        t = self._tactics_cache.get(key)
+        if t is None:
+            if len(self._tactics_cache) >= self.TACTICS_CACHE_SIZE:
+                self._tactics_cache.clear()
+            t = analyze_tactics(board, player)
+            self._tactics_cache[key] = t
+        return t
 
     # --- мини alpha-beta (d=2) ---
 
@@ -331,43 +466,58 @@ class MyAI(Alg3D):
 
         # центр-сначала
         candidates = sorted(candidates, key=lambda m: (abs(m[0] - 1.5) + abs(m[1] - 1.5)))
+        st = self.stats
 
-        def ab(pl: int, d: int, a: int, b: int) -> int:
+        net = _NNUE if self.use_nnue else None
+        sign = 1 if player == 1 else -1
+
+        def ab(pl: int, d: int, a: int, b: int, acc) -> int:
+            if st is not None:
+                st.nodes += 1
             w = winner(board)
             if w == player:
                 return 10_000 - (2 - d)
             if w == opp:
                 return -10_000 + (2 - d)
             if d == 0 or board_full(board):
-                return eval_board(board, player)
+                if acc is None:
+                    return eval_board(board, player)
+                return sign * nnue_output(acc, net)
 
             if pl == player:
                 v = -10**9
-                for (x, y) in candidates:
+                for idx, (x, y) in enumerate(candidates):
                     z = drop_z(board, x, y)
                     if z is None:
                         continue
                     board[z][y][x] = pl
-                    v = max(v, ab(opp, d - 1, a, b))
+                    child = None if acc is None else nnue_push(acc, x, y, z, pl, net)
+                    v = max(v, ab(opp, d - 1, a, b, child))
                     board[z][y][x] = 0
                     a = max(a, v)
                     if b <= a:
+                        if st is not None:
+                            st.cutoffs_by_index[idx] += 1
                         break
                 return v
             else:
                 v = 10**9
-                for (x, y) in candidates:
+                for idx, (x, y) in enumerate(candidates):
                     z = drop_z(board, x, y)
                     if z is None:
                         continue
                     board[z][y][x] = pl
-                    v = min(v, ab(player, d - 1, a, b))
+                    child = None if acc is None else nnue_push(acc, x, y, z, pl, net)
+                    v = min(v, ab(player, d - 1, a, b, child))
                     board[z][y][x] = 0
                     b = min(b, v)
                     if b <= a:
+                        if st is not None:
+                            st.cutoffs_by_index[idx] += 1
                         break
                 return v
 
+        root_acc = None if net is None else nnue_refresh(board, net)
         best = candidates[0]
         bestv = -10**9
         for (x, y) in candidates:
@@ -375,10 +525,14 @@ class MyAI(Alg3D):
             if z is None:
                 continue
             board[z][y][x] = player
-            v = ab(opp, self.depth - 1, -10**9, 10**9)
+            child = None if root_acc is None else nnue_push(root_acc, x, y, z, player, net)
+            v = ab(opp, self.depth - 1, -10**9, 10**9, child)
             board[z][y][x] = 0
             if v > bestv:
                 bestv, best = v, (x, y)
+        if st is not None:
+            st.depth = self.depth
+            st.best_value = bestv
         return best
 
     # --- главный метод ---
@@ -390,11 +544,20 @@ class MyAI(Alg3D):
         last_move: Tuple[int, int, int]
     ) -> Tuple[int, int]:
         """Приоритет: win → block → собственный fork → блок opp-fork → safe → alpha-beta(d=2) → fallback."""
+        st = SearchStats() if self.collect_stats else None
+        self.stats = st
+        cpu_start = time.process_time()
+        stage = "fallback"
         try:
             # --- Определяем, это мой первый ход в партии и кто вышел первым ---
             total_my = sum(1 for z in range(4) for y in range(4) for x in range(4) if board[z][y][x] == player)
             total_opp = sum(1 for z in range(4) for y in range(4) for x in range(4) if board[z][y][x] == (3 - player))
             is_my_first_turn = (total_my == 0)
+            # книга (если позиция в ней есть) — раньше любых эвристик
+            mv = book_move(board)
+            if mv is not None:
+                stage = "book"
+                return self._validate_move(board, mv[0], mv[1])
             try_open = None
             if is_my_first_turn:
                 if total_opp == 0:
@@ -404,47 +567,42 @@ class MyAI(Alg3D):
                     # Я второй: отвечаю на дебют соперника
                     try_open = self._opening_second(board, player, last_move)
             if try_open is not None:
+                stage = "opening"
                 return self._validate_move(board, try_open[0], try_open[1])
             # 0) микробук (старт белыми) — чуть чаще даёт зацепку под форк
             #    не жёстко, просто небольшой приоритет
             if all(board[0][y][x] == 0 for x in range(4) for y in range(4)):
                 for pref in [(1,1), (2,2), (1,2), (2,1)]:
                     if drop_z(board, *pref) is not None:
+                        stage = "opening"
                         return self._validate_move(board, *pref)
 
-            # 1) мгновенная победа
-            mv = self._immediate_win(board, player)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
+            # 1-5) тактика одним проходом: win → block → свой форк → блок opp-форка → safe
+            tac = self._tactics(board, player)
             opp = 3 - player
-
-            # 2) мгновенный блок
-            mv = self._immediate_win(board, opp)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
-            # 3) собственный форк (двойная угроза)
-            mv = self._find_own_fork(board, player)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
-            # 4) блок чужого форка (или контрфорк)
-            mv = self._find_block_opp_fork(board, player)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
-            # 5) кандидаты (safe-filter). Если safe-пусто — берём все валидные
-            cands = [m for m in valid_moves(board) if self._is_safe(board, player, m[0], m[1])]
+            for mvs, name in ((tac.wins[player], "win"), (tac.wins[opp], "block"),
+                              (tac.forks[player], "fork"), (tac.forks[opp], "block_fork")):
+                if mvs:
+                    stage = name
+                    return self._validate_move(board, mvs[0][0], mvs[0][1])
+
+            # кандидаты (safe-filter). Если safe-пусто — берём все валидные
+            cands = list(tac.safe)
             if not cands:
                 cands = list(valid_moves(board))
             if not cands:
                 return (0, 0)  # поле заполнено
 
             # 6) лёгкий alpha-beta на 2 полухода по кандидатам
+            stage = "search"
             x, y = self._alpha_beta_best(board, player, cands)
             return self._validate_move(board, x, y)
 
         except Exception:
             # Любая ошибка → гарантированный валидный ход
+            stage = "error"
             return self._first_legal_move(board)
+        finally:
+            if st is not None:
+                st.stage = stage
+                st.cpu = time.process_time() - cpu_start
@@ -1,6 +1,6 @@
-from typing import List, Tuple, Optional, Dict
+from typing import Callable, List, Tuple, Optional, Dict
+import math
 import time
-import random
 
 # Попытка взять типы из боевого/локального окружения фреймворка
 try:
@@ -16,42 +16,117 @@ except Exception:
 
 # ---------------------- 4x4x4 Connect-Four: утилиты ----------------------
 
-def gen_lines():
-    """Полный набор из 76 победных линий для 4x4x4."""
-    L = []
-    # По оси X (для каждого y, z)
-    for y in range(4):
-        for z in range(4):
-            L.append([(i, y, z) for i in range(4)])
-    # По оси Y (для каждого x, z)
-    for x in range(4):
-        for z in range(4):
-            L.append([(x, i, z) for i in range(4)])
-    # По оси Z (для каждого x, y)
-    for x in range(4):
-        for y in range(4):
-            L.append([(x, y, i) for i in range(4)])
-    # Диагонали в каждой плоскости z (x-y)
-    for z in range(4):
-        L.append([(i, i, z) for i in range(4)])
-        L.append([(i, 3 - i, z) for i in range(4)])
-    # Диагонали в каждой плоскости y (x-z)
-    for y in range(4):
-        L.append([(i, y, i) for i in range(4)])
-        L.append([(i, y, 3 - i) for i in range(4)])
-    # Диагонали в каждой плоскости x (y-z)
-    for x in range(4):
-        L.append([(x, i, i) for i in range(4)])
-        L.append([(x, i, 3 - i) for i in range(4)])
-    # 4 пространственные диагонали
-    L.append([(i, i, i) for i in range(4)])
-    L.append([(i, i, 3 - i) for i in range(4)])
-    L.append([(i, 3 - i, i) for i in range(4)])
-    L.append([(3 - i, i, i) for i in range(4)])
-    return L
-
-
-LINES = gen_lines()
+# линии, индексы, ключи — постоянные литералы (gen_tables.py), не строятся при импорте
+# --- BEGIN GENERATED: TABLES (gen_tables.py) ---
+# 76 линий по 4 клетки (i = z*16 + y*4 + x, по 2 hex-цифры)
+_LINES_HEX = (
+    "000102031011121320212223303132330405060714151617242526273435363708090a0b1819"
+    "1a1b28292a2b38393a3b0c0d0e0f1c1d1e1f2c2d2e2f3c3d3e3f0004080c1014181c2024282c"
+    "3034383c0105090d1115191d2125292d3135393d02060a0e12161a1e22262a2e32363a3e0307"
+    "0b0f13171b1f23272b2f33373b3f0010203004142434081828380c1c2c3c0111213105152535"
+    "091929390d1d2d3d02122232061626360a1a2a3a0e1e2e3e03132333071727370b1b2b3b0f1f"
+    "2f3f00050a0f0c09060310151a1f1c19161320252a2f2c29262330353a3f3c39363300112233"
+    "30211203041526373425160708192a3b38291a0b0c1d2e3f3c2d1e0f0014283c3024180c0115"
+    "293d3125190d02162a3e32261a0e03172b3f33271b0f00152a3f30251a0f0c1926330316293c"
+)
+LINES: List[List[Tuple[int, int, int]]] = [
+    [(c & 3, c >> 2 & 3, c >> 4) for c in bytes.fromhex(_LINES_HEX[i:i + 8])]
+    for i in range(0, len(_LINES_HEX), 8)
+]
+# индексы линий LINES через клетку: CELL_LINES[z][y][x] (клетки через запятую)
+_CELL_LINES_HEX = (
+    "00102030384048,00142442,00182844,001c2c3139464b,0410213a,04142530,04182931,0"
+    "41c2d3b,0810223c,08142631,08182a30,081c2e3d,0c1023313e414a,0c142743,0c182b45"
+    ",0c1c2f303f4749,01112032,01152438,01192839,011d2c33,05112140,051525323a4248,"
+    "051929333b444b,051d2d46,09112241,091526333c434a,09192a323d4549,091d2e47,0d11"
+    "2333,0d15273e,0d192b3f,0d1d2f32,02122034,02162439,021a2838,021e2c35,06122141"
+    ",061625343b4349,061a29353a454a,061e2d47,0a122240,0a1626353d424b,0a1a2a343c44"
+    "48,0a1e2e46,0e122335,0e16273f,0e1a2b3e,0e1e2f34,03132036394149,03172443,031b"
+    "2845,031f2c3738474a,0713213b,07172536,071b2937,071f2d3a,0b13223d,0b172637,0b"
+    "1b2a36,0b1f2e3c,0f1323373f404b,0f172742,0f1b2b44,0f1f2f363e4648"
+)
+_cell_lines = [list(bytes.fromhex(h)) for h in _CELL_LINES_HEX.split(",")]
+CELL_LINES: List[List[List[List[int]]]] = [
+    [_cell_lines[z * 16 + y * 4:z * 16 + y * 4 + 4] for y in range(4)] for z in range(4)
+]
+# маски линий LINES (бит i = z*16 + y*4 + x), по 16 hex-цифр
+_LINE_MASKS_HEX = (
+    "000000000000000f00000000000f00000000000f00000000000f000000000000000000000000"
+    "00f00000000000f00000000000f00000000000f00000000000000000000000000f0000000000"
+    "0f00000000000f00000000000f00000000000000000000000000f00000000000f00000000000"
+    "f00000000000f000000000000000000000000000111100000000111100000000111100000000"
+    "1111000000000000000000000000222200000000222200000000222200000000222200000000"
+    "0000000000000000444400000000444400000000444400000000444400000000000000000000"
+    "0000888800000000888800000000888800000000888800000000000000010001000100010010"
+    "0010001000100100010001000100100010001000100000020002000200020020002000200020"
+    "0200020002000200200020002000200000040004000400040040004000400040040004000400"
+    "0400400040004000400000080008000800080080008000800080080008000800080080008000"
+    "8000800000000000000084210000000000001248000000008421000000000000124800000000"
+    "8421000000000000124800000000842100000000000012480000000000000008000400020001"
+    "0001000200040008008000400020001000100020004000800800040002000100010002000400"
+    "0800800040002000100010002000400080001000010000100001000100100100100020000200"
+    "0020000200020020020020004000040000400004000400400400400080000800008000080008"
+    "0080080080008000040000200001000100200400800000080040020010001000020000400008"
+)
+LINE_MASKS: List[int] = [int(_LINE_MASKS_HEX[i:i + 16], 16) for i in range(0, len(_LINE_MASKS_HEX), 16)]
+# ключи Zobrist: ZOBRIST_PIECE[z][y][x][игрок - 1], ZOBRIST_STM — ход второго
+_ZOBRIST_HEX = (
+    "950e87d7f56066152c61275c9e6b6cf81f00bca0042db9236dbca290a9eab7064c10a4fe30cf"
+    "fddaf26fff4cc4fd394d6814a2bc786a6d2da26b351e6c8042c554760e7fbc051c6cd4c08880"
+    "a5a4666d29610ae0eed8f1e7c34bd8e2fe5213e56c50afb6e9fb123d6f28d015a2aa0b9d4e38"
+    "5994ebac94af194f9545adba52cec675ce05588f882f57de8c051d4b7ef2d998efd82733e933"
+    "6df216c33f8f320111dc6f3fcb57d5d88860a84722025e0533176469aa6ef630607507ebc5b8"
+    "64d77a2f11088d29b146da10faaa6fc24b832de288f12fcb9940b98937dfef041066dd4b712e"
+    "d355871ec5b790314a2e322407fdc889fa017ed781eeadd71198bf153a46305c425a7de1aaab"
+    "c8d366e0440d3371364fc51d1a5e4763dd191ac44b70016590c55646e6d00b7a6e1d81e4b9e7"
+    "e5a2a8bef16e981a1167fba4a29279793d01ac0f1b534b87d27a5f0f5532c867ee26cbc0358b"
+    "24d39bdb39b2ca3c6a008de06fbe1a741555d6257b492186c8b5dee7539c539445f34307513f"
+    "1ec1b0b11d790bcaeffd4d2dde18f50a43cf423ad36c78ab3537a84464b5e3f81a293b3be8ee"
+    "f3d67646f8a9a88d379db047719df177d49f03ddc3bfa745fdd552965bcad0b6a46a7048daca"
+    "fce79398852e0400760c9b756320dbe34e52b41980271e94293f65848aa18f43520e015e444e"
+    "d0f2793ff51bb0baf0297ad955568f86a26a1c720603ec8602d9d08e7565d487d34231028829"
+    "0b43dbfbd50ca99e8e59ea076c24e82c6dbbac73b7a13dce8e4595dfe91b8ec1f011e6339293"
+    "bf4aed9a76b975c33f8fcb8031fe1e7c31d3859892965574e314ddfc20fed17dad339930e76e"
+    "acfbba2a3f8666eea4e307830deef0078fcd110ce94f47b0e1660a4195d74835d6d91d39227d"
+    "512d2abb018969cbe6eb09cea2a86a9218433fe9e76493a8b5d8602f8e87d16bc8bee376bd78"
+    "d7304cb6748781c961ef7dfcff5e243c496a590b089934a93d71d0583deadc7d1d2e1a2ee443"
+    "e6031233f1e05ab59d10b4a20569658141e73ede6f12f5d46d8127762b7bad1dd1408b87cfcb"
+    "f9afa64760083c7db7a68aa8611b9b59d828056ea86fc09c1c0ae9a87893032b34c8a05ca34b"
+    "e96ac966aed65a10eeaf6b7e21f0921082df6e5d9a3007c331a33a0806a754f579830a07a198"
+    "f7767fd6f0723a8383f43dc4fb65e62582414d3f504516f2106025b5a0d72f15feb859eb1156"
+    "00523ea6fb4d1be3ae0c3b97b6c95fe2b11364b977565a8a944097dea5e8c330642bbf1317f8"
+    "f0b02956ff594f79a4002d902b1b1e58ba351d1d2912ab9f56761e8879073c593912a0fca373"
+    "e01bec004af1d0efd4ff8919551203d33d8764f85da91a44dfa021d287d8efb4cad11732b75d"
+    "08d7549627623245c6251a5c987abb69ec5093daea45cdaf628e21c80272834f4d8a9084ab69"
+    "9ad2c231185b"
+)
+_zobrist = [int(_ZOBRIST_HEX[i:i + 16], 16) for i in range(0, len(_ZOBRIST_HEX), 16)]
+ZOBRIST_PIECE: List[List[List[List[int]]]] = [[[
+    _zobrist[(z * 16 + y * 4 + x) * 2:(z * 16 + y * 4 + x) * 2 + 2] for x in range(4)
+] for y in range(4)] for z in range(4)]
+ZOBRIST_STM = _zobrist[128]
+# 8 симметрий подошвы 4x4 (ось z гравитация фиксирует): столбец c=y*4+x → образ
+_COL_PERMS_HEX = (
+    "0123456789abcdef37bf26ae159d048cfedcba9876543210c840d951ea62fb7332107654ba98"
+    "fedccdef89ab45670123048c159d26ae37bffb73ea62d951c840"
+)
+_COL_PERMS: List[List[int]] = [
+    [int(c, 16) for c in _COL_PERMS_HEX[i:i + 16]] for i in range(0, len(_COL_PERMS_HEX), 16)
+]
+# сокращения LMR [d][idx] при SEARCH_PARAMS по умолчанию, по hex-цифре
+_LMR_DEFAULT_HEX = (
+    "0000000000000000000000000000000000000000000000000001111111111111000111111222"
+    "2222000111122222222200011122222222220001122222222233000112222222333300012222"
+    "2233333300012222233333330001222223333333000122223333333300012222333333330001"
+    "2223333333330001222333333333000222233333333300022233333333330002223333333333"
+    "0002223333333333000222333333333300022233333333330002223333333333000223333333"
+    "3333000223333333333300022333333333330002233333333333000223333333333300022333"
+    "333333330002233333333333000223333333333300022333333333330002233333333333"
+)
+LMR_DEFAULT: List[List[int]] = [
+    [int(c, 16) for c in _LMR_DEFAULT_HEX[i:i + 16]] for i in range(0, len(_LMR_DEFAULT_HEX), 16)
+]
+# --- END GENERATED: TABLES ---
 
 
 def drop_z(board: Board, x: int, y: int) -> Optional[int]:
@@ -88,6 +163,105 @@ def valid_moves(board: Board):
                 yield (x, y)
 
 
+# ---------------------- Мёртвые клетки и столбцы ----------------------
+
+# клетки столбца c = y*4 + x (бит i = z*16 + c, как в LINE_MASKS)
+COLUMN_MASKS: List[int] = [0x0001000100010001 << c for c in range(16)]
+# раньше мёртвых столбцов почти не бывает (в записанных партиях — не раньше ~40 камней),
+# а проход по 76 линиям в каждом узле не бесплатен
+DEAD_MIN_STONES = 32
+
+
+def live_cells(s1: int, s2: int) -> int:
+    """
+    Маска живых клеток: лежащих хотя бы на одной линии без камней обоих
+    игроков (s1, s2 — битборды P1/P2). 0 — живых линий нет, исход — ничья.
+    """
+    live = 0
+    for m in LINE_MASKS:
+        if not (m & s1 and m & s2):
+            live |= m
+    return live
+
+
+def prune_tempo_moves(moves: List[Tuple[int, int]], occupied: int, live: int):
+    """
+    Ходы в полностью мёртвые столбцы (все пустые клетки мёртвые) — чистый
+    темп: они не меняют ни одной живой линии, а запас таких ходов уменьшают
+    одинаково, на один. Оставляем один представитель — с лучшим бонусом
+    центра/высоты eval_board для ходящего. → (ходы, сколько отброшено).
+    """
+    rep = None
+    rep_bonus = 0
+    dead = 0
+    for (x, y) in moves:
+        col = COLUMN_MASKS[y * 4 + x]
+        if col & ~occupied & live:
+            continue
+        dead += 1
+        z = bin(col & occupied).count("1")
+        bonus = W_CENTER * (3 - int(abs(x - 1.5) + abs(y - 1.5))) + W_HEIGHT * z
+        if rep is None or bonus > rep_bonus:
+            rep, rep_bonus = (x, y), bonus
+    if dead <= 1:
+        return moves, 0
+    return [m for m in moves if m == rep or COLUMN_MASKS[m[1] * 4 + m[0]] & ~occupied & live], dead - 1
+
+
+# ---------------------- Симметрии позиции ----------------------
+
+# симметричные позиции бывают только в начале партии; дальше проверка — пустая трата
+SYM_MAX_STONES = 12
+# кроме корня, ходы-образы отсекаются в узлах с depth_idx < SYM_PLIES
+SYM_PLIES = 2
+
+
+def stabilizer(board: Board) -> List[int]:
+    """
+    Симметрии подошвы (индексы _COL_PERMS, кроме тождественной), переводящие
+    доску в себя. Только D4: перестановка внутренних/внешних рядов с
+    гравитацией ломает диагонали в плоскостях xz/yz.
+    """
+    stones = [(z, y * 4 + x, board[z][y][x])
+              for z in range(4) for y in range(4) for x in range(4) if board[z][y][x] != 0]
+    out = []
+    for t in range(1, 8):
+        perm = _COL_PERMS[t]
+        for z, c, v in stones:
+            p = perm[c]
+            if board[z][p // 4][p % 4] != v:
+                break
+        else:
+            out.append(t)
+    return out
+
+
+def orbit_moves(moves: List[Tuple[int, int]], sym: List[int]):
+    """
+    По одному ходу из каждой орбиты стабилизатора sym (первый в порядке moves):
+    образы хода дают симметричные позиции с той же оценкой.
+    → (ходы, сколько отброшено).
+    """
+    seen = set()
+    out = []
+    for (x, y) in moves:
+        c = y * 4 + x
+        if c in seen:
+            continue
+        out.append((x, y))
+        seen.add(c)
+        for t in sym:
+            seen.add(_COL_PERMS[t][c])
+    return out, len(moves) - len(out)
+
+
+# --- BEGIN GENERATED: EVAL_WEIGHTS (tune_eval.py) ---
+EVAL_WEIGHTS = (4, 44, 260, 1, 1)
+# --- END GENERATED: EVAL_WEIGHTS ---
+# открытые линии с 1/2/3 камнями одного цвета, центр (3..0), высота z
+W_LINE1, W_LINE2, W_LINE3, W_CENTER, W_HEIGHT = EVAL_WEIGHTS
+
+
 def eval_board(board: Board, me: int) -> int:
     """
     Лёгкая эвристика:
@@ -113,7 +287,7 @@ def eval_board(board: Board, me: int) -> int:
                     continue
                 cent = 3 - int(abs(x - 1.5) + abs(y - 1.5))  # 3..0
                 h = z  # 0..3
-                s = cent + h
+                s = W_CENTER * cent + W_HEIGHT * h
                 if p == me:
                     score += s
                 else:
@@ -136,42 +310,273 @@ def eval_board(board: Board, me: int) -> int:
         if theirs == 0:
             # Только мои
             if mine == 3 and empty == 1:
-                score += 260   # ↑ было 240
+                score += W_LINE3
             elif mine == 2 and empty == 2:
-                score += 44    # ↑ было 40
+                score += W_LINE2
             elif mine == 1 and empty == 3:
-                score += 4
+                score += W_LINE1
         elif mine == 0:
             # Только их
             if theirs == 3 and empty == 1:
-                score -= 260
+                score -= W_LINE3
             elif theirs == 2 and empty == 2:
-                score -= 44
+                score -= W_LINE2
             elif theirs == 1 and empty == 3:
-                score -= 4
+                score -= W_LINE1
 
     return score
 
 
+# ---------------------- Тактический анализ (один проход) ----------------------
+
+
+class Tactics:
+    """
+    Тактическая сводка позиции (ход за player), считается analyze_tactics:
+      wins[p]  — ходы p, выигрывающие сразу (win / block);
+      forks[p] — ходы p, после которых у p ≥2 выигрышных столбцов,
+                 а у соперника нет мгновенной победы;
+      safe     — ходы player, после которых соперник не выигрывает сразу.
+    Все списки — в порядке valid_moves.
+    Сверка с прежней прелюдией get_move — check_tactics.py.
+    """
+
+    __slots__ = ("player", "wins", "forks", "safe")
+
+    def __init__(self, player: int):
+        self.player = player
+        self.wins: Dict[int, List[Tuple[int, int]]] = {1: [], 2: []}
+        self.forks: Dict[int, List[Tuple[int, int]]] = {1: [], 2: []}
+        self.safe: List[Tuple[int, int]] = []
+
+
+def analyze_tactics(board: Board, player: int) -> Tactics:
+    """
+    Вместо winner() (76 линий) на каждый пробный ход — счётчики камней по
+    линиям. Клетка выигрывает для p, если через неё идёт линия с тремя
+    камнями p и без камней соперника. Пробный ход меняет только линии
+    через свою клетку и верх своего столбца, так что вся сводка для обеих
+    сторон — O(ходы × ходы × линии_через_клетку) без копий доски.
+    """
+    n_lines = len(LINES)
+    cnt = {1: [0] * n_lines, 2: [0] * n_lines}
+    for li, line in enumerate(LINES):
+        for (x, y, z) in line:
+            v = board[z][y][x]
+            if v == 1 or v == 2:
+                cnt[v][li] += 1
+    # верхние свободные клетки столбцов, в порядке valid_moves
+    tops = [(x, y, drop_z(board, x, y)) for (x, y) in valid_moves(board)]
+
+    def wins_of(p: int, cells) -> List[Tuple[int, int]]:
+        mine, theirs = cnt[p], cnt[3 - p]
+        out = []
+        for (x, y, z) in cells:
+            for li in CELL_LINES[z][y][x]:
+                if mine[li] == 3 and theirs[li] == 0:
+                    out.append((x, y))
+                    break
+        return out
+
+    def has_win(p: int, cells) -> bool:
+        mine, theirs = cnt[p], cnt[3 - p]
+        for (x, y, z) in cells:
+            for li in CELL_LINES[z][y][x]:
+                if mine[li] == 3 and theirs[li] == 0:
+                    return True
+        return False
+
+    t = Tactics(player)
+    t.wins[1] = wins_of(1, tops)
+    t.wins[2] = wins_of(2, tops)
+    for s in (player, 3 - player):
+        row = cnt[s]
+        for i, (x, y, z) in enumerate(tops):
+            lines = CELL_LINES[z][y][x]
+            for li in lines:
+                row[li] += 1
+            cells = tops[:i] + tops[i + 1:]
+            if z < 3:
+                cells.append((x, y, z + 1))
+            if not has_win(3 - s, cells):
+                if s == player:
+                    t.safe.append((x, y))
+                if len(wins_of(s, cells)) >= 2:
+                    t.forks[s].append((x, y))
+            for li in lines:
+                row[li] -= 1
+    return t
+
+
+def makes_playable_threat(board: Board, x: int, y: int, z: int, pl: int) -> bool:
+    """
+    Ход pl в (x,y,z) (уже стоит на доске) создаёт «шах»: через эту клетку
+    идёт линия с тремя камнями pl и свободной клеткой, в которую можно
+    сходить прямо сейчас (она на дне или над занятой).
+    """
+    for li in CELL_LINES[z][y][x]:
+        empty = None
+        for (lx, ly, lz) in LINES[li]:
+            v = board[lz][ly][lx]
+            if v == pl:
+                continue
+            if v != 0 or empty is not None:
+                empty = None
+                break
+            empty = (lx, ly, lz)
+        if empty is not None:
+            ex, ey, ez = empty
+            if ez == 0 or board[ez - 1][ey][ex] != 0:
+                return True
+    return False
+
+
+# ---------------------- Параметры сокращений/продлений ----------------------
+
+# Всё, что влияет на форму дерева, — здесь; MyAI(search_params={...}) переопределяет
+# отдельные ключи (подбор через tune_search.py на арене).
+SEARCH_PARAMS: Dict[str, float] = {
+    # LMR: R = lmr_base + ln(d) * ln(idx) / lmr_div, обрезается до [0, lmr_max]
+    "lmr_min_depth": 3,      # не сокращаем ближе к листьям
+    "lmr_min_index": 3,      # первые ходы (TT/killers/центр) всегда на полную глубину
+    "lmr_base": 0.5,
+    "lmr_div": 2.0,
+    "lmr_max": 3,
+    # продление за ход, создающий играбельную угрозу (аналог шаха); угрозы в 3D
+    # часты, и на 3s продление стоит больше, чем даёт, — по умолчанию выключено
+    "threat_ext": 0,
+    # singular extension для TT-хода
+    "singular_min_depth": 4,  # минимальная остаточная глубина узла
+    "singular_tt_slack": 3,   # TT-запись не мельче d - slack
+    "singular_margin": 40,    # остальные ходы должны быть хуже оценки TT на margin
+    "singular_ext": 0,        # по умолчанию выключено: на глубинах 4-5 проверка дороже выигрыша
+    # продления не дальше ext_max_ply полуходов от корня (и не больше 2×глубины итерации)
+    "ext_max_ply": 24,
+}
+
+
+LMR_PARAM_KEYS = ("lmr_min_depth", "lmr_min_index", "lmr_base", "lmr_div", "lmr_max")
+
+
+def lmr_table(params: Dict[str, float], max_depth: int = 32, max_index: int = 16) -> List[List[int]]:
+    """Таблица сокращений [d][idx] (0 — без сокращения); для SEARCH_PARAMS вшита как LMR_DEFAULT."""
+    table = [[0] * max_index for _ in range(max_depth + 1)]
+    for d in range(max_depth + 1):
+        for idx in range(max_index):
+            if d < params["lmr_min_depth"] or idx < params["lmr_min_index"]:
+                continue
+            r = params["lmr_base"] + math.log(d) * math.log(idx) / params["lmr_div"]
+            table[d][idx] = max(0, min(int(params["lmr_max"]), int(r), d - 1))
+    return table
+
+
+# ------------------------ Статистика поиска ------------------------
+
+class SearchStats:
+    """
+    Счётчики одного get_move (включаются MyAI(collect_stats=True)).
+    Если сбор выключен, MyAI.stats = None и в горячем цикле остаётся
+    только проверка `st is not None`; счётчик узлов берётся из
+    тайм-менеджера, который и так считает узлы.
+    """
+
+    def __init__(self):
+        self.stage = ""            # на каком шаге get_move выбран ход
+        self.nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_stores = 0
+        self.cutoffs_by_index = [0] * 16   # beta-отсечения по номеру хода в порядке перебора
+        self.killer_cutoffs = 0            # отсечение дал killer-ход
+        self.etc_cutoffs = 0               # отсечения по TT-записи ребёнка (ETC)
+        self.mdp_cutoffs = 0               # отсечения mate-distance pruning
+        self.dead_draws = 0                # узлы без живых линий (ничья без перебора)
+        self.tempo_pruned = 0              # отброшенные ходы в мёртвые столбцы
+        self.sym_pruned = 0                # отброшенные ходы-образы в симметричных позициях
+        self.depth = 0                     # последняя завершённая итерация
+        self.time_to_depth = 0.0           # CPU к моменту её завершения
+        self.best_value = 0
+        self.cpu = 0.0
+        self.iterations: List[Dict[str, object]] = []
+
+    def cutoff(self, idx: int, is_killer: bool):
+        self.cutoffs_by_index[min(idx, 15)] += 1
+        if is_killer:
+            self.killer_cutoffs += 1
+
+    def as_dict(self) -> Dict[str, object]:
+        total = sum(self.cutoffs_by_index)
+        return {
+            "stage": self.stage,
+            "nodes": self.nodes,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_stores": self.tt_stores,
+            "cutoffs": total,
+            "first_move_cutoffs": self.cutoffs_by_index[0],
+            "killer_cutoffs": self.killer_cutoffs,
+            "etc_cutoffs": self.etc_cutoffs,
+            "mdp_cutoffs": self.mdp_cutoffs,
+            "dead_draws": self.dead_draws,
+            "tempo_pruned": self.tempo_pruned,
+            "sym_pruned": self.sym_pruned,
+            "depth": self.depth,
+            "time_to_depth": round(self.time_to_depth, 4),
+            "best_value": self.best_value,
+            "cutoffs_by_index": list(self.cutoffs_by_index),
+            "iterations": list(self.iterations),
+        }
+
+
 # -------------------------------- ИИ --------------------------------
 
 class MyAI(Alg3D):
     """
     Стабильная ветка:
-      • TimeGuard (CPU + soft-wall)
+      • адаптивный тайм-менеджер (бюджет от серверных лимитов, прогноз итераций)
       • Итеративное заглубление
       • Zobrist-хэш + маленькая транспозиционная таблица (TT)
       • Move ordering: PV-move из TT → killer-moves → центр-сначала
-      • Лёгкий LMR для поздних нетактических ходов (с проверкой)
+      • LMR по таблице ln(d)·ln(idx) для поздних тихих ходов (с проверкой)
+      • продления: ход с играбельной угрозой, singular TT-ход (SEARCH_PARAMS)
     """
     # TT-флаги
     TT_EXACT = 0
     TT_LOWER = 1
     TT_UPPER = -1
+    # оценка победы: WIN - ply (ply — полуходов от корня); |v| >= WIN_BOUND — форсированный исход
+    WIN = 10_000
+    WIN_BOUND = 9_000
 
-    def __init__(self, depth: int = 3, tt_capacity: int = 200_000):
-        # depth — максимальная глубина для итеративного заглубления (1..depth)
+    def __init__(
+        self,
+        depth: int = 8,
+        tt_capacity: int = 200_000,
+        cpu_limit: float = 3.0,
+        wall_limit: float = 10.0,
+        collect_stats: bool = False,
+        search_params: Optional[Dict[str, float]] = None,
+    ):
+        # depth — потолок итеративного заглубления (1..depth); реальную глубину решает тайм-менеджер
         self.depth = depth
+        # серверные лимиты на ход: CPU ~3s, ожидание 10s
+        self.cpu_limit = cpu_limit
+        self.wall_limit = wall_limit
+        self._last_root_value = 0
+        # статистика последнего get_move (None, если сбор выключен)
+        self.collect_stats = collect_stats
+        self.stats: Optional[SearchStats] = None
+        # сокращения/продления: SEARCH_PARAMS + переопределения
+        self.params: Dict[str, float] = dict(SEARCH_PARAMS)
+        if search_params:
+            unknown = set(search_params) - set(SEARCH_PARAMS)
+            if unknown:
+                raise ValueError(f"unknown search params: {sorted(unknown)}")
+            self.params.update(search_params)
+        if all(self.params[k] == SEARCH_PARAMS[k] for k in LMR_PARAM_KEYS):
+            self._lmr = LMR_DEFAULT
+        else:
+            self._lmr = lmr_table(self.params)
 
         # --- Zobrist ---
         self._zobrist_ready = False
@@ -186,35 +591,122 @@ class MyAI(Alg3D):
         # killer moves (на глубины 0..31 храним по 2 убийцы)
         self.killers: List[List[Optional[Tuple[int, int]]]] = [[None, None] for _ in range(32)]
 
-    # ---------- Лимитер времени (CPU + мягкий по wall) ----------
+        # тактические сводки по Zobrist-ключу позиции (живут между ходами партии)
+        self._tactics_cache: Dict[int, Tactics] = {}
 
-    class _TimeGuard:
-        def __init__(self, cpu_limit: float = 9.5, wall_limit: float = 29.0):
-            self.cpu_start = time.process_time()
-            self.cpu_limit = cpu_limit
-            self.wall_start = time.perf_counter()
-            self.wall_limit = wall_limit
+        # anytime-протокол арены (arena.py --anytime): вызывается с лучшим ходом
+        # после каждой завершённой итерации; на сервере остаётся None
+        self.on_best_move: Optional[Callable[[Tuple[int, int]], None]] = None
 
-        def over_cpu(self) -> bool:
-            return (time.process_time() - self.cpu_start) >= self.cpu_limit
+    # ---------- Адаптивный тайм-менеджер ----------
 
-        def over_wall(self) -> bool:
-            return (time.perf_counter() - self.wall_start) >= self.wall_limit
+    class _TimeManager:
+        """
+        Бюджет хода считается от серверных лимитов (CPU ~3s, wall 10s):
+          • hard — абсолютный потолок с запасом, дальше поиск обрывается;
+          • soft — плановый бюджет, зависит от числа камней на доске
+            и растёт, если лучший ход «скачет» или оценка просела.
+        Часы опрашиваются раз в poll_every узлов, а не на каждом узле.
+        Перед новой итерацией ID прогнозируем её время по ветвлению
+        предыдущей и не начинаем, если она заведомо не успеет.
+        """
+
+        def __init__(
+            self,
+            cpu_limit: float = 3.0,
+            wall_limit: float = 10.0,
+            stones: int = 0,
+            poll_every: int = 256,
+        ):
+            self.cpu_start = time.process_time()
+            self.wall_start = time.perf_counter()
+            # запас на накладные расходы сервера и возврат хода
+            self.hard_cpu = cpu_limit * 0.9
+            self.hard_wall = wall_limit * 0.8
+            self.soft_cpu = self.hard_cpu * self._phase_fraction(stones)
+            self.poll_mask = max(1, poll_every) - 1
+            self.nodes = 0
+            self.stopped = False
+            # история итераций для прогноза
+            self._last_iter_time = 0.0
+            self._iter_nodes: List[int] = []
+            self._ebf = 4.0
+            self._prev_best: Optional[Tuple[int, int]] = None
+            self._scores: List[int] = []
+
+        @staticmethod
+        def _phase_fraction(stones: int) -> float:
+            """Доля hard-бюджета по фазе: дебют — меньше, миттельшпиль — больше, эндшпиль — меньше."""
+            if stones < 8:
+                return 0.45
+            if stones <= 40:
+                return 0.45 + 0.3 * (stones - 8) / 32.0
+            return max(0.4, 0.75 - 0.35 * (stones - 40) / 24.0)
+
+        def cpu_used(self) -> float:
+            return time.process_time() - self.cpu_start
+
+        def wall_used(self) -> float:
+            return time.perf_counter() - self.wall_start
+
+        def tick(self) -> bool:
+            """Счётчик узлов + редкий опрос часов. True — пора останавливаться."""
+            self.nodes += 1
+            if self.stopped:
+                return True
+            if self.nodes & self.poll_mask:
+                return False
+            if self.cpu_used() >= self.hard_cpu or self.wall_used() >= self.hard_wall:
+                self.stopped = True
+            return self.stopped
 
         def should_stop(self) -> bool:
-            return self.over_cpu() or self.over_wall()
+            """Немедленная проверка (вне горячего цикла поиска)."""
+            if not self.stopped and (self.cpu_used() >= self.hard_cpu or self.wall_used() >= self.hard_wall):
+                self.stopped = True
+            return self.stopped
+
+        def on_iteration(self, best: Tuple[int, int], score: int, nodes: int, elapsed: float):
+            """Учесть завершённую итерацию: ветвление и стабильность поиска."""
+            hist = self._iter_nodes
+            if hist and hist[-1] > 0 and nodes > 0:
+                # ветвление «скачет» по чётности глубины: берём максимум из
+                # последнего отношения и среднего геометрического за 2 полухода
+                ebf = nodes / hist[-1]
+                if len(hist) >= 2 and hist[-2] > 0:
+                    ebf = max(ebf, (nodes / hist[-2]) ** 0.5)
+                self._ebf = max(1.5, min(16.0, ebf * 1.5))
+            hist.append(max(1, nodes))
+            self._last_iter_time = elapsed
+
+            extend = 1.0
+            if self._prev_best is not None and best != self._prev_best:
+                extend *= 1.3   # лучший ход сменился — поиск нестабилен
+            # оценку сравниваем с итерацией той же чётности (эффект чёт/нечет)
+            if len(self._scores) >= 2 and score < self._scores[-2] - 50:
+                extend *= 1.5   # оценка просела — нужно больше времени
+            self.soft_cpu = min(self.hard_cpu, self.soft_cpu * extend)
+            self._prev_best = best
+            self._scores.append(score)
+
+        def can_start_iteration(self) -> bool:
+            """Успеет ли следующая итерация целиком (прогноз по ветвлению)."""
+            if self.should_stop():
+                return False
+            used = self.cpu_used()
+            if used >= self.soft_cpu:
+                return False
+            predicted = self._last_iter_time * self._ebf
+            return used + predicted <= self.hard_cpu and self.wall_used() + predicted <= self.hard_wall
 
     # ---------- Zobrist ----------
 
     def _zobrist_init(self):
         if self._zobrist_ready:
             return
-        rnd = random.Random(0xC0FFEE)
-        # ключи для (z,y,x, piece) где piece in {1,2} → индекс 0/1
-        self._piece_key = [[[[
-            rnd.getrandbits(64) for _ in range(2)
-        ] for _ in range(4)] for _ in range(4)] for _ in range(4)]  # type: ignore
-        self._stm_key = rnd.getrandbits(64)
+        # ключи для (z,y,x, piece) где piece in {1,2} → индекс 0/1 (литералы секции TABLES)
+        self._piece_key = ZOBRIST_PIECE  # type: ignore
+        self._stm_key = ZOBRIST_STM
         self._zobrist_ready = True
 
     def _hash_board_full(self, board: Board, side_to_move: int) -> int:
@@ -255,6 +747,23 @@ class MyAI(Alg3D):
     def _tt_probe(self, key: int):
         return self.tt.get(key, None)
 
+    @staticmethod
+    def _tt_value_to(value: int, ply: int) -> int:
+        """Оценка победы в TT хранится от узла, а не от корня (иначе транспозиции на другом ply врут)."""
+        if value >= MyAI.WIN_BOUND:
+            return value + ply
+        if value <= -MyAI.WIN_BOUND:
+            return value - ply
+        return value
+
+    @staticmethod
+    def _tt_value_from(value: int, ply: int) -> int:
+        if value >= MyAI.WIN_BOUND:
+            return value - ply
+        if value <= -MyAI.WIN_BOUND:
+            return value + ply
+        return value
+
     # ---------- Безопасные помощники ----------
 
     def _first_legal_move(self, board: Board) -> Tuple[int, int]:
@@ -281,104 +790,20 @@ class MyAI(Alg3D):
     def get_winning_lines(self):
         return LINES
 
-    # ---------- Примитивы (как раньше) ----------
-
-    def _immediate_win(self, board: Board, player: int) -> Optional[Tuple[int, int]]:
-        for (x, y) in valid_moves(board):
-            z = drop_z(board, x, y)
-            if z is None:
-                continue
-            board[z][y][x] = player
-            won = (winner(board) == player)
-            board[z][y][x] = 0
-            if won:
-                return (x, y)
-        return None
-
-    def _my_immediate_wins_in_position(self, board: Board, player: int) -> List[Tuple[int, int]]:
-        wins: List[Tuple[int, int]] = []
-        for (x, y) in valid_moves(board):
-            z = drop_z(board, x, y)
-            if z is None:
-                continue
-            board[z][y][x] = player
-            if winner(board) == player:
-                wins.append((x, y))
-            board[z][y][x] = 0
-        return wins
-
-    def _creates_fork(self, board: Board, player: int, x: int, y: int) -> bool:
-        z = drop_z(board, x, y)
-        if z is None:
-            return False
-        board[z][y][x] = player
+    # ---------- Тактика ----------
 
-        opp = 3 - player
-        opp_win = self._immediate_win(board, opp)
-        if opp_win is not None:
-            board[z][y][x] = 0
-            return False
-
-        my_wins = self._my_immediate_wins_in_position(board, player)
-        board[z][y][x] = 0
+    TACTICS_CACHE_SIZE = 4096
 
-        if len(my_wins) < 2:
-            return False
-        cols = {(cx, cy) for (cx, cy) in my_wins}
-        return len(cols) >= 2
-
-    def _find_own_fork(self, board: Board, player: int) -> Optional[Tuple[int, int]]:
-        for (x, y) in valid_moves(board):
-            if self._creates_fork(board, player, x, y):
-                return (x, y)
-        return None
-
-    def _find_block_opp_fork(self, board: Board, player: int) -> Optional[Tuple[int, int]]:
-        opp = 3 - player
-        opp_forks: List[Tuple[int, int]] = []
-        for (x, y) in valid_moves(board):
-            if self._creates_fork(board, opp, x, y):
-                opp_forks.append((x, y))
-        if not opp_forks:
-            return None
-        for (x, y) in opp_forks:
-            z = drop_z(board, x, y)
-            if z is not None:
-                return (x, y)
-        for (x, y) in valid_moves(board):
-            z = drop_z(board, x, y)
-            if z is None:
-                continue
-            board[z][y][x] = player
-            still_fork = False
-            for (ox, oy) in valid_moves(board):
-                if self._creates_fork(board, opp, ox, oy):
-                    still_fork = True
-                    break
-            board[z][y][x] = 0
-            if not still_fork:
-                return (x, y)
-        return opp_forks[0]
-
-    def _is_safe(self, board: Board, player: int, x: int, y: int) -> bool:
-        opp = 3 - player
-        z = drop_z(board, x, y)
-        if z is None:
-            return False
-        board[z][y][x] = player
-        safe = True
-        for (ox, oy) in valid_moves(board):
-            oz = drop_z(board, ox, oy)
-            if oz is None:
-                continue
-            board[oz][oy][ox] = opp
-            if winner(board) == opp:
-                safe = False
-                board[oz][oy][ox] = 0
-                break
-            board[oz][oy][ox] = 0
-        board[z][y][x] = 0
-        return safe
+    def _tactics(self, board: Board, player: int) -> Tactics:
+        """analyze_tactics с мемоизацией по Zobrist-хэшу (позиция + сторона хода)."""
+        key = self._hash_board_full(board, player)
+        t = self._tactics_cache.get(key)
+        if t is None:
+            if len(self._tactics_cache) >= self.TACTICS_CACHE_SIZE:
+                self._tactics_cache.clear()
+            t = analyze_tactics(board, player)
+            self._tactics_cache[key] = t
+        return t
 
     # ---------- Killer moves helpers ----------
 
@@ -388,7 +813,7 @@ class MyAI(Alg3D):
             arr[1] = arr[0]
             arr[0] = mv
 
-    # ---------- Alpha-Beta + TT + TimeGuard + лёгкий LMR ----------
+    # ---------- Alpha-Beta + TT + тайм-менеджер + LMR/продления ----------
 
     def _order_moves(
         self,
@@ -421,7 +846,7 @@ class MyAI(Alg3D):
         player: int,
         candidates: List[Tuple[int, int]],
         depth: int,
-        tg: "_TimeGuard",
+        tg: "_TimeManager",
     ) -> Tuple[int, int]:
         opp = 3 - player
 
@@ -435,24 +860,109 @@ class MyAI(Alg3D):
         best = candidates[0]
         bestv = -10**9
 
+        # битборды камней (bits[1], bits[2]) — для мёртвых линий; ведутся вместе с board
+        bits = [0, 0, 0]
+        for z in range(4):
+            for y in range(4):
+                for x in range(4):
+                    v = board[z][y][x]
+                    if v:
+                        bits[v] |= 1 << (z * 16 + y * 4 + x)
+        root_stones = bin(bits[1] | bits[2]).count("1")
+
+        st = self.stats
+        if root_stones >= DEAD_MIN_STONES:
+            candidates, pruned = prune_tempo_moves(candidates, bits[1] | bits[2], live_cells(bits[1], bits[2]))
+            if st is not None:
+                st.tempo_pruned += pruned
         ordered = self._order_moves(candidates, tt_move, depth_idx=0)
+        # симметричная позиция: ищем по ходу на орбиту (первый по порядку — TT/killer)
+        if root_stones <= SYM_MAX_STONES:
+            sym = stabilizer(board)
+            if sym:
+                ordered, pruned = orbit_moves(ordered, sym)
+                if st is not None:
+                    st.sym_pruned += pruned
+
+        P = self.params
+        lmr = self._lmr
+        lmr_rows, lmr_cols = len(lmr), len(lmr[0])
+        threat_ext = int(P["threat_ext"])
+        se_ext = int(P["singular_ext"])
+        se_min_depth = P["singular_min_depth"]
+        se_slack = P["singular_tt_slack"]
+        se_margin = P["singular_margin"]
+        # depth_idx + d на пути меняется только продлениями/сокращениями → кап суммарных продлений
+        ext_limit = min(int(P["ext_max_ply"]), 2 * depth, len(self.killers) - 1)
+
+        def is_singular(pl: int, d: int, moves: List[Tuple[int, int]], tt_mv: Tuple[int, int],
+                        sbeta: int, key: int, depth_idx: int) -> bool:
+            """Все ходы, кроме tt_mv, на уменьшенной глубине хуже sbeta (с точки зрения pl)."""
+            sd = (d - 1) // 2
+            for (x, y) in moves:
+                if (x, y) == tt_mv:
+                    continue
+                z = drop_z(board, x, y)
+                if z is None:
+                    continue
+                board[z][y][x] = pl
+                bit = 1 << (z * 16 + y * 4 + x)
+                bits[pl] |= bit
+                k = key ^ self._piece_key[z][y][x][pl - 1] ^ self._stm_key  # type: ignore
+                if pl == player:
+                    v = ab(3 - pl, sd, sbeta - 1, sbeta, k, depth_idx + 1)
+                else:
+                    v = ab(3 - pl, sd, sbeta, sbeta + 1, k, depth_idx + 1)
+                board[z][y][x] = 0
+                bits[pl] ^= bit
+                if v >= sbeta if pl == player else v <= sbeta:
+                    return False
+                if tg.stopped:
+                    return False
+            return True
 
         def ab(pl: int, d: int, a: int, b: int, key: int, depth_idx: int) -> int:
-            if tg.should_stop():
+            if tg.tick():
                 return eval_board(board, player)
 
+            # чем ближе к корню победа, тем выше оценка
             w = winner(board)
             if w == player:
-                return 10_000 - max(0, d)
+                return MyAI.WIN - depth_idx
             if w == opp:
-                return -10_000 + max(0, d)
+                return -MyAI.WIN + depth_idx
             if d == 0 or board_full(board):
                 return eval_board(board, player)
 
+            # исходное окно — по нему (а не по сдвинутым a/b) определяется флаг TT-записи
+            a0, b0 = a, b
+
+            # mate-distance pruning: исход в поддереве не раньше ply depth_idx+1,
+            # так что окно за пределами [-WIN+ply+1, WIN-ply-1] заведомо не достижимо
+            hi = MyAI.WIN - depth_idx - 1
+            if hi <= a:
+                if st is not None:
+                    st.mdp_cutoffs += 1
+                return hi
+            lo = -MyAI.WIN + depth_idx + 1
+            if lo >= b:
+                if st is not None:
+                    st.mdp_cutoffs += 1
+                return lo
+            if hi < b:
+                b = hi
+            if lo > a:
+                a = lo
+
             # TT probe
             entry = self._tt_probe(key)
+            if st is not None:
+                st.tt_probes += 1
+                if entry is not None:
+                    st.tt_hits += 1
             if entry is not None:
                 edepth, eflag, evalue, _emove = entry
+                evalue = self._tt_value_from(evalue, depth_idx)
                 if edepth >= d:
                     if eflag == MyAI.TT_EXACT:
                         return evalue
@@ -469,7 +979,59 @@ class MyAI(Alg3D):
             if not moves:
                 return eval_board(board, player)  # ничья/пат
 
+            # мёртвые линии: ни одной живой — ничья; мёртвые столбцы — один темповый ход
+            if root_stones + depth_idx >= DEAD_MIN_STONES:
+                occupied = bits[1] | bits[2]
+                live = live_cells(bits[1], bits[2])
+                if not live:
+                    if st is not None:
+                        st.dead_draws += 1
+                    return 0
+                moves, pruned = prune_tempo_moves(moves, occupied, live)
+                if st is not None:
+                    st.tempo_pruned += pruned
+
             moves = self._order_moves(moves, local_tt_move, depth_idx)
+            if depth_idx < SYM_PLIES and root_stones + depth_idx <= SYM_MAX_STONES:
+                sym = stabilizer(board)
+                if sym:
+                    moves, pruned = orbit_moves(moves, sym)
+                    if st is not None:
+                        st.sym_pruned += pruned
+
+            # ETC: если ребёнок уже лежит в TT с границей, опровергающей этот узел,
+            # отсекаемся без спуска (Enhanced Transposition Cutoff)
+            if d >= 2:
+                for (x, y) in moves:
+                    z = drop_z(board, x, y)
+                    ce = self._tt_probe(key ^ self._piece_key[z][y][x][pl - 1] ^ self._stm_key)  # type: ignore
+                    if ce is None or ce[0] < d - 1:
+                        continue
+                    cv = self._tt_value_from(ce[2], depth_idx + 1)
+                    if pl == player:
+                        hit = ce[1] != MyAI.TT_UPPER and cv >= b
+                    else:
+                        hit = ce[1] != MyAI.TT_LOWER and cv <= a
+                    if hit:
+                        if st is not None:
+                            st.etc_cutoffs += 1
+                        self._tt_store(key, d, MyAI.TT_LOWER if pl == player else MyAI.TT_UPPER,
+                                       self._tt_value_to(cv, depth_idx), (x, y))
+                        return cv
+
+            # singular extension: TT-ход заметно лучше всех остальных — продлеваем только его
+            singular_move = None
+            if (se_ext and entry is not None and local_tt_move is not None and d >= se_min_depth
+                    and entry[0] >= d - se_slack and abs(entry[2]) < MyAI.WIN_BOUND and depth_idx + d < ext_limit):
+                eflag, evalue = entry[1], entry[2]
+                if pl == player and eflag != MyAI.TT_UPPER:
+                    if is_singular(pl, d, moves, local_tt_move, evalue - se_margin, key, depth_idx):
+                        singular_move = local_tt_move
+                elif pl != player and eflag != MyAI.TT_LOWER:
+                    if is_singular(pl, d, moves, local_tt_move, evalue + se_margin, key, depth_idx):
+                        singular_move = local_tt_move
+                if tg.stopped:
+                    return eval_board(board, player)
 
             best_local_val = -10**9 if pl == player else 10**9
             best_local_move: Optional[Tuple[int, int]] = None
@@ -479,7 +1041,7 @@ class MyAI(Alg3D):
             killer_set = {km for km in killers_here if km is not None}
 
             for idx, (x, y) in enumerate(moves):
-                if tg.should_stop():
+                if tg.stopped:
                     break
                 z = drop_z(board, x, y)
                 if z is None:
@@ -487,20 +1049,36 @@ class MyAI(Alg3D):
 
                 # применяем ход
                 board[z][y][x] = pl
+                bit = 1 << (z * 16 + y * 4 + x)
+                bits[pl] |= bit
                 new_key = key ^ self._piece_key[z][y][x][pl - 1] ^ self._stm_key  # type: ignore
 
                 # быстрый тактический признак: немедленная победа после хода
                 immediate = (winner(board) == pl)
                 is_killer = (x, y) in killer_set
 
-                # --- LMR: только для «поздних» ходов, глубина >=3, не killer и не немедленный выигрыш
-                use_lmr = (d >= 3 and idx >= 3 and not is_killer and not immediate)
-
-                if not use_lmr:
-                    val = ab(3 - pl, d - 1, a, b, new_key, depth_idx + 1)
+                # --- продления: singular TT-ход или ход с играбельной угрозой
+                ext = 0
+                threat = False
+                if not immediate:
+                    if (x, y) == singular_move:
+                        ext = se_ext
+                    elif (threat_ext or (d < lmr_rows and idx < lmr_cols and lmr[d][idx])) \
+                            and makes_playable_threat(board, x, y, z, pl):
+                        threat = True
+                        if threat_ext and depth_idx + d < ext_limit:
+                            ext = threat_ext
+
+                # --- LMR: «поздние» тихие ходы (не killer, не выигрыш, не угроза, не продлённые)
+                r = 0
+                if not (ext or threat or is_killer or immediate) and d < lmr_rows and idx < lmr_cols:
+                    r = lmr[d][idx]
+
+                if r == 0:
+                    val = ab(3 - pl, d - 1 + ext, a, b, new_key, depth_idx + 1)
                 else:
                     # уменьшенная глубина
-                    val = ab(3 - pl, d - 2, a, b, new_key, depth_idx + 1)
+                    val = ab(3 - pl, d - 1 - r, a, b, new_key, depth_idx + 1)
                     # проверочный ресерч, если ход выглядит важным
                     need_full = False
                     if pl == player:
@@ -509,11 +1087,12 @@ class MyAI(Alg3D):
                     else:
                         if val < b:
                             need_full = True
-                    if need_full and not tg.should_stop():
+                    if need_full and not tg.stopped:
                         val = ab(3 - pl, d - 1, a, b, new_key, depth_idx + 1)
 
                 # откат
                 board[z][y][x] = 0
+                bits[pl] ^= bit
 
                 if pl == player:
                     if val > best_local_val:
@@ -521,6 +1100,8 @@ class MyAI(Alg3D):
                         best_local_move = (x, y)
                     a = max(a, val)
                     if a >= b:
+                        if st is not None:
+                            st.cutoff(idx, is_killer)
                         if best_local_move is not None:
                             self._push_killer(depth_idx, best_local_move)
                         break
@@ -530,38 +1111,46 @@ class MyAI(Alg3D):
                         best_local_move = (x, y)
                     b = min(b, val)
                     if a >= b:
+                        if st is not None:
+                            st.cutoff(idx, is_killer)
                         if best_local_move is not None:
                             self._push_killer(depth_idx, best_local_move)
                         break
 
             # сохранить в TT
-            if not tg.should_stop():
+            if not tg.stopped:
                 flag = MyAI.TT_EXACT
-                if best_local_val <= a:
+                if best_local_val <= a0:
                     flag = MyAI.TT_UPPER
-                if best_local_val >= b:
+                elif best_local_val >= b0:
                     flag = MyAI.TT_LOWER
-                self._tt_store(key, d, flag, best_local_val, best_local_move)
+                self._tt_store(key, d, flag, self._tt_value_to(best_local_val, depth_idx), best_local_move)
+                if st is not None:
+                    st.tt_stores += 1
 
             return best_local_val
 
         for (x, y) in ordered:
-            if tg.should_stop():
+            if tg.stopped:
                 break
             z = drop_z(board, x, y)
             if z is None:
                 continue
             board[z][y][x] = player
+            bit = 1 << (z * 16 + y * 4 + x)
+            bits[player] |= bit
             child_key = root_key ^ self._piece_key[z][y][x][player - 1] ^ self._stm_key  # type: ignore
             v = ab(opp, depth - 1, -10**9, 10**9, child_key, 1)
             board[z][y][x] = 0
+            bits[player] ^= bit
             if v > bestv:
                 bestv, best = v, (x, y)
 
         # Корневую запись тоже можно положить (для PV-move на следующий шаг)
-        if not tg.should_stop():
+        if not tg.stopped:
             self._tt_store(root_key, depth, MyAI.TT_EXACT, bestv, best)
 
+        self._last_root_value = bestv
         return best
 
     def _alpha_beta_best_id(
@@ -570,18 +1159,72 @@ class MyAI(Alg3D):
         player: int,
         candidates: List[Tuple[int, int]],
         max_depth: int,
-        tg: "_TimeGuard",
+        tg: "_TimeManager",
     ) -> Tuple[int, int]:
-        """Итеративное заглубление: 1..max_depth. Возвращаем лучший-so-far."""
+        """
+        Итеративное заглубление: 1..max_depth. Возвращаем лучший-so-far.
+        Прерванная итерация отбрасывается (кроме самой первой), а новая
+        не начинается, если тайм-менеджер прогнозирует, что она не успеет.
+        """
         best_so_far = candidates[0]
         # сбрасываем killers для свежего поиска
         self.killers = [[None, None] for _ in range(32)]
         for d in range(1, max_depth + 1):
-            if tg.should_stop():
+            if d > 1 and not tg.can_start_iteration():
+                break
+            t0 = tg.cpu_used()
+            n0 = tg.nodes
+            mv = self._alpha_beta_best_depth(board, player, candidates, d, tg)
+            if tg.stopped:
+                if d == 1:
+                    best_so_far = mv
+                break
+            best_so_far = mv
+            self._publish_best(mv)
+            tg.on_iteration(mv, self._last_root_value, tg.nodes - n0, tg.cpu_used() - t0)
+            st = self.stats
+            if st is not None:
+                st.depth = d
+                st.time_to_depth = tg.cpu_used()
+                st.best_value = self._last_root_value
+                st.iterations.append({
+                    "depth": d, "nodes": tg.nodes - n0, "cpu": round(tg.cpu_used() - t0, 4),
+                    "best": list(mv), "value": self._last_root_value,
+                })
+            # форсированный выигрыш/проигрыш найден — глубже смысла нет
+            if abs(self._last_root_value) >= MyAI.WIN_BOUND:
                 break
-            best_so_far = self._alpha_beta_best_depth(board, player, candidates, d, tg)
         return best_so_far
 
+    def _publish_best(self, mv: Tuple[int, int]):
+        """Отдать лучший-so-far наружу (arena --anytime); ошибка канала не должна ломать поиск."""
+        if self.on_best_move is None:
+            return
+        try:
+            self.on_best_move(mv)
+        except Exception:
+            self.on_best_move = None
+
+    # ------------------------ Офлайн-анализ ------------------------
+
+    def analyse(
+        self,
+        board: Board,
+        player: int,
+        depth: int,
+        candidates: Optional[List[Tuple[int, int]]] = None,
+    ) -> Tuple[Tuple[int, int], int]:
+        """
+        Поиск без лимита времени (для инструментов анализа, не для сервера).
+        Возвращает (лучший ход, оценка с точки зрения player) на глубине depth.
+        """
+        cands = list(candidates) if candidates else list(valid_moves(board))
+        if not cands:
+            return (0, 0), 0
+        tg = self._TimeManager(cpu_limit=float("inf"), wall_limit=float("inf"))
+        best = self._alpha_beta_best_id(board, player, cands, depth, tg)
+        return best, self._last_root_value
+
     # ------------------------ Главная точка входа ------------------------
 
     def get_move(
@@ -592,51 +1235,51 @@ class MyAI(Alg3D):
     ) -> Tuple[int, int]:
         """
         Приоритет: win → block → собственный fork → блок opp-fork → safe → alpha-beta(ID+TT+LMR) → fallback.
-        Все вычисления под защитой TimeGuard (CPU ~9.5s).
+        Бюджет распределяет _TimeManager (от лимитов CPU ~3s / wall 10s).
         """
+        st = SearchStats() if self.collect_stats else None
+        self.stats = st
+        tg = None
+        stage = "fallback"
         try:
-            tg = self._TimeGuard(cpu_limit=9.5, wall_limit=29.0)
+            stones = sum(1 for z in range(4) for y in range(4) for x in range(4) if board[z][y][x] != 0)
+            tg = self._TimeManager(cpu_limit=self.cpu_limit, wall_limit=self.wall_limit, stones=stones)
 
             # 0) стартовая книга: небольшой приоритет к центру/полуцентру
             if all(board[0][y][x] == 0 for x in range(4) for y in range(4)):
                 for pref in [(1, 1), (2, 2), (1, 2), (2, 1)]:
-                    if tg.should_stop():
-                        break
                     if drop_z(board, *pref) is not None:
+                        stage = "book"
                         return self._validate_move(board, *pref)
 
-            # 1) мгновенная победа
-            mv = self._immediate_win(board, player)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
+            # 1-5) тактика одним проходом: win → block → свой форк → блок opp-форка → safe
+            tac = self._tactics(board, player)
             opp = 3 - player
-
-            # 2) мгновенный блок
-            mv = self._immediate_win(board, opp)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
-            # 3) собственный форк
-            mv = self._find_own_fork(board, player)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
-            # 4) блок чужого форка
-            mv = self._find_block_opp_fork(board, player)
-            if mv is not None:
-                return self._validate_move(board, mv[0], mv[1])
-
-            # 5) кандидаты (safe). Если пусто — берём все валидные.
-            cands = [m for m in valid_moves(board) if self._is_safe(board, player, m[0], m[1])]
+            for mvs, name in ((tac.wins[player], "win"), (tac.wins[opp], "block"),
+                              (tac.forks[player], "fork"), (tac.forks[opp], "block_fork")):
+                if mvs:
+                    stage = name
+                    return self._validate_move(board, mvs[0][0], mvs[0][1])
+
+            # кандидаты (safe). Если пусто — берём все валидные.
+            cands = list(tac.safe)
             if not cands:
                 cands = list(valid_moves(board))
             if not cands:
                 return (0, 0)
 
             # 6) Итеративное заглубление + TT + LMR
+            stage = "search"
+            self._publish_best(cands[0])  # безопасный ход — на случай обрыва до 1-й итерации
             x, y = self._alpha_beta_best_id(board, player, cands, self.depth, tg)
             return self._validate_move(board, x, y)
 
         except Exception:
+            stage = "error"
             return self._first_legal_move(board)
+        finally:
+            if st is not None:
+                st.stage = stage
+                if tg is not None:
+                    st.nodes = tg.nodes
+                    st.cpu = tg.cpu_used()
@@ -152,15 +152,92 @@ def evaluate(board: Board, me: int) -> int:
     return sc
 
 
+class TimeManager:
+    """
+    Бюджет хода от серверных лимитов (CPU ~3s, ожидание 10s).
+    soft — плановый бюджет (зависит от числа камней и стабильности поиска),
+    hard — потолок, на котором поиск обрывается. Часы опрашиваются
+    раз в poll_every узлов; следующая итерация не стартует, если по
+    ветвлению прошлой она не успеет до hard.
+    """
+
+    def __init__(self, cpu_limit: float = 3.0, wall_limit: float = 10.0, stones: int = 0, poll_every: int = 16):
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        self.hard_cpu = cpu_limit * 0.9
+        self.hard_wall = wall_limit * 0.8
+        if stones < 8:
+            frac = 0.45
+        elif stones <= 40:
+            frac = 0.45 + 0.3 * (stones - 8) / 32.0
+        else:
+            frac = max(0.4, 0.75 - 0.35 * (stones - 40) / 24.0)
+        self.soft_cpu = self.hard_cpu * frac
+        self.poll_mask = max(1, poll_every) - 1
+        self.nodes = 0
+        self.stopped = False
+        self.iter_nodes: List[int] = []
+        self.iter_time = 0.0
+        self.ebf = 4.0
+        self.prev_best: Optional[Move] = None
+        self.scores: List[int] = []
+
+    def cpu_used(self) -> float:
+        return time.process_time() - self.cpu_start
+
+    def wall_used(self) -> float:
+        return time.perf_counter() - self.wall_start
+
+    def tick(self) -> bool:
+        """Узел поиска: считаем и изредка смотрим на часы. True — стоп."""
+        self.nodes += 1
+        if self.stopped:
+            return True
+        if self.nodes & self.poll_mask:
+            return False
+        if self.cpu_used() >= self.hard_cpu or self.wall_used() >= self.hard_wall:
+            self.stopped = True
+        return self.stopped
+
+    def on_iteration(self, best: Move, score: int, nodes: int, elapsed: float) -> None:
+        if self.iter_nodes and nodes > 0:
+            ebf = nodes / self.iter_nodes[-1]
+            if len(self.iter_nodes) >= 2:
+                ebf = max(ebf, (nodes / self.iter_nodes[-2]) ** 0.5)
+            self.ebf = max(1.5, min(16.0, ebf * 1.5))
+        self.iter_nodes.append(max(1, nodes))
+        self.iter_time = elapsed
+        extend = 1.0
+        if self.prev_best is not None and best != self.prev_best:
+            extend *= 1.3
+        if len(self.scores) >= 2 and score < self.scores[-2] - 50:
+            extend *= 1.5
+        self.soft_cpu = min(self.hard_cpu, self.soft_cpu * extend)
+        self.prev_best = best
+        self.scores.append(score)
+
+    def can_start_iteration(self) -> bool:
+        if self.stopped:
+            return False
+        used = self.cpu_used()
+        if used >= self.soft_cpu or self.wall_used() >= self.hard_wall:
+            return False
+        predicted = self.iter_time * self.ebf
+        return used + predicted <= self.hard_cpu and self.wall_used() + predicted <= self.hard_wall
+
+
 class MyAI(Alg3D):
-    def __init__(self):
-        self.time_limit_s = 2.25  # оставить запас от жесткого лимита CPU ~3s
-        self.start_ts = 0.0
+    def __init__(self, cpu_limit: float = 3.0, wall_limit: float = 10.0):
+        # серверные лимиты на ход; сам бюджет распределяет TimeManager
+        self.cpu_limit = cpu_limit
+        self.wall_limit = wall_limit
+        self.tm = TimeManager(cpu_limit, wall_limit)
         self.tt: Dict[Tuple[Tuple[int, ...], int, int], int] = {}  # (pos, player, depth) -> score
 
     # ------------ публичный интерфейс ------------
     def get_move(self, board: Board, player: int, last_move) -> Tuple[int, int]:
-        self.start_ts = time.time()
+        stones = sum(1 for v in serialize(board) if v != 0)
+        self.tm = TimeManager(self.cpu_limit, self.wall_limit, stones)
 
         # 1) быстрые выигрыши в один ход
         win = self._find_winning_move(board, player)
@@ -184,14 +261,23 @@ class MyAI(Alg3D):
         best_score = -10**9
         depth = 2
         random.shuffle(candidates)  # чтобы не быть предсказуемым на равных
+        tm = self.tm
         while True:
-            if time.time() - self.start_ts > self.time_limit_s:
+            if depth > 2 and not tm.can_start_iteration():
                 break
+            t0 = tm.cpu_used()
+            n0 = tm.nodes
             move, score = self._search_depth(board, player, candidates, depth)
+            if tm.stopped:
+                # недосчитанная итерация не надёжна — берём её, только если другой нет
+                if move is not None and best_score == -10**9:
+                    best = move
+                break
             if move is not None:
                 best, best_score = move, score
                 # лёгкая переупорядочивка по последнему скорам
                 candidates.sort(key=lambda m: 0 if m != best else -1)
+                tm.on_iteration(best, best_score, tm.nodes - n0, tm.cpu_used() - t0)
             depth += 1
             if depth > 6:  # на 4×4×4 глубже редко нужно при грамотной эвристике
                 break
@@ -207,7 +293,7 @@ class MyAI(Alg3D):
         beta = 10**9
 
         for (x, y) in moves:
-            if time.time() - self.start_ts > self.time_limit_s:
+            if self.tm.stopped:
                 break
             z = make_move(board, x, y, player)
             if z is None:
@@ -229,7 +315,7 @@ class MyAI(Alg3D):
         return best_move, best_score
 
     def _alphabeta(self, board: Board, side: int, depth: int, alpha: int, beta: int, me: int) -> int:
-        if time.time() - self.start_ts > self.time_limit_s:
+        if self.tm.tick():
             return evaluate(board, me)
 
         w = winner(board)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Параллельный анализ позиции 4x4x4 (только офлайн: книга, тест-сьюты, батчи).
+- Корень делится по ходам: каждый ход корня считает отдельный процесс пула
+  тем же ядром поиска, что и mainGPT5ninght (MyAI.analyse, без лимита времени).
+- Итеративное заглубление снаружи: на глубине d все ходы корня уходят в пул,
+  порядок раздачи — по оценкам глубины d-1 (лучшие первыми, чтобы длинные
+  задачи стартовали раньше).
+- У каждого воркера своя TT, она живёт между задачами и глубинами.
+- --cache: постоянный кэш анализов (analysis_cache.py) — позиция, уже
+  посчитанная на той же или большей глубине, не считается заново.
+
+В main.py это не используется: multiprocessing на сервере запрещён.
+
+Пример:
+  python parallel_search.py --moves "1,1 2,2 1,2" --depth 6 --workers 32
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+from multiprocessing import Pool, cpu_count, set_start_method
+
+from analysis_cache import AnalysisCache
+from arena import parse_moves, replay_moves, EMPTY
+
+DEFAULT_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mainGPT5ninght.py")
+
+# состояние процесса-воркера
+_engine = None
+
+
+def load_engine(engine_path=DEFAULT_ENGINE, **kwargs):
+    """Загрузить модуль бота по пути и создать MyAI."""
+    engine_path = os.path.abspath(engine_path)
+    bot_dir = os.path.dirname(engine_path)
+    if bot_dir not in os.sys.path:
+        os.sys.path.insert(0, bot_dir)
+    spec = importlib.util.spec_from_file_location("engine_" + os.path.basename(engine_path), engine_path)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load module from {engine_path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, "MyAI") or not hasattr(module.MyAI, "analyse"):
+        raise RuntimeError(f"{engine_path}: MyAI.analyse not found")
+    return module.MyAI(**kwargs)
+
+
+def _init_worker(engine_path, tt_capacity):
+    global _engine
+    _engine = load_engine(engine_path, tt_capacity=tt_capacity)
+
+
+def _search_root_move(task):
+    board, player, move, depth = task
+    _, value = _engine.analyse(board, player, depth, [move])
+    return move, value
+
+
+def root_moves(board):
+    moves = []
+    for y in range(4):
+        for x in range(4):
+            if board[3][y][x] == EMPTY:
+                moves.append((x, y))
+    # центр-сначала — та же эвристика, что у движков
+    moves.sort(key=lambda m: abs(m[0] - 1.5) + abs(m[1] - 1.5))
+    return moves
+
+
+def parallel_analyse(board, player, depth, workers=None, engine_path=DEFAULT_ENGINE,
+                     tt_capacity=1_000_000, pool=None, verbose=False, cache=None):
+    """
+    Итеративное заглубление 1..depth с разделением корня по процессам.
+    Возвращает dict: best, value, depth, scores {move: value}, seconds.
+    Можно передать готовый pool (созданный через make_pool) для серии позиций.
+    cache — analysis_cache.AnalysisCache: попадание возвращается сразу
+    (scores пуст, cached=True), новый результат записывается, если кэш
+    открыт на запись.
+    """
+    moves = root_moves(board)
+    if not moves:
+        return {"best": None, "value": 0, "depth": 0, "scores": {}, "seconds": 0.0}
+    if cache is not None:
+        hit = cache.get(board, depth)
+        if hit is not None and hit[1] is not None:
+            return {"best": hit[1], "value": hit[0], "depth": depth, "scores": {}, "seconds": 0.0, "cached": True}
+
+    own_pool = pool is None
+    if own_pool:
+        pool = make_pool(workers, engine_path, tt_capacity)
+    start = time.perf_counter()
+    scores = {}
+    try:
+        for d in range(1, depth + 1):
+            tasks = [(board, player, mv, d) for mv in moves]
+            scores = {}
+            for mv, value in pool.imap_unordered(_search_root_move, tasks):
+                scores[mv] = value
+            moves.sort(key=lambda m: -scores[m])
+            if verbose:
+                best = moves[0]
+                print(f"depth {d}: best={best} value={scores[best]} t={time.perf_counter() - start:.2f}s")
+            # форсированный результат уже известен — глубже не нужно
+            if abs(scores[moves[0]]) >= 9_000:
+                depth = d
+                break
+    finally:
+        if own_pool:
+            pool.close()
+            pool.join()
+    best = moves[0]
+    if cache is not None and cache.writable:
+        cache.put(board, depth, scores[best], best)
+    return {
+        "best": best,
+        "value": scores[best],
+        "depth": depth,
+        "scores": scores,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def make_pool(workers=None, engine_path=DEFAULT_ENGINE, tt_capacity=1_000_000):
+    return Pool(processes=workers or cpu_count(), initializer=_init_worker,
+                initargs=(os.path.abspath(engine_path), tt_capacity))
+
+
+def main():
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+
+    ap = argparse.ArgumentParser(description="Параллельный анализ позиции (разделение корня)")
+    ap.add_argument("--moves", default="", help='Ходы с пустой доски: "x,y x,y ..."')
+    ap.add_argument("--depth", type=int, default=6, help="Глубина анализа (по умолчанию 6)")
+    ap.add_argument("--workers", type=int, default=0, help="Число процессов (по умолчанию — все ядра)")
+    ap.add_argument("--engine", default=DEFAULT_ENGINE, help="Путь к боту с MyAI.analyse")
+    ap.add_argument("--serial", action="store_true", help="Для сравнения: тот же поиск в одном процессе")
+    ap.add_argument("--cache", default="", help="Файл analysis_cache.py (читается и дописывается)")
+    args = ap.parse_args()
+
+    board, player, w = replay_moves(parse_moves(args.moves))
+    if w != EMPTY:
+        print(f"Позиция уже выиграна игроком P{w}")
+        return
+
+    if args.serial:
+        ai = load_engine(args.engine, tt_capacity=1_000_000)
+        start = time.perf_counter()
+        best, value = ai.analyse(board, player, args.depth, root_moves(board))
+        print(f"serial: best={best} value={value} t={time.perf_counter() - start:.2f}s")
+
+    cache = AnalysisCache(args.cache, writable=True) if args.cache else None
+    try:
+        res = parallel_analyse(board, player, args.depth, workers=args.workers or None,
+                               engine_path=args.engine, verbose=True, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    print(f"parallel: best={res['best']} value={res['value']} depth={res['depth']} t={res['seconds']:.2f}s"
+          f"{' (из кэша)' if res.get('cached') else ''}")
+    for mv, value in sorted(res["scores"].items(), key=lambda kv: -kv[1]):
+        print(f"  {mv}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perft для 4x4x4 с гравитацией: число листьев дерева на глубину N.
+- Ход, дающий победу, — лист (дальше не раскрываем).
+- Один и тот же обход гоняется на нескольких «бэкендах» доски:
+    lists    — drop_z/winner из mainGPT5ninght (полный скан 76 линий);
+    ai4scan  — проверка лучами от поставленной клетки (mainAI4.check_simple_win);
+    bitboard — bitboard.Position (маски линий через клетку).
+- Печатает узлы, время и nodes/sec; расхождение счётчиков между бэкендами
+  = ошибка в генераторе ходов/детекторе побед (код выхода 1).
+
+Пример:
+  python perft.py --depth 4
+  python perft.py --depth 5 --moves "1,1 2,2" --backends lists,bitboard
+"""
+
+import argparse
+import sys
+import time
+
+import bitboard
+import local_driver
+from arena import EMPTY, parse_moves, replay_moves
+
+# mainAI4 импортирует серверный framework; локально его роль играет local_driver
+sys.modules.setdefault("framework", local_driver)
+
+import mainAI4  # noqa: E402
+import mainGPT5ninght  # noqa: E402
+
+
+def perft_lists(board, player, depth):
+    drop_z, winner = mainGPT5ninght.drop_z, mainGPT5ninght.winner
+    if depth == 0:
+        return 1
+    total = 0
+    for y in range(4):
+        for x in range(4):
+            z = drop_z(board, x, y)
+            if z is None:
+                continue
+            board[z][y][x] = player
+            if winner(board) == player or depth == 1:
+                total += 1
+            else:
+                total += perft_lists(board, 3 - player, depth - 1)
+            board[z][y][x] = 0
+    return total
+
+
+def make_perft_ai4scan():
+    ai = mainAI4.MyAI()
+    check = ai.check_simple_win
+    drop = ai.get_drop_z
+
+    def perft(board, player, depth):
+        if depth == 0:
+            return 1
+        total = 0
+        for y in range(4):
+            for x in range(4):
+                z = drop(board, x, y)
+                if z is None:
+                    continue
+                board[z][y][x] = player
+                if check(board, x, y, z, player) or depth == 1:
+                    total += 1
+                else:
+                    total += perft(board, 3 - player, depth - 1)
+                board[z][y][x] = 0
+        return total
+
+    return perft
+
+
+def perft_bitboard(pos, depth):
+    if depth == 0:
+        return 1
+    total = 0
+    player = pos.side
+    for c in pos.legal_columns():
+        i = pos.play(c)
+        if depth == 1 or pos.is_win_at(i, player):
+            total += 1
+        else:
+            total += perft_bitboard(pos, depth - 1)
+        pos.undo(c)
+    return total
+
+
+def run_backend(name, board, player, depth):
+    work = [[row[:] for row in layer] for layer in board]
+    start = time.perf_counter()
+    if name == "lists":
+        nodes = perft_lists(work, player, depth)
+    elif name == "ai4scan":
+        nodes = make_perft_ai4scan()(work, player, depth)
+    elif name == "bitboard":
+        nodes = perft_bitboard(bitboard.Position.from_board(work, player), depth)
+    else:
+        raise ValueError(f"unknown backend {name}")
+    return nodes, time.perf_counter() - start
+
+
+BACKENDS = ("lists", "ai4scan", "bitboard")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Perft / nodes-per-second для 4x4x4")
+    ap.add_argument("--depth", type=int, default=4, help="Глубина (по умолчанию 4)")
+    ap.add_argument("--moves", default="", help='Стартовая позиция: ходы "x,y x,y ..." с пустой доски')
+    ap.add_argument("--backends", default=",".join(BACKENDS), help="Список через запятую: " + ",".join(BACKENDS))
+    ap.add_argument("--divide", action="store_true", help="Разбивка по первым ходам (для поиска расхождений)")
+    args = ap.parse_args()
+
+    board, player, w = replay_moves(parse_moves(args.moves))
+    if w != EMPTY:
+        print(f"Позиция уже выиграна игроком P{w}")
+        return 1
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+
+    counts = {}
+    for d in range(1, args.depth + 1):
+        for name in backends:
+            nodes, sec = run_backend(name, board, player, d)
+            counts.setdefault(d, {})[name] = nodes
+            nps = nodes / sec if sec > 0 else float("inf")
+            print(f"depth {d}  {name:8s}  nodes={nodes:<10d} t={sec:8.3f}s  nps={nps:,.0f}")
+
+    if args.divide:
+        for y in range(4):
+            for x in range(4):
+                if board[3][y][x] != EMPTY:
+                    continue
+                child, nxt, cw = replay_moves(parse_moves(args.moves) + [(x, y)])
+                line = []
+                for name in backends:
+                    n = 1 if cw != EMPTY or args.depth == 1 else run_backend(name, child, nxt, args.depth - 1)[0]
+                    line.append(f"{name}={n}")
+                print(f"  ({x},{y}): " + " ".join(line))
+
+    bad = [d for d, per in counts.items() if len(set(per.values())) > 1]
+    if bad:
+        print(f"РАСХОЖДЕНИЕ на глубинах {bad}: {[counts[d] for d in bad]}")
+        return 1
+    print("OK: счётчики всех бэкендов совпадают")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
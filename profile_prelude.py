@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Профилировщик get_move: сколько CPU уходит на «прелюдию» до поиска.
+- Прогоняет бота по набору позиций (bench_positions.json) под cProfile,
+  статистику всех позиций складывает в один pstats.
+- Таблица стадий: накопленное время (cumtime) функций-стадий get_move
+  (_tactics; у старых ботов _immediate_win, _find_own_fork, _is_safe; поиск)
+  и помощников (_creates_fork, winner, eval_board, ...), доля от get_move.
+- --flame out.folded: «свёрнутые» стеки (формат flamegraph.pl/speedscope),
+  восстановленные из графа вызовов cProfile: время вызываемой функции
+  делится между вызывающими пропорционально их вкладу.
+
+Пример:
+  python profile_prelude.py main.py mainGPT5ninght.py --limit 100 --flame prelude.folded
+  flamegraph.pl prelude.folded > prelude.svg
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+
+import local_driver
+from arena import call_get_move, replay_moves
+from bench import DEFAULT_SUITE, _bot_factory, _configure, _last_move
+
+sys.modules.setdefault("framework", local_driver)
+
+# функции, которые считаем отдельными стадиями get_move
+STAGES = (
+    "book_move",
+    "_opening_first",
+    "_opening_second",
+    "_tactics",
+    "_immediate_win",
+    "_find_own_fork",
+    "_find_block_opp_fork",
+    "_is_safe",
+    "_alpha_beta_best",
+    "_alpha_beta_best_id",
+)
+# стадии поиска; всё остальное внутри get_move — прелюдия
+SEARCH_STAGES = ("_alpha_beta_best", "_alpha_beta_best_id")
+HELPERS = (
+    "analyze_tactics",
+    "_creates_fork",
+    "_my_immediate_wins_in_position",
+    "winner",
+    "eval_board",
+    "drop_z",
+    "valid_moves",
+    "board_full",
+)
+
+
+def profile_bot(bot_path, positions, depth=None, cpu=None):
+    cls = _bot_factory(bot_path)
+    prof = cProfile.Profile()
+    for pos in positions:
+        board, player, _w = replay_moves(pos["moves"])
+        ai = cls()
+        _configure(ai, depth, cpu)
+        last = _last_move(board, pos["moves"])
+        prof.enable()
+        call_get_move(ai.get_move, board, player, last)
+        prof.disable()
+    return pstats.Stats(prof)
+
+
+def _key_name(key):
+    filename, _line, func = key
+    return f"{os.path.basename(filename)}:{func}"
+
+
+def stage_table(stats, bot_file):
+    """[(имя, ncalls, tottime, cumtime)] для стадий и помощников из файла бота."""
+    base = os.path.basename(bot_file)
+    rows = {}
+    total = 0.0
+    for key, (cc, nc, tt, ct, _callers) in stats.stats.items():
+        filename, _line, func = key
+        if os.path.basename(filename) != base:
+            continue
+        if func == "get_move":
+            total += ct
+        if func in STAGES or func in HELPERS:
+            r = rows.setdefault(func, [0, 0.0, 0.0])
+            r[0] += nc
+            r[1] += tt
+            r[2] += ct
+    return total, rows
+
+
+def folded_stacks(stats, root_func="get_move", min_share=1e-6):
+    """
+    Свёрнутые стеки из графа вызовов cProfile. cProfile не хранит полные
+    стеки, поэтому cumtime вызываемой функции распределяется по путям
+    пропорционально времени, которое она провела под каждым вызывающим.
+    Рекурсия режется по повтору функции на пути.
+    """
+    callees = {}
+    for key, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+        for caller, cstat in callers.items():
+            ct = cstat[3]
+            callees.setdefault(caller, []).append((key, ct))
+
+    roots = [k for k in stats.stats if k[2] == root_func]
+    out = {}
+
+    def walk(key, path, budget, on_path):
+        cc, nc, tt, ct, _callers = stats.stats[key]
+        if ct <= 0 or budget <= 0:
+            return
+        scale = budget / ct
+        self_time = tt * scale
+        if self_time > 0:
+            out[path] = out.get(path, 0.0) + self_time
+        for child, child_ct in callees.get(key, []):
+            if child in on_path:
+                continue
+            share = child_ct * scale
+            if share < min_share:
+                continue
+            walk(child, path + ";" + _key_name(child), share, on_path | {child})
+
+    for r in roots:
+        walk(r, _key_name(r), stats.stats[r][3], {r})
+    return out
+
+
+def _per_bot_path(path, bot_name, n_bots):
+    if n_bots == 1:
+        return path
+    head, tail = os.path.split(path)
+    return os.path.join(head, f"{os.path.splitext(bot_name)[0]}.{tail}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Профиль get_move: прелюдия vs поиск")
+    ap.add_argument("bots", nargs="+", help="Пути к ботам .py")
+    ap.add_argument("--suite", default=DEFAULT_SUITE)
+    ap.add_argument("--limit", type=int, default=0, help="Только первые N позиций")
+    ap.add_argument("--depth", type=int, default=None)
+    ap.add_argument("--cpu", type=float, default=None)
+    ap.add_argument("--flame", default="", help="Файл свёрнутых стеков (для нескольких ботов — префикс имени)")
+    ap.add_argument("--pstats", default="", help="Сохранить сырой pstats (для snakeviz и т.п.)")
+    args = ap.parse_args()
+
+    with open(args.suite, encoding="utf-8") as f:
+        positions = json.load(f)["positions"]
+    if args.limit:
+        positions = positions[:args.limit]
+
+    for bot in args.bots:
+        bot = os.path.abspath(bot)
+        name = os.path.basename(bot)
+        stats = profile_bot(bot, positions, args.depth, args.cpu)
+        total, rows = stage_table(stats, bot)
+        search = sum(rows.get(f, (0, 0.0, 0.0))[2] for f in SEARCH_STAGES)
+        print(f"== {name}: {len(positions)} позиций, get_move cumtime={total:.3f}s")
+        if total:
+            print(f"  поиск {search:.3f}s ({search / total:.1%}), прелюдия {total - search:.3f}s "
+                  f"({(total - search) / total:.1%})")
+        print(f"  {'функция':30s} {'вызовы':>10s} {'tottime':>9s} {'cumtime':>9s} {'доля':>7s}")
+        for func, (nc, tt, ct) in sorted(rows.items(), key=lambda kv: -kv[1][2]):
+            share = ct / total if total else 0.0
+            kind = "stage" if func in STAGES else "helper"
+            print(f"  {func:30s} {nc:10d} {tt:9.3f} {ct:9.3f} {share:7.1%}  {kind}")
+        if args.flame:
+            path = _per_bot_path(args.flame, name, len(args.bots))
+            folded = folded_stacks(stats)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, sec in sorted(folded.items()):
+                    # flamegraph.pl ждёт целые «сэмплы» — берём микросекунды
+                    us = int(sec * 1e6)
+                    if us > 0:
+                        f.write(f"{stack} {us}\n")
+            print(f"  flame: {path}")
+        if args.pstats:
+            path = _per_bot_path(args.pstats, name, len(args.bots))
+            stats.dump_stats(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
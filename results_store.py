@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище результатов партий (SQLite) с агрегатами, которые обновляются
+при каждой вставке — запросы не сканируют миллионы партий.
+- games: одна строка на партию (боты и их версии, дебют, контроль
+  времени, победитель, длина, время и форс-ходы каждой стороны). Ключ
+  source уникален, поэтому повторный ingest того же файла/базы ничего не
+  дублирует.
+- agg: по строке на (бот, соперник, цвет, per_move, дебют, версии) —
+  партии, победы/ничьи/поражения, сумма длин выигранных партий, время
+  и число собственных ходов, форс-ходы. Поддерживается триггером на
+  INSERT в games (две строки — за чёрных и за белых), так что агрегаты не
+  расходятся с партиями даже при вставке из нескольких процессов.
+- Версия бота — первые 10 hex sha1 файла (+ «:опции» для спецификаций
+  selfplay). Для партий турнира её пишет tournament.py в момент игры, для
+  остальных источников — считается при ingest (файл мог измениться).
+- Дебют — id в таблице openings по списку ходов; 0 — без дебюта.
+
+Запрос отвечает выборкой по префиксу первичного ключа agg (бот, соперник,
+цвет, per_move), без обращения к games.
+
+Пример:
+  python results_store.py ingest results.db t.db data/games.jsonl games.jsonl
+  python results_store.py query results.db --bot mainGPT5ninght --opponent maineeWIN --color white --per-move 3
+  python results_store.py query results.db --bot mainGPT5ninght --by opponent
+  python results_store.py rebuild results.db      # пересчитать agg из games и сверить
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from arena import EMPTY, P1, P2
+from games import load_games
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS openings (
+    id    INTEGER PRIMARY KEY,
+    moves TEXT NOT NULL UNIQUE
+);
+INSERT OR IGNORE INTO openings (id, moves) VALUES (0, '[]');
+CREATE TABLE IF NOT EXISTS games (
+    id           INTEGER PRIMARY KEY,
+    source       TEXT NOT NULL UNIQUE,
+    black        TEXT NOT NULL,
+    black_ver    TEXT NOT NULL,
+    white        TEXT NOT NULL,
+    white_ver    TEXT NOT NULL,
+    opening_id   INTEGER NOT NULL,
+    per_move     REAL NOT NULL,
+    winner       INTEGER NOT NULL,
+    plies        INTEGER NOT NULL,
+    reason       TEXT,
+    time_black   REAL NOT NULL,
+    time_white   REAL NOT NULL,
+    moves_black  INTEGER NOT NULL,
+    moves_white  INTEGER NOT NULL,
+    forced_black INTEGER NOT NULL,
+    forced_white INTEGER NOT NULL,
+    added_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_pair ON games (black, white, per_move);
+CREATE TABLE IF NOT EXISTS agg (
+    bot        TEXT NOT NULL,
+    opponent   TEXT NOT NULL,
+    color      INTEGER NOT NULL,
+    per_move   REAL NOT NULL,
+    opening_id INTEGER NOT NULL,
+    bot_ver    TEXT NOT NULL,
+    opp_ver    TEXT NOT NULL,
+    games      INTEGER NOT NULL,
+    wins       INTEGER NOT NULL,
+    draws      INTEGER NOT NULL,
+    losses     INTEGER NOT NULL,
+    win_plies  INTEGER NOT NULL,
+    think_time REAL NOT NULL,
+    moves      INTEGER NOT NULL,
+    forced     INTEGER NOT NULL,
+    PRIMARY KEY (bot, opponent, color, per_move, opening_id, bot_ver, opp_ver)
+) WITHOUT ROWID;
+"""
+
+# агрегаты за одну сторону партии; {side}/{other} — black/white, {color} — 1/2
+_AGG_UPSERT = """
+    INSERT INTO agg VALUES (NEW.{side}, NEW.{other}, {color}, NEW.per_move, NEW.opening_id,
+                            NEW.{side}_ver, NEW.{other}_ver, 1,
+                            NEW.winner = {color}, NEW.winner = 0, NEW.winner = {opp},
+                            CASE WHEN NEW.winner = {color} THEN NEW.plies ELSE 0 END,
+                            NEW.time_{side}, NEW.moves_{side}, NEW.forced_{side})
+    ON CONFLICT DO UPDATE SET games = games + 1, wins = wins + excluded.wins, draws = draws + excluded.draws,
+        losses = losses + excluded.losses, win_plies = win_plies + excluded.win_plies,
+        think_time = think_time + excluded.think_time, moves = moves + excluded.moves,
+        forced = forced + excluded.forced;
+"""
+
+TRIGGER = ("CREATE TRIGGER IF NOT EXISTS games_agg AFTER INSERT ON games BEGIN"
+           + _AGG_UPSERT.format(side="black", other="white", color=P1, opp=P2)
+           + _AGG_UPSERT.format(side="white", other="black", color=P2, opp=P1)
+           + "END;")
+
+# та же свёртка одним запросом — для rebuild и сверки
+_AGG_SELECT = """
+    SELECT {side}, {other}, {color}, per_move, opening_id, {side}_ver, {other}_ver, COUNT(*),
+           SUM(winner = {color}), SUM(winner = 0), SUM(winner = {opp}),
+           SUM(CASE WHEN winner = {color} THEN plies ELSE 0 END),
+           SUM(time_{side}), SUM(moves_{side}), SUM(forced_{side})
+    FROM games GROUP BY {side}, {other}, per_move, opening_id, {side}_ver, {other}_ver
+"""
+AGG_FROM_GAMES = (_AGG_SELECT.format(side="black", other="white", color=P1, opp=P2) + " UNION ALL "
+                  + _AGG_SELECT.format(side="white", other="black", color=P2, opp=P1))
+
+AGG_KEYS = ("bot", "opponent", "color", "per_move", "opening_id", "bot_ver", "opp_ver")
+COLORS = {"black": P1, "white": P2}
+
+
+def connect(db_path):
+    # журнал DELETE, как у tournament.py: база может лежать на общем диске
+    conn = sqlite3.connect(db_path, timeout=60.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA busy_timeout=60000")
+    conn.executescript(SCHEMA)
+    conn.execute(TRIGGER)
+    return conn
+
+
+# ---------------- имена и версии ----------------
+
+def bot_name(spec):
+    """'dir/mainGPT5ninght.py:cpu_limit=0.2' → 'mainGPT5ninght'."""
+    path = (spec or "?").partition(":")[0]
+    name = os.path.basename(path)
+    return name[:-3] if name.endswith(".py") else name
+
+
+# (путь, mtime, размер) → sha1: файл, изменённый во время турнира, хэшируется заново
+_ver_cache = {}
+
+
+def bot_version(spec):
+    """sha1 файла бота (10 hex) + «:опции» спецификации; '' — файла нет."""
+    path, _, opts = (spec or "").partition(":")
+    try:
+        st = os.stat(path)
+    except OSError:
+        ver = ""
+    else:
+        key = (path, st.st_mtime_ns, st.st_size)
+        ver = _ver_cache.get(key)
+        if ver is None:
+            try:
+                with open(path, "rb") as f:
+                    ver = hashlib.sha1(f.read()).hexdigest()[:10]
+            except OSError:
+                ver = ""
+            else:
+                _ver_cache[key] = ver
+    return f"{ver}:{opts}" if opts else ver
+
+
+def opening_moves(rec):
+    """Дебют партии: список ходов (tournament) или их число (selfplay)."""
+    op = rec.get("opening")
+    if isinstance(op, int):
+        return [list(m) for m in rec["moves"][:op]]
+    return [list(m) for m in op or []]
+
+
+def opening_id(conn, moves):
+    key = json.dumps(moves, separators=(",", ":"))
+    conn.execute("INSERT OR IGNORE INTO openings (moves) VALUES (?)", (key,))
+    return conn.execute("SELECT id FROM openings WHERE moves = ?", (key,)).fetchone()[0]
+
+
+# ---------------- вставка ----------------
+
+def add_game(conn, rec, source, specs=None, versions=None):
+    """
+    Одна партия (arena.game_record). specs — пути/спецификации ботов
+    (чёрные, белые) для имён и версий, если в записи их нет. Возвращает
+    True, если партия новая (агрегаты обновил триггер).
+    """
+    specs = specs or rec.get("engines") or (rec.get("black"), rec.get("white"))
+    versions = versions or rec.get("versions") or (bot_version(specs[0]), bot_version(specs[1]))
+    moves = opening_moves(rec)
+    n, k = int(rec.get("plies", len(rec["moves"]))), len(moves)
+    times = rec.get("time") or (0.0, 0.0)
+    forced = rec.get("forced") or (0, 0)
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO games (source, black, black_ver, white, white_ver, opening_id, per_move, winner, "
+        "plies, reason, time_black, time_white, moves_black, moves_white, forced_black, forced_white, added_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (source, bot_name(specs[0]), versions[0], bot_name(specs[1]), versions[1], opening_id(conn, moves),
+         float(rec.get("per_move") or 0.0), int(rec.get("winner", EMPTY)), n, rec.get("reason"),
+         float(times[0]), float(times[1]), max(0, (n + 1) // 2 - (k + 1) // 2), max(0, n // 2 - k // 2),
+         int(forced[0]), int(forced[1]), time.time()))
+    return cur.rowcount == 1
+
+
+def _ingest(conn, items):
+    """items: (rec, source, specs) — одной транзакцией. → (новых, всего)."""
+    added = total = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for rec, source, specs in items:
+            added += add_game(conn, rec, source, specs)
+            total += 1
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return added, total
+
+
+def ingest_tournament(conn, db_path):
+    """Готовые партии базы tournament.py (ключ — путь базы и id партии)."""
+    from tournament import resolve_path
+
+    src = sqlite3.connect(db_path, timeout=60.0)
+    try:
+        rows = src.execute("SELECT id, black, white, result FROM jobs WHERE status = 'done' ORDER BY id").fetchall()
+    finally:
+        src.close()
+    base = os.path.abspath(db_path)
+    return _ingest(conn, ((json.loads(result), f"tournament:{base}:{job_id}",
+                           (resolve_path(db_path, black), resolve_path(db_path, white)))
+                          for job_id, black, white, result in rows))
+
+
+def ingest_file(conn, path):
+    """JSONL арены/selfplay или лог сервера (ключ — путь файла и номер партии)."""
+    base = os.path.abspath(path)
+    here = os.path.dirname(base)
+
+    def specs(rec):
+        eng = rec.get("engines")
+        if eng:
+            return [e if os.path.isabs(e) else os.path.join(here, e) for e in eng]
+        return [os.path.join(here, n) if n and n.endswith(".py") else n for n in (rec.get("black"), rec.get("white"))]
+
+    return _ingest(conn, ((rec, f"file:{base}:{rec.get('id', i)}", specs(rec))
+                          for i, rec in enumerate(load_games(path))))
+
+
+def ingest(conn, path):
+    with open(path, "rb") as f:
+        is_sqlite = f.read(16) == b"SQLite format 3\x00"
+    return ingest_tournament(conn, path) if is_sqlite else ingest_file(conn, path)
+
+
+# ---------------- запросы ----------------
+
+def query(conn, bot, opponent=None, color=None, per_move=None, opening=None, bot_ver=None, by=None):
+    """
+    Агрегаты бота по фильтрам (None — по всем значениям). by — поле из
+    AGG_KEYS для разбивки. → {значение by (или None): сводка}.
+    """
+    where, params = ["bot = ?"], [bot]
+    for col, val in (("opponent", opponent), ("color", color), ("per_move", per_move),
+                     ("opening_id", opening), ("bot_ver", bot_ver)):
+        if val is not None:
+            where.append(f"{col} = ?")
+            params.append(val)
+    if by is not None and by not in AGG_KEYS:
+        raise ValueError(f"by: одно из {AGG_KEYS}")
+    group = by or "NULL"
+    sql = (f"SELECT {group}, SUM(games), SUM(wins), SUM(draws), SUM(losses), SUM(win_plies), SUM(think_time), "
+           f"SUM(moves), SUM(forced) FROM agg WHERE {' AND '.join(where)} GROUP BY {group} ORDER BY {group}")
+    out = {}
+    for key, games, wins, draws, losses, win_plies, think, moves, forced in conn.execute(sql, params):
+        if not games:
+            continue
+        out[key] = {
+            "games": games, "wins": wins, "draws": draws, "losses": losses,
+            "win_rate": wins / games,
+            "score": (wins + 0.5 * draws) / games,
+            "avg_plies_to_win": win_plies / wins if wins else None,
+            "think_per_move": think / moves if moves else None,
+            "forced_rate": forced / moves if moves else None,
+        }
+    return out
+
+
+def rebuild(conn):
+    """Пересчитать agg из games. → число ключей, где триггерные агрегаты расходились."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        fresh = {row[:7]: row[7:] for row in conn.execute(AGG_FROM_GAMES)}
+        old = {row[:7]: row[7:] for row in conn.execute("SELECT * FROM agg")}
+        # время — сумма float в другом порядке, сравнение с допуском
+        bad = sum(1 for k in fresh.keys() | old.keys()
+                  if k not in fresh or k not in old
+                  or fresh[k][:5] != old[k][:5] or abs(fresh[k][5] - old[k][5]) > 1e-6 or fresh[k][6:] != old[k][6:])
+        conn.execute("DELETE FROM agg")
+        conn.executemany(f"INSERT INTO agg VALUES ({', '.join('?' * 15)})", (k + v for k, v in fresh.items()))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return bad
+
+
+def _fmt(v, spec):
+    return "—" if v is None else format(v, spec)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Хранилище результатов партий с агрегатами")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    i = sub.add_parser("ingest", help="Добавить партии (база tournament.py, JSONL, лог сервера)")
+    i.add_argument("db")
+    i.add_argument("sources", nargs="+")
+
+    q = sub.add_parser("query", help="Сводка по боту")
+    q.add_argument("db")
+    q.add_argument("--bot", required=True, help="Имя бота без .py")
+    q.add_argument("--opponent")
+    q.add_argument("--color", choices=sorted(COLORS))
+    q.add_argument("--per-move", type=float)
+    q.add_argument("--opening", type=int, help="id дебюта (0 — без дебюта)")
+    q.add_argument("--version", help="Версия бота (sha1-префикс)")
+    q.add_argument("--by", choices=AGG_KEYS, help="Разбивка по полю")
+
+    r = sub.add_parser("rebuild", help="Пересчитать агрегаты из партий и сверить")
+    r.add_argument("db")
+    args = ap.parse_args()
+
+    conn = connect(args.db)
+    if args.cmd == "ingest":
+        for path in args.sources:
+            t0 = time.perf_counter()
+            added, total = ingest(conn, path)
+            print(f"{path}: новых {added} из {total} ({time.perf_counter() - t0:.2f} с)")
+        print(f"всего партий: {conn.execute('SELECT COUNT(*) FROM games').fetchone()[0]}")
+        return 0
+
+    if args.cmd == "query":
+        t0 = time.perf_counter()
+        res = query(conn, args.bot, args.opponent, COLORS.get(args.color), args.per_move, args.opening,
+                    args.version, args.by)
+        ms = (time.perf_counter() - t0) * 1000
+        if not res:
+            print("нет партий")
+        for key, s in res.items():
+            label = "" if args.by is None else f"{key!s:24s} "
+            print(f"{label}партий {s['games']:6d}  W/D/L {s['wins']}/{s['draws']}/{s['losses']}  "
+                  f"win {s['win_rate']:.3f}  очки {s['score']:.3f}  до победы {_fmt(s['avg_plies_to_win'], '.1f')}  "
+                  f"с/ход {_fmt(s['think_per_move'], '.3f')}  форс {_fmt(s['forced_rate'], '.4f')}")
+        print(f"({ms:.2f} мс)")
+        return 0
+
+    if args.cmd == "rebuild":
+        bad = rebuild(conn)
+        print(f"агрегаты пересчитаны; расходилось строк: {bad}")
+        return 1 if bad else 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
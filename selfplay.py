@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Self-play: генерация партий и размеченных позиций на всех ядрах.
+- Пары движков: --pair "A.py[:ключ=значение,...]" "B.py[:...]" (можно
+  несколько пар; партии раздаются по парам по кругу, цвета чередуются).
+  Ключи — аргументы MyAI (cpu_limit, depth, ...), например cpu_limit=0.2.
+- Дебют — --opening-plies случайных ходов, детерминированно от seed и id
+  партии, так что повтор запуска даёт те же партии.
+- Партии играются в процессах пула целиком (без процесса на ход, как в
+  арене), результат пишет только главный процесс — файлы не перемешиваются.
+- games.jsonl — формат arena.game_record (+ id, engines, opening); его
+  читают games.load_games / tune_eval / bench build.
+- positions.jsonl — выборка позиций: доска строкой из 64 цифр (i = z*16+y*4+x),
+  сторона хода, оценка поиска (stats.best_value со стороны хода), глубина
+  и исход партии для стороны хода (1 / 0.5 / 0).
+- Повторный запуск с теми же --out продолжает: готовые id пропускаются,
+  «хвосты» позиций недописанных партий отбрасываются.
+
+Пример:
+  python selfplay.py --games 20000 --pair "mainGPT5ninght.py:cpu_limit=0.2" "mainGPT5ninght.py:cpu_limit=0.2" \\
+      --pair "mainGPT5ninght.py:cpu_limit=0.2" "main.py" --out-dir data/
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool, cpu_count, set_start_method
+
+import local_driver
+from arena import EMPTY, P1, P2, apply_move, call_get_move, check_winner_at, game_record, new_board, replay_moves
+from bench import _bot_factory
+
+sys.modules.setdefault("framework", local_driver)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# состояние процесса-воркера: классы MyAI по спецификации
+_engines = {}
+
+
+def parse_engine(spec):
+    """'path.py:key=val,key=val' → (abs_path, kwargs)."""
+    path, _, opts = spec.partition(":")
+    kwargs = {}
+    for item in filter(None, (p.strip() for p in opts.split(","))):
+        k, _, v = item.partition("=")
+        kwargs[k.strip()] = float(v) if "." in v or "e" in v.lower() else int(v)
+    if not os.path.isabs(path):
+        path = os.path.join(HERE, path)
+    return path, kwargs
+
+
+def _new_engine(spec):
+    """Новый MyAI на партию (TT/killers — как у свежего бота на сервере)."""
+    path, kwargs = parse_engine(spec)
+    if spec not in _engines:
+        _engines[spec] = _bot_factory(path)
+    ai = _engines[spec](**kwargs)
+    if hasattr(ai, "collect_stats"):
+        ai.collect_stats = True
+    return ai
+
+
+def random_opening(rng, plies):
+    """Случайные ходы без немедленной победы (партия должна начаться с «живой» позиции)."""
+    moves = []
+    for _ in range(plies):
+        board, _p, _w = replay_moves(moves)
+        legal = [(x, y) for y in range(4) for x in range(4) if board[3][y][x] == EMPTY]
+        rng.shuffle(legal)
+        for mv in legal:
+            if replay_moves(moves + [mv])[2] == EMPTY:
+                moves.append(mv)
+                break
+        else:
+            break
+    return moves
+
+
+def board_string(board):
+    return "".join(str(board[z][y][x]) for z in range(4) for y in range(4) for x in range(4))
+
+
+def play_one(task):
+    """Одна партия в воркере: (id, запись партии, позиции)."""
+    game_id, black_spec, white_spec, opening_plies, sample_rate, seed = task
+    rng = random.Random(seed * 1_000_003 + game_id)
+    opening = random_opening(rng, opening_plies)
+    bots = {P1: _new_engine(black_spec), P2: _new_engine(white_spec)}
+
+    board = new_board()
+    player = P1
+    moves = []
+    last_move = (None, None, None)
+    for mv in opening:
+        last_move, _ = apply_move(board, player, mv)
+        moves.append(mv)
+        player = P2 if player == P1 else P1
+
+    samples = []
+    times = {P1: 0.0, P2: 0.0}
+    forced = {P1: 0, P2: 0}
+    winner, reason = EMPTY, "full_draw"
+    while len(moves) < 64:
+        ai = bots[player]
+        before = board_string(board)
+        t0 = time.process_time()
+        try:
+            mv = call_get_move(ai.get_move, [[row[:] for row in layer] for layer in board], player, last_move)
+        except Exception:
+            mv = None
+        times[player] += time.process_time() - t0
+        placed, invalid = apply_move(board, player, mv)
+        if invalid is not None:
+            forced[player] += 1
+        if placed is None:
+            break
+        stats = getattr(ai, "stats", None)
+        if stats is not None and getattr(stats, "stage", "") == "search" and rng.random() < sample_rate:
+            samples.append({"ply": len(moves), "board": before, "player": player,
+                            "score": stats.best_value, "depth": stats.depth, "move": [placed[0], placed[1]]})
+        moves.append((placed[0], placed[1]))
+        last_move = placed
+        winner = check_winner_at(board, placed)
+        if winner != EMPTY:
+            reason = "ok"
+            break
+        player = P2 if player == P1 else P1
+
+    rec = game_record(os.path.basename(black_spec), os.path.basename(white_spec), moves, winner, reason,
+                      None, (times[P1], times[P2]), (forced[P1], forced[P2]))
+    rec.update({"id": game_id, "engines": [black_spec, white_spec], "opening": len(opening)})
+    for s in samples:
+        s["game"] = game_id
+        s["result"] = 0.5 if winner == EMPTY else (1.0 if winner == s["player"] else 0.0)
+    return game_id, rec, samples
+
+
+def _done_ids(games_path):
+    done = set()
+    if os.path.exists(games_path):
+        with open(games_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    done.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    break  # оборванная последняя строка
+    return done
+
+
+def _truncate_to_valid(path, keep):
+    """Оставить только целые строки, для которых keep(запись) истинно."""
+    if not os.path.exists(path):
+        return
+    tmp = path + ".tmp"
+    with open(path, encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+        for line in src:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if keep(rec):
+                dst.write(line if line.endswith("\n") else line + "\n")
+    os.replace(tmp, path)
+
+
+def make_tasks(n_games, pairs, opening_plies, sample_rate, seed, done):
+    tasks = []
+    for gid in range(n_games):
+        if gid in done:
+            continue
+        a, b = pairs[(gid // 2) % len(pairs)]
+        black, white = (a, b) if gid % 2 == 0 else (b, a)
+        tasks.append((gid, black, white, opening_plies, sample_rate, seed))
+    return tasks
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Self-play: партии и позиции для обучения/книги")
+    ap.add_argument("--games", type=int, default=1000, help="Сколько партий всего (id 0..N-1)")
+    ap.add_argument("--pair", nargs=2, action="append", metavar=("A", "B"), default=[],
+                    help='Пара движков "путь.py[:ключ=значение,...]"')
+    ap.add_argument("--opening-plies", type=int, default=4)
+    ap.add_argument("--sample-rate", type=float, default=0.5, help="Доля позиций (после поиска) в датасет")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=0, help="Процессов (по умолчанию — все ядра)")
+    ap.add_argument("--out-dir", default=".", help="Куда писать games.jsonl и positions.jsonl")
+    args = ap.parse_args()
+
+    pairs = [tuple(p) for p in args.pair] or [("mainGPT5ninght.py:cpu_limit=0.2",) * 2]
+    os.makedirs(args.out_dir, exist_ok=True)
+    games_path = os.path.join(args.out_dir, "games.jsonl")
+    pos_path = os.path.join(args.out_dir, "positions.jsonl")
+
+    done = _done_ids(games_path)
+    _truncate_to_valid(games_path, lambda r: r.get("id") in done)
+    _truncate_to_valid(pos_path, lambda r: r.get("game") in done)
+    tasks = make_tasks(args.games, pairs, args.opening_plies, args.sample_rate, args.seed, done)
+    print(f"готово {len(done)}, осталось {len(tasks)} партий; пары: {pairs}")
+    if not tasks:
+        return 0
+
+    start = time.perf_counter()
+    n_pos = 0
+    wins = {P1: 0, P2: 0, EMPTY: 0}
+    with open(games_path, "a", encoding="utf-8") as gf, open(pos_path, "a", encoding="utf-8") as pf, \
+            Pool(processes=args.workers or cpu_count()) as pool:
+        for i, (gid, rec, samples) in enumerate(pool.imap_unordered(play_one, tasks), 1):
+            # сначала позиции, потом партия: при обрыве «висячие» позиции срежет _truncate_to_valid
+            for s in samples:
+                pf.write(json.dumps(s, separators=(",", ":")) + "\n")
+            pf.flush()
+            gf.write(json.dumps(rec) + "\n")
+            gf.flush()
+            n_pos += len(samples)
+            wins[rec["winner"]] += 1
+            if i % 50 == 0 or i == len(tasks):
+                el = time.perf_counter() - start
+                print(f"  {i}/{len(tasks)} партий, {n_pos} позиций, {n_pos / el:.1f} поз/с; "
+                      f"P1 {wins[P1]} / P2 {wins[P2]} / ничьих {wins[EMPTY]}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+    sys.exit(main())
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Распределённый решатель дебютов 4x4x4 с гравитацией: точные значения
+(победа / ничья / поражение стороны хода) и ходы для книги main.py.
+- init: дерево от корня (пустая доска или --root) раскрывается на --split
+  полуходов, позиции дедуплицируются по 8 симметриям подошвы
+  (symmetry.canonical); каждая позиция на глубине split — задание в SQLite
+  (как очередь tournament.py: BEGIN IMMEDIATE, аренда, попытки; база может
+  лежать в общем каталоге, воркеры — на разных машинах).
+- work: воркер берёт задание и решает его по ходам корня: значение каждого
+  решённого хода сразу пишется в базу (checkpoint) и продлевает аренду.
+  Упавший или исчерпавший --max-nodes воркер не теряет решённые ходы:
+  следующий продолжает с оставшихся. Нехватка узлов — статус unknown.
+- requeue: unknown → pending с большим бюджетом узлов.
+- merge: значения заданий поднимаются минимаксом к корню; каждая позиция
+  с известным значением (и не проигранная) даёт запись книги
+  (book_key канона → ход в канонической системе, формат book_builder.py).
+  --embed вшивает книгу в секцию OPENING_BOOK.
+
+Ядро — negamax с альфа-бетой по значениям {-1, 0, 1} на битбордах
+(bitboard.CELL_LINE_MASKS): немедленная победа, вынужденный блок, две
+угрозы соперника — проигрыш, ход под угрозу соперника не рассматривается;
+с DEAD_MIN_STONES камней: нет живых линий (без камней обоих цветов) —
+ничья, из ходов в полностью мёртвые столбцы (чистый темп) — один;
+TT с границами по точному ключу (камни стороны хода, камни соперника).
+
+Пример:
+  python solver.py init solve.db --split 4 --max-nodes 2000000
+  python solver.py work solve.db --procs 4            # на каждой машине
+  python solver.py requeue solve.db --max-nodes 50000000
+  python solver.py status solve.db
+  python solver.py merge solve.db --book book.json --embed main.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+import traceback
+from multiprocessing import Process, set_start_method
+
+from arena import EMPTY, P1, P2, apply_move, check_winner_at, parse_moves, replay_moves
+from bitboard import CELL_LINE_MASKS, COLUMN_ORDER, LINE_MASKS, Position
+from book_builder import embed, load_json, save_json
+from parallel_search import root_moves
+from symmetry import book_key, canonical, move_to_canonical
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY,
+    code        TEXT NOT NULL UNIQUE,
+    moves       TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    worker      TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    max_nodes   INTEGER NOT NULL,
+    nodes       INTEGER NOT NULL DEFAULT 0,
+    children    TEXT NOT NULL DEFAULT '{}',
+    value       INTEGER,
+    best        TEXT,
+    error       TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_until);
+"""
+
+# аренда продлевается каждым checkpoint; без них задание отдаётся другому через LEASE
+LEASE = 3600.0
+TT_LIMIT = 2_000_000
+# мёртвые линии проверяются с этого числа камней (раньше их почти не бывает)
+DEAD_MIN_STONES = 32
+COLUMN_MASKS = [0x0001000100010001 << c for c in range(16)]
+
+WIN, DRAW, LOSS = 1, 0, -1
+_NAMES = {WIN: "победа", DRAW: "ничья", LOSS: "поражение"}
+
+
+def connect(db_path):
+    # журнал DELETE (не WAL), как у tournament.py: база может лежать на сетевом диске
+    conn = sqlite3.connect(db_path, timeout=60.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA busy_timeout=60000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _code_hex(board):
+    return f"{canonical(board)[0]:x}"
+
+
+# ---------------- ядро ----------------
+
+class Budget(Exception):
+    """Исчерпан бюджет узлов."""
+
+
+class Solver:
+    """Точный negamax: solve(me, opp, heights, count) → 1 / 0 / -1 за сторону хода."""
+
+    def __init__(self, tt_limit=TT_LIMIT):
+        self.tt = {}
+        self.tt_limit = tt_limit
+        self.nodes = 0
+        self.max_nodes = 0
+
+    def solve(self, me, opp, heights, count, max_nodes=0):
+        self.max_nodes = self.nodes + max_nodes if max_nodes else 0
+        if len(self.tt) > self.tt_limit:
+            self.tt.clear()
+        return self._negamax(me, opp, list(heights), count, LOSS, WIN, LINE_MASKS)
+
+    def _negamax(self, me, opp, heights, count, alpha, beta, lines):
+        self.nodes += 1
+        if self.max_nodes and self.nodes > self.max_nodes:
+            raise Budget()
+        if count >= 64:
+            return DRAW
+
+        # клетки, которые сейчас достраивают линию: свои — победа, чужие — блок
+        opp_threats = []
+        for c in COLUMN_ORDER:
+            h = heights[c]
+            if h < 4:
+                i = h * 16 + c
+                mine, theirs = me | (1 << i), opp | (1 << i)
+                for m in CELL_LINE_MASKS[i]:
+                    if mine & m == m:
+                        return WIN
+                for m in CELL_LINE_MASKS[i]:
+                    if theirs & m == m:
+                        opp_threats.append(c)
+                        break
+        if len(opp_threats) >= 2:
+            return LOSS
+        if count == 63:
+            return DRAW
+
+        key = (me << 64) | opp
+        entry = self.tt.get(key)
+        if entry is not None:
+            lo, hi = entry
+            if lo >= beta:
+                return lo
+            if hi <= alpha:
+                return hi
+            if lo > alpha:
+                alpha = lo
+            if hi < beta:
+                beta = hi
+        alpha0 = alpha
+
+        # живые клетки — на линиях без камней обоих цветов; без них — ничья.
+        # lines — ещё живые линии родителя: умершая линия не оживает
+        live = -1
+        if count >= DEAD_MIN_STONES:
+            lines = [m for m in lines if not (m & me and m & opp)]
+            if not lines:
+                return DRAW
+            live = 0
+            for m in lines:
+                live |= m
+        free = ~(me | opp)
+
+        moves = []
+        tempo = False
+        for c in (opp_threats or COLUMN_ORDER):
+            h = heights[c]
+            if h >= 4:
+                continue
+            # ходы в полностью мёртвые столбцы равноценны — достаточно одного
+            if not COLUMN_MASKS[c] & free & live:
+                if tempo:
+                    continue
+                tempo = True
+            i = h * 16 + c
+            # клетка над ходом достраивает линию соперника — он сразу выиграет
+            if h < 3:
+                above = i + 16
+                abit = 1 << above
+                if any((opp | abit) & m == m for m in CELL_LINE_MASKS[above]):
+                    continue
+            # порядок: сколько своих «троек» без камней соперника создаёт ход
+            mine = me | (1 << i)
+            score = 0
+            for m in CELL_LINE_MASKS[i]:
+                if not opp & m and bin(mine & m).count("1") == 3:
+                    score += 1
+            moves.append((-score, c))
+        moves.sort()
+
+        best = LOSS
+        for _s, c in moves:
+            bit = 1 << (heights[c] * 16 + c)
+            heights[c] += 1
+            v = -self._negamax(opp, me | bit, heights, count + 1, -beta, -alpha, lines)
+            heights[c] -= 1
+            if v > best:
+                best = v
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        break
+
+        lo, hi = entry if entry is not None else (LOSS, WIN)
+        if best <= alpha0:
+            hi = best
+        elif best >= beta:
+            lo = best
+        else:
+            lo = hi = best
+        self.tt[key] = (lo, hi)
+        return best
+
+
+def _position(moves):
+    board, player, _w = replay_moves(moves)
+    pos = Position.from_board(board, player)
+    return board, player, pos
+
+
+# ---------------- init ----------------
+
+def decompose(root, split):
+    """
+    Позиции через split полуходов от root (ходы с пустой доски), по одной на
+    класс симметрии; партии, закончившиеся раньше, в задания не попадают.
+    """
+    frontier = [list(root)]
+    for _ in range(split):
+        nxt, seen = [], set()
+        for moves in frontier:
+            board, player, _w = replay_moves(moves)
+            for mv in root_moves(board):
+                child = [[row[:] for row in layer] for layer in board]
+                placed, _r = apply_move(child, player, mv)
+                if check_winner_at(child, placed) != EMPTY or len(moves) + 1 >= 64:
+                    continue
+                code = canonical(child)[0]
+                if code not in seen:
+                    seen.add(code)
+                    nxt.append(moves + [list(mv)])
+        frontier = nxt
+    return frontier
+
+
+def init_jobs(conn, root, split, max_nodes):
+    positions = decompose(root, split)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (json.dumps(root),))
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('split', ?)", (str(split),))
+        before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        for moves in positions:
+            conn.execute("INSERT OR IGNORE INTO jobs (code, moves, max_nodes) VALUES (?, ?, ?)",
+                         (_code_hex(replay_moves(moves)[0]), json.dumps(moves), max_nodes))
+        added = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - before
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return added, len(positions)
+
+
+# ---------------- work ----------------
+
+def claim(conn, worker, max_attempts):
+    """Атомарно взять pending-задание или running с истёкшей арендой (как tournament.claim)."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("UPDATE jobs SET status = 'failed' WHERE status = 'running' AND lease_until < ? "
+                     "AND attempts >= ?", (now, max_attempts))
+        row = conn.execute(
+            "SELECT id, moves, max_nodes, nodes, children FROM jobs "
+            "WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) "
+            "ORDER BY id LIMIT 1", (now,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (worker, now + LEASE, row[0]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _update(conn, job_id, worker, sql, params):
+    """UPDATE задания, только если оно всё ещё за этим воркером."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cur = conn.execute(f"UPDATE jobs SET {sql} WHERE id = ? AND worker = ? AND status = 'running'",
+                           (*params, job_id, worker))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return cur.rowcount == 1
+
+
+def solve_job(conn, solver, row, worker, verbose=True):
+    """
+    Решить задание по ходам корня с checkpoint после каждого хода.
+    → (значение или None, лучший ход, узлов за запуск, задание ещё наше).
+    """
+    job_id, moves_json, max_nodes, nodes_done, children_json = row
+    moves = [tuple(m) for m in json.loads(moves_json)]
+    children = {int(c): v for c, v in json.loads(children_json).items()}
+    _board, player, pos = _position(moves)
+    me, opp = pos.stones[player - 1], pos.stones[2 - player]
+    # max_nodes == 0 — без лимита; исчерпанный бюджет (budget <= 0) — сразу unknown
+    budget = max_nodes - nodes_done
+    start_nodes = solver.nodes
+
+    # немедленная победа — без перебора
+    for c in pos.winning_columns(player):
+        children[c] = WIN
+        break
+
+    for c in pos.legal_columns():
+        if WIN in children.values():
+            break
+        if c in children:
+            continue
+        h = pos.heights[c]
+        heights = pos.heights[:]
+        heights[c] += 1
+        used = solver.nodes - start_nodes
+        if max_nodes and used >= budget:
+            break
+        try:
+            v = -solver.solve(opp, me | (1 << (h * 16 + c)), heights, pos.count + 1,
+                              max_nodes=(budget - used) if max_nodes else 0)
+        except Budget:
+            break
+        children[c] = v
+        ok = _update(conn, job_id, worker, "children = ?, nodes = ?, lease_until = ?",
+                     (json.dumps(children), nodes_done + solver.nodes - start_nodes, time.time() + LEASE))
+        if verbose:
+            print(f"[{worker}] задание {job_id}: ход {c % 4},{c // 4} → {_NAMES[v]} ({solver.nodes - start_nodes} узлов)")
+        if not ok:
+            return None, None, solver.nodes - start_nodes, False
+
+    used = solver.nodes - start_nodes
+    legal = pos.legal_columns()
+    if children and (max(children.values()) == WIN or all(c in children for c in legal)):
+        c = max(children, key=lambda k: (children[k], -COLUMN_ORDER.index(k)))
+        value, best = children[c], (c % 4, c // 4)
+        ok = _update(conn, job_id, worker, "status = 'done', value = ?, best = ?, children = ?, nodes = ?, "
+                     "finished_at = ?", (value, json.dumps(best), json.dumps(children), nodes_done + used, time.time()))
+        return value, best, used, ok
+    ok = _update(conn, job_id, worker, "status = 'unknown', children = ?, nodes = ?, lease_until = NULL",
+                 (json.dumps(children), nodes_done + used))
+    return None, None, used, ok
+
+
+def work(db_path, worker, max_attempts=3, max_jobs=0, verbose=True):
+    conn = connect(db_path)
+    solver = Solver()
+    solved = 0
+    try:
+        while not max_jobs or solved < max_jobs:
+            row = claim(conn, worker, max_attempts)
+            if row is None:
+                break
+            t0 = time.perf_counter()
+            try:
+                value, best, used, ok = solve_job(conn, solver, row, worker, verbose)
+            except Exception as e:
+                _update(conn, row[0], worker, "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                        "error = ?, lease_until = NULL", (max_attempts, f"{e}\n{traceback.format_exc()}"))
+                if verbose:
+                    print(f"[{worker}] задание {row[0]}: ошибка {e}")
+                continue
+            solved += 1
+            if verbose:
+                res = "бюджет узлов исчерпан" if value is None else f"{_NAMES[value]}, ход {best}"
+                print(f"[{worker}] задание {row[0]}: {res} ({used} узлов, {time.perf_counter() - t0:.1f} с)"
+                      f"{'' if ok else ' — перехвачено, не записано'}")
+    finally:
+        conn.close()
+    return solved
+
+
+def _work_proc(db_path, worker, max_attempts, max_jobs):
+    work(db_path, worker, max_attempts, max_jobs)
+
+
+# ---------------- merge ----------------
+
+def propagate(conn):
+    """
+    Минимакс от корня до заданий. → {code: (значение, ход в системе канона)}
+    для всех позиций с известным значением (включая сами задания).
+    """
+    root = [tuple(m) for m in json.loads(conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()[0])]
+    split = int(conn.execute("SELECT value FROM meta WHERE key = 'split'").fetchone()[0])
+    # ход задания записан в системе его доски (moves) — переводим в канон
+    solved = {}
+    for code, moves, value, best in conn.execute("SELECT code, moves, value, best FROM jobs WHERE status = 'done'"):
+        _c, t = canonical(replay_moves(json.loads(moves))[0])
+        solved[int(code, 16)] = (value, move_to_canonical(tuple(json.loads(best)), t))
+    memo = {}
+
+    def node(board, player, depth):
+        code, t = canonical(board)
+        if code in memo:
+            return memo[code], t
+        if depth == split:
+            memo[code] = solved.get(code)
+            return memo[code], t
+        best_v, best_mv, unknown = None, None, False
+        for mv in root_moves(board):
+            child = [[row[:] for row in layer] for layer in board]
+            placed, _r = apply_move(child, player, mv)
+            if check_winner_at(child, placed) != EMPTY:
+                v = WIN
+            elif depth + len(root) + 1 >= 64:
+                v = DRAW
+            else:
+                r, _t = node(child, P2 if player == P1 else P1, depth + 1)
+                if r is None:
+                    unknown = True
+                    continue
+                v = -r[0]
+            if best_v is None or v > best_v:
+                best_v, best_mv = v, mv
+            if v == WIN:
+                break
+        if best_v is None or (unknown and best_v < WIN):
+            memo[code] = None
+        else:
+            memo[code] = (best_v, move_to_canonical(best_mv, t))
+        return memo[code], t
+
+    board, player, _w = replay_moves(root)
+    node(board, player, 0)
+    memo.update(solved)
+    return {code: r for code, r in memo.items() if r is not None}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Распределённый решатель дебютов 4x4x4")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    i = sub.add_parser("init", help="Разбить дерево на задания")
+    i.add_argument("db")
+    i.add_argument("--split", type=int, default=4, help="Глубина разбиения в полуходах от корня")
+    i.add_argument("--root", default="", help='Корень: ходы с пустой доски "x,y x,y ..."')
+    i.add_argument("--max-nodes", type=int, default=2_000_000, help="Бюджет узлов на задание (0 — без лимита)")
+
+    w = sub.add_parser("work", help="Решать задания, пока они есть")
+    w.add_argument("db")
+    w.add_argument("--procs", type=int, default=1)
+    w.add_argument("--worker", default="", help="Имя воркера (по умолчанию host:pid)")
+    w.add_argument("--max-attempts", type=int, default=3)
+    w.add_argument("--max-jobs", type=int, default=0, help="Остановиться после N заданий (на воркер)")
+
+    r = sub.add_parser("requeue", help="unknown → pending с новым бюджетом")
+    r.add_argument("db")
+    r.add_argument("--max-nodes", type=int, required=True)
+
+    s = sub.add_parser("status", help="Статусы заданий и значение корня")
+    s.add_argument("db")
+
+    m = sub.add_parser("merge", help="Поднять значения к корню и записать книгу")
+    m.add_argument("db")
+    m.add_argument("--book", default="book.json", help="JSON книги book_builder.py (дополняется)")
+    m.add_argument("--embed", default="", help="Вшить книгу в файл бота (секция OPENING_BOOK)")
+    args = ap.parse_args()
+
+    if args.cmd == "work":
+        base = args.worker or f"{socket.gethostname()}:{os.getpid()}"
+        if args.procs <= 1:
+            work(args.db, base, args.max_attempts, args.max_jobs)
+            return 0
+        procs = [Process(target=_work_proc, args=(args.db, f"{base}/{k}", args.max_attempts, args.max_jobs))
+                 for k in range(args.procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        return 0
+
+    conn = connect(args.db)
+    if args.cmd == "init":
+        root = [list(mv) for mv in parse_moves(args.root)]
+        if replay_moves(root)[2] != EMPTY:
+            ap.error("корень — уже законченная партия")
+        added, total = init_jobs(conn, root, args.split, args.max_nodes)
+        print(f"позиций на глубине {args.split}: {total} (классов симметрии), новых заданий {added}")
+        return 0
+
+    if args.cmd == "requeue":
+        n = conn.execute("UPDATE jobs SET status = 'pending', max_nodes = ? WHERE status = 'unknown'",
+                         (args.max_nodes,)).rowcount
+        print(f"в очередь снова: {n}")
+        return 0
+
+    if args.cmd == "status":
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        print(", ".join(f"{k}: {counts.get(k, 0)}" for k in ("pending", "running", "unknown", "done", "failed")))
+        values = dict(conn.execute("SELECT value, COUNT(*) FROM jobs WHERE status = 'done' GROUP BY value"))
+        print("решено: " + ", ".join(f"{_NAMES[v]} {n}" for v, n in sorted(values.items(), reverse=True)))
+        nodes = conn.execute("SELECT SUM(nodes) FROM jobs").fetchone()[0] or 0
+        print(f"узлов всего: {nodes}")
+        known = propagate(conn)
+        root = json.loads(conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()[0])
+        r = known.get(canonical(replay_moves(root)[0])[0])
+        print(f"корень: {'не решён' if r is None else _NAMES[r[0]] + ' стороны хода'}; "
+              f"позиций с известным значением: {len(known)}")
+        return 0
+
+    if args.cmd == "merge":
+        known = propagate(conn)
+        entries, meta = (load_json(args.book) if os.path.exists(args.book) else ({}, {}))
+        added = replaced = 0
+        for code, (value, cmove) in known.items():
+            if value == LOSS:
+                continue  # любой ход проигрывает — эвристический ход книги не хуже
+            key = book_key(code)
+            if key not in entries:
+                added += 1
+            elif tuple(entries[key]) != tuple(cmove):
+                replaced += 1
+            entries[key] = tuple(cmove)
+        meta = dict(meta, solver={"db": os.path.basename(args.db), "positions": len(known)})
+        save_json(args.book, entries, meta)
+        print(f"книга {args.book}: {len(entries)} позиций, из решателя новых {added}, заменено {replaced}")
+        if args.embed:
+            embed(args.embed, entries)
+            print(f"Вшито в {args.embed}")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Симметрии доски 4x4x4 с гравитацией (для офлайн-инструментов).
+
+Гравитация фиксирует ось z, поэтому остаются только симметрии «подошвы»
+4x4 — группа диэдра D4 (4 поворота × отражение), 8 элементов. Перестановка
+внутренних/внешних рядов (0↔1, 2↔3), которая есть у Qubic без гравитации,
+здесь НЕ сохраняет диагонали в плоскостях xz/yz — verify_symmetries() это
+проверяет по полному набору линий арены.
+
+Соглашения (их же повторяет main.py):
+  column c = y*4 + x, cell i = z*16 + y*4 + x;
+  COLUMN_PERMS[t][c] — куда столбец c переходит под симметрией t;
+  code(board) — 2 бита на клетку, клетка i в битах 2i..2i+1;
+  канон — минимальный code по 8 образам, ход книги хранится в его системе.
+"""
+
+from arena import ALL_LINES, SIZE
+
+MASK64 = (1 << 64) - 1
+
+
+def _d4_maps():
+    """8 отображений (x, y) → (x', y') на сетке 4x4."""
+    n = SIZE - 1
+    return [
+        lambda x, y: (x, y),
+        lambda x, y: (n - y, x),
+        lambda x, y: (n - x, n - y),
+        lambda x, y: (y, n - x),
+        lambda x, y: (n - x, y),
+        lambda x, y: (x, n - y),
+        lambda x, y: (y, x),
+        lambda x, y: (n - y, n - x),
+    ]
+
+
+def _build_tables():
+    col_perms = []
+    for f in _d4_maps():
+        perm = [0] * 16
+        for y in range(SIZE):
+            for x in range(SIZE):
+                nx, ny = f(x, y)
+                perm[y * 4 + x] = ny * 4 + nx
+        col_perms.append(perm)
+    cell_perms = []
+    for perm in col_perms:
+        cell_perms.append([z * 16 + perm[c] for z in range(SIZE) for c in range(16)])
+    inverse = []
+    for perm in col_perms:
+        inv = [0] * 16
+        for c, d in enumerate(perm):
+            inv[d] = c
+        inverse.append(inv)
+    return col_perms, cell_perms, inverse
+
+
+COLUMN_PERMS, CELL_PERMS, COLUMN_INVERSE = _build_tables()
+
+
+def verify_symmetries():
+    """Каждая перестановка клеток должна переводить множество 76 линий в себя."""
+    lines = {frozenset(z * 16 + y * 4 + x for (x, y, z) in line) for line in ALL_LINES}
+    for perm in CELL_PERMS:
+        for line in lines:
+            if frozenset(perm[i] for i in line) not in lines:
+                return False
+    return True
+
+
+def board_cells(board):
+    """board[z][y][x] → плоский список из 64 значений (индекс z*16 + y*4 + x)."""
+    return [board[z][y][x] for z in range(SIZE) for y in range(SIZE) for x in range(SIZE)]
+
+
+def cells_code(cells, perm=None):
+    code = 0
+    if perm is None:
+        for i, v in enumerate(cells):
+            if v:
+                code |= v << (2 * i)
+    else:
+        for i, v in enumerate(cells):
+            if v:
+                code |= v << (2 * perm[i])
+    return code
+
+
+def canonical(board):
+    """(канонический code, индекс симметрии t, переводящей доску в канон)."""
+    cells = board_cells(board)
+    best_code, best_t = None, 0
+    for t, perm in enumerate(CELL_PERMS):
+        code = cells_code(cells, perm)
+        if best_code is None or code < best_code:
+            best_code, best_t = code, t
+    return best_code, best_t
+
+
+def stabilizer(board):
+    """Индексы симметрий, оставляющих доску неизменной (всегда содержит 0)."""
+    cells = board_cells(board)
+    base = cells_code(cells)
+    return [t for t, perm in enumerate(CELL_PERMS) if cells_code(cells, perm) == base]
+
+
+def book_key(code):
+    """64-битный ключ книги из 128-битного кода позиции."""
+    h = code & MASK64
+    h ^= ((code >> 64) * 0x9E3779B97F4A7C15) & MASK64
+    return h
+
+
+def move_to_canonical(move, t):
+    x, y = move
+    c = COLUMN_PERMS[t][y * 4 + x]
+    return (c % 4, c // 4)
+
+
+def move_from_canonical(move, t):
+    x, y = move
+    c = COLUMN_INVERSE[t][y * 4 + x]
+    return (c % 4, c // 4)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Турнир с очередью партий в SQLite: переживает перезагрузку и зависшие
+воркеры, воркеров можно запускать на нескольких машинах с общим диском.
+- init: круговой турнир ботов (каждая пара, каждый дебют, оба цвета) —
+  строки jobs со статусом pending. Повторный init с теми же параметрами
+  ничего не дублирует (уникальный ключ партии), новые боты/раунды дописываются.
+- work: воркер в цикле атомарно берёт партию (BEGIN IMMEDIATE), играет её
+  arena.play_game и записывает результат. Взятая партия получает аренду
+  (lease) по её лимиту времени; если воркер умер, после истечения аренды
+  партию забирает другой. После --max-attempts неудачных попыток — failed.
+- status: сколько партий в каждом статусе и таблица очков.
+- export: готовые партии в JSONL формата arena.game_record (для games.load_games).
+- work --results: партии сразу и в базу results_store.py (агрегаты по ботам).
+
+Пути ботов хранятся относительно каталога базы, если бот внутри него, —
+общий каталог может быть смонтирован на машинах по-разному.
+
+Пример:
+  python tournament.py init t.db --bot mainGPT5ninght.py --bot maineeWIN.py --bot main.py \\
+      --rounds 10 --per-move 3
+  python tournament.py work t.db --procs 4 --fork-server     # на каждой машине
+  python tournament.py status t.db
+  python tournament.py export t.db --out games.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sqlite3
+import sys
+import time
+import traceback
+from multiprocessing import Process, set_start_method
+
+import results_store
+from arena import P1, P2, close_fork_servers, game_record, play_game
+from selfplay import random_opening
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY,
+    black       TEXT NOT NULL,
+    white       TEXT NOT NULL,
+    opening_id  INTEGER NOT NULL,
+    opening     TEXT NOT NULL,
+    per_move    REAL NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    worker      TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    result      TEXT,
+    finished_at REAL,
+    UNIQUE (black, white, opening_id, per_move)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_until);
+CREATE TABLE IF NOT EXISTS openings (
+    id    INTEGER PRIMARY KEY,
+    moves TEXT NOT NULL
+);
+"""
+
+# аренда партии: худший случай 64 хода по per_move + запас на старт процессов
+LEASE_SLACK = 120.0
+
+
+def connect(db_path):
+    # журнал DELETE (не WAL): WAL не работает на сетевых файловых системах
+    conn = sqlite3.connect(db_path, timeout=60.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA busy_timeout=60000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _db_dir(db_path):
+    return os.path.dirname(os.path.abspath(db_path))
+
+
+def store_path(db_path, bot_path):
+    """Путь бота для базы: относительный, если бот лежит внутри каталога базы."""
+    bot_abs = os.path.abspath(bot_path)
+    rel = os.path.relpath(bot_abs, _db_dir(db_path))
+    return bot_abs if rel.startswith("..") else rel
+
+
+def resolve_path(db_path, stored):
+    return stored if os.path.isabs(stored) else os.path.join(_db_dir(db_path), stored)
+
+
+# ---------------- init ----------------
+
+def ensure_openings(conn, rounds, plies, seed):
+    """Дебюты 0..rounds-1: детерминированы seed, уже сохранённые не меняются."""
+    have = {oid for (oid,) in conn.execute("SELECT id FROM openings")}
+    for oid in range(rounds):
+        if oid in have:
+            continue
+        moves = random_opening(random.Random(seed * 1_000_003 + oid), plies)
+        conn.execute("INSERT INTO openings (id, moves) VALUES (?, ?)", (oid, json.dumps(moves)))
+    return {oid: moves for oid, moves in conn.execute("SELECT id, moves FROM openings WHERE id < ?", (rounds,))}
+
+
+def init_jobs(conn, db_path, bots, rounds, plies, per_move, seed):
+    """Круговой турнир: пара × дебют × цвет. Возвращает число новых партий."""
+    names = [store_path(db_path, b) for b in bots]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        openings = ensure_openings(conn, rounds, plies, seed)
+        before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        for oid in range(rounds):
+            for i, a in enumerate(names):
+                for b in names[i + 1:]:
+                    for black, white in ((a, b), (b, a)):
+                        conn.execute(
+                            "INSERT OR IGNORE INTO jobs (black, white, opening_id, opening, per_move) "
+                            "VALUES (?, ?, ?, ?, ?)", (black, white, oid, openings[oid], per_move))
+        after = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return after - before
+
+
+# ---------------- work ----------------
+
+def claim(conn, worker, max_attempts):
+    """
+    Атомарно взять партию: pending или running с истёкшей арендой.
+    BEGIN IMMEDIATE берёт блокировку записи сразу, поэтому два воркера
+    не получат одну и ту же строку. None — брать нечего.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # исчерпавшие попытки (воркер падал на них раз за разом) — в failed
+        conn.execute("UPDATE jobs SET status = 'failed' WHERE status = 'running' AND lease_until < ? "
+                     "AND attempts >= ?", (now, max_attempts))
+        row = conn.execute(
+            "SELECT id, black, white, opening, per_move FROM jobs "
+            "WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) "
+            "ORDER BY id LIMIT 1", (now,)).fetchone()
+        if row is not None:
+            lease = now + 64 * row[4] + LEASE_SLACK
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (worker, lease, row[0]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def finish(conn, job_id, worker, rec=None, error=None, max_attempts=3):
+    """
+    Записать итог, только если партия всё ещё за этим воркером (иначе её
+    перехватили по истёкшей аренде — засчитывается тот, кто взял последним).
+    Ошибка возвращает партию в pending, пока не кончатся попытки.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if rec is not None:
+            cur = conn.execute("UPDATE jobs SET status = 'done', result = ?, finished_at = ?, error = NULL "
+                               "WHERE id = ? AND worker = ? AND status = 'running'",
+                               (json.dumps(rec), time.time(), job_id, worker))
+        else:
+            cur = conn.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                               "error = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                               (max_attempts, error, job_id, worker))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return cur.rowcount == 1
+
+
+def play_job(db_path, row, fork_server=False, anytime=False):
+    job_id, black, white, opening, per_move = row
+    paths = (resolve_path(db_path, black), resolve_path(db_path, white))
+    moves = []
+    events = []
+    w, plies, reason, t1, t2, f1, f2 = play_game(paths[0], paths[1],
+                                                 first_player=1, per_move_sec=per_move, moves_out=moves,
+                                                 opening=[tuple(m) for m in json.loads(opening)],
+                                                 anytime=anytime, events_out=events, fork_server=fork_server)
+    rec = game_record(black, white, moves, w, reason, per_move, (t1, t2), (f1, f2))
+    rec["id"] = job_id
+    rec["opening"] = json.loads(opening)
+    # версии на момент игры: файл бота могут поменять, пока турнир идёт
+    rec["versions"] = [results_store.bot_version(p) for p in paths]
+    if anytime:
+        rec["best_so_far"] = [sum(1 for _n, pl, r in events if pl == side and r.startswith("timeout_best_so_far"))
+                              for side in (P1, P2)]
+    return rec
+
+
+def work(db_path, worker, max_attempts=3, fork_server=False, anytime=False, max_games=0, results="",
+         verbose=True):
+    """results — база results_store.py: каждая записанная партия сразу попадает и туда."""
+    conn = connect(db_path)
+    store = results_store.connect(results) if results else None
+    played = 0
+    try:
+        while not max_games or played < max_games:
+            row = claim(conn, worker, max_attempts)
+            if row is None:
+                break
+            try:
+                rec = play_job(db_path, row, fork_server, anytime)
+            except Exception as e:
+                finish(conn, row[0], worker, error=f"{e}\n{traceback.format_exc()}", max_attempts=max_attempts)
+                if verbose:
+                    print(f"[{worker}] партия {row[0]}: ошибка {e}")
+                continue
+            ok = finish(conn, row[0], worker, rec=rec)
+            played += 1
+            if ok and store is not None:
+                results_store.add_game(store, rec, f"tournament:{os.path.abspath(db_path)}:{row[0]}",
+                                       (resolve_path(db_path, row[1]), resolve_path(db_path, row[2])))
+            if verbose:
+                print(f"[{worker}] партия {row[0]}: {rec['black']} vs {rec['white']} → {rec['winner']} "
+                      f"({rec['plies']} ходов){'' if ok else ' — уже перехвачена, не записана'}")
+    finally:
+        close_fork_servers()
+        conn.close()
+        if store is not None:
+            store.close()
+    return played
+
+
+def _work_proc(db_path, worker, max_attempts, fork_server, anytime, max_games, results):
+    work(db_path, worker, max_attempts, fork_server, anytime, max_games, results)
+
+
+# ---------------- status / export ----------------
+
+def standings(conn):
+    """{бот: [очки, партии]} по готовым партиям (победа 1, ничья 0.5)."""
+    table = {}
+    for black, white, result in conn.execute("SELECT black, white, result FROM jobs WHERE status = 'done'"):
+        w = json.loads(result)["winner"]
+        for side, name in ((1, black), (2, white)):
+            row = table.setdefault(name, [0.0, 0])
+            row[0] += 0.5 if w == 0 else (1.0 if w == side else 0.0)
+            row[1] += 1
+    return table
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Турнир с очередью партий в SQLite")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    i = sub.add_parser("init", help="Создать/дополнить очередь партий")
+    i.add_argument("db")
+    i.add_argument("--bot", action="append", required=True, help="Путь к боту (не меньше двух)")
+    i.add_argument("--rounds", type=int, default=10, help="Дебютов (на каждый — обе раскраски каждой пары)")
+    i.add_argument("--opening-plies", type=int, default=4)
+    i.add_argument("--per-move", type=float, default=10.0)
+    i.add_argument("--seed", type=int, default=0)
+
+    w = sub.add_parser("work", help="Играть партии из очереди, пока они есть")
+    w.add_argument("db")
+    w.add_argument("--procs", type=int, default=1, help="Параллельных воркеров на этой машине")
+    w.add_argument("--worker", default="", help="Имя воркера (по умолчанию host:pid)")
+    w.add_argument("--max-attempts", type=int, default=3)
+    w.add_argument("--max-games", type=int, default=0, help="Остановиться после N партий (на воркер)")
+    w.add_argument("--fork-server", action="store_true", help="arena --fork-server")
+    w.add_argument("--anytime", action="store_true", help="arena --anytime")
+    w.add_argument("--results", default="", help="Сразу дописывать партии в базу results_store.py")
+
+    s = sub.add_parser("status", help="Статусы и таблица очков")
+    s.add_argument("db")
+
+    e = sub.add_parser("export", help="Готовые партии в JSONL")
+    e.add_argument("db")
+    e.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    if args.cmd == "init":
+        if len(args.bot) < 2:
+            ap.error("нужно хотя бы два --bot")
+        conn = connect(args.db)
+        n = init_jobs(conn, args.db, args.bot, args.rounds, args.opening_plies, args.per_move, args.seed)
+        total = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        print(f"добавлено {n} партий, всего {total}")
+        return 0
+
+    if args.cmd == "work":
+        base = args.worker or f"{socket.gethostname()}:{os.getpid()}"
+        if args.procs <= 1:
+            work(args.db, base, args.max_attempts, args.fork_server, args.anytime, args.max_games, args.results)
+            return 0
+        procs = [Process(target=_work_proc, args=(args.db, f"{base}/{k}", args.max_attempts, args.fork_server,
+                                                  args.anytime, args.max_games, args.results))
+                 for k in range(args.procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        return 0
+
+    conn = connect(args.db)
+    if args.cmd == "status":
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        print(", ".join(f"{k}: {counts.get(k, 0)}" for k in ("pending", "running", "done", "failed")))
+        for worker, job_id, lease in conn.execute(
+                "SELECT worker, id, lease_until FROM jobs WHERE status = 'running' ORDER BY id"):
+            left = lease - time.time()
+            print(f"  running {job_id} у {worker}: аренда {'истекла' if left < 0 else f'ещё {left:.0f} с'}")
+        rows = sorted(standings(conn).items(), key=lambda kv: -kv[1][0] / max(1, kv[1][1]))
+        for name, (pts, n) in rows:
+            print(f"  {name:30s} {pts:6.1f} / {n:4d}  ({pts / n:.3f})")
+        return 0
+
+    if args.cmd == "export":
+        n = 0
+        with open(args.out, "w", encoding="utf-8") as f:
+            for (result,) in conn.execute("SELECT result FROM jobs WHERE status = 'done' ORDER BY id"):
+                f.write(result + "\n")
+                n += 1
+        print(f"{n} партий → {args.out}")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Офлайн-обучение NNUE-подобной оценки main.py (NumPy; в бот идут только
+целые веса — секция NNUE_WEIGHTS).
+- Данные: positions.jsonl из selfplay.py (доска, сторона хода, оценка
+  поиска, исход) и/или партии (bb.txt, JSONL арены) — у них только исход.
+- Цель за игрока 1: lambda * sigmoid(оценка / score-scale) + (1 - lambda) * исход.
+- Каждая позиция размножается 8 симметриями подошвы (D4, как книга).
+- Сеть: 128 входов (клетка × игрок) → hidden, clipped ReLU [0, 1] → 1;
+  предсказание sigmoid(выход), ошибка — MSE (как в tune_eval), Adam.
+- Квантование под main.py: W1, b1 × NNUE_QA, w2, b2 × scale, т.е.
+  целочисленный выход бота ≈ scale × выход сети. Перед вшиванием ответ
+  бота (main.nnue_output) сверяется с квантованной сетью NumPy.
+
+Пример:
+  python train_nnue.py --positions data/positions.jsonl --hidden 32 --epochs 30 --embed main.py
+"""
+
+import argparse
+import base64
+import json
+import struct
+import sys
+import time
+
+import numpy as np
+
+import local_driver
+from arena import EMPTY, P1, replay_moves
+from codegen import replace_section, wrap_string
+from games import game_positions, load_games
+
+sys.modules.setdefault("framework", local_driver)
+
+import main as _main  # noqa: E402
+
+N_IN = 128
+
+
+# ---------------- данные ----------------
+
+def board_from_string(s):
+    """64 цифры (i = z*16+y*4+x) → доска [z][y][x]."""
+    return [[[int(s[z * 16 + y * 4 + x]) for x in range(4)] for y in range(4)] for z in range(4)]
+
+
+def load_positions(paths, score_scale, lam):
+    """selfplay positions.jsonl → (X (N,64) int8, цель за P1 (N,))."""
+    cells, target = [], []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                rec = json.loads(line)
+                sign = 1 if rec["player"] == P1 else -1
+                result = rec["result"] if sign == 1 else 1.0 - rec["result"]
+                prob = 1.0 / (1.0 + np.exp(-np.clip(sign * rec["score"] / score_scale, -60, 60)))
+                cells.append([int(c) for c in rec["board"]])
+                target.append(lam * prob + (1.0 - lam) * result)
+    return np.array(cells, dtype=np.int8).reshape(-1, 64), np.array(target, dtype=np.float64)
+
+
+def load_game_positions(paths, min_ply=4):
+    """Партии → позиции до каждого хода с исходом за P1 (без оценки поиска)."""
+    cells, target = [], []
+    for path in paths:
+        for rec in load_games(path):
+            winner = rec.get("winner", EMPTY)
+            result = 0.5 if winner == EMPTY else (1.0 if winner == P1 else 0.0)
+            for ply, prefix, _player, _mv in game_positions(rec):
+                if ply < min_ply:
+                    continue
+                board, _p, w = replay_moves(prefix)
+                if w != EMPTY:
+                    break
+                cells.append([board[z][y][x] for z in range(4) for y in range(4) for x in range(4)])
+                target.append(result)
+    return np.array(cells, dtype=np.int8).reshape(-1, 64), np.array(target, dtype=np.float64)
+
+
+def augment(X, t):
+    """8 симметрий подошвы: клетка z*16+c → z*16+perm[c]."""
+    out = []
+    for perm in _main._COL_PERMS:
+        idx = np.empty(64, dtype=np.intp)
+        for i in range(64):
+            idx[(i // 16) * 16 + perm[i % 16]] = i
+        out.append(X[:, idx])
+    return np.concatenate(out), np.tile(t, len(out))
+
+
+def one_hot(X):
+    """(N,64) 0/1/2 → (N,128) float: признак 2*i + (игрок - 1)."""
+    F = np.zeros((len(X), N_IN), dtype=np.float32)
+    rows, cols = np.nonzero(X)
+    F[rows, 2 * cols + X[rows, cols] - 1] = 1.0
+    return F
+
+
+# ---------------- сеть ----------------
+
+def init_net(hidden, rng):
+    return {
+        "W1": rng.normal(0.0, 0.25, (N_IN, hidden)),
+        "b1": np.full(hidden, 0.5),
+        "w2": rng.normal(0.0, 0.1, hidden),
+        "b2": np.zeros(1),
+    }
+
+
+def forward(net, F):
+    a = F @ net["W1"] + net["b1"]
+    h = np.clip(a, 0.0, 1.0)
+    return a, h, h @ net["w2"] + net["b2"][0]
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -60, 60)))
+
+
+def mse(net, F, t):
+    return float(np.mean((_sigmoid(forward(net, F)[2]) - t) ** 2)) if len(t) else 0.0
+
+
+def train(net, F, t, epochs, batch, lr, rng, F_hold=None, t_hold=None, verbose=True):
+    """Adam по мини-батчам."""
+    m = {k: np.zeros_like(v) for k, v in net.items()}
+    v = {k: np.zeros_like(v) for k, v in net.items()}
+    b1_, b2_, eps = 0.9, 0.999, 1e-8
+    step = 0
+    for ep in range(epochs):
+        order = rng.permutation(len(t))
+        for s in range(0, len(t), batch):
+            idx = order[s:s + batch]
+            Fb, tb = F[idx], t[idx]
+            a, h, out = forward(net, Fb)
+            p = _sigmoid(out)
+            g_out = 2.0 * (p - tb) * p * (1.0 - p) / len(tb)
+            g_h = np.outer(g_out, net["w2"]) * ((a > 0.0) & (a < 1.0))
+            grads = {
+                "w2": h.T @ g_out,
+                "b2": np.array([g_out.sum()]),
+                "W1": Fb.T @ g_h,
+                "b1": g_h.sum(axis=0),
+            }
+            step += 1
+            for k, g in grads.items():
+                m[k] = b1_ * m[k] + (1 - b1_) * g
+                v[k] = b2_ * v[k] + (1 - b2_) * g * g
+                net[k] -= lr * (m[k] / (1 - b1_ ** step)) / (np.sqrt(v[k] / (1 - b2_ ** step)) + eps)
+        if verbose:
+            hold = f" контроль={mse(net, F_hold, t_hold):.5f}" if F_hold is not None and len(t_hold) else ""
+            print(f"  эпоха {ep + 1}: loss={mse(net, F, t):.5f}{hold}")
+    return net
+
+
+# ---------------- квантование и формат main.py ----------------
+
+def quantize(net, scale):
+    """Целые веса: аккумулятор в единицах 1/NNUE_QA, выход ≈ scale × выход сети."""
+    qa = _main.NNUE_QA
+    q = {
+        "W1": np.round(net["W1"] * qa),
+        "b1": np.round(net["b1"] * qa),
+        "w2": np.round(net["w2"] * scale),
+        "b2": np.round(net["b2"] * scale),
+    }
+    clipped = sum(int((np.abs(q[k]) > 32767).sum()) for k in ("W1", "b1", "w2"))
+    if clipped:
+        print(f"  внимание: {clipped} весов обрезано до int16")
+    for k in ("W1", "b1", "w2"):
+        q[k] = np.clip(q[k], -32768, 32767)
+    return {k: val.astype(np.int64) for k, val in q.items()}
+
+
+def q_output(q, X):
+    """Квантованная сеть на NumPy — то же, что main.nnue_output (за P1)."""
+    qa = _main.NNUE_QA
+    acc = one_hot(X).astype(np.int64) @ q["W1"] + q["b1"]
+    s = (q["b2"][0] * qa + np.clip(acc, 0, qa) @ q["w2"]) // qa
+    return np.clip(s, -_main.NNUE_CLAMP, _main.NNUE_CLAMP)
+
+
+def encode(q):
+    hidden = len(q["b1"])
+    vals = [int(v) for v in q["W1"].reshape(-1)] + [int(v) for v in q["b1"]] + [int(v) for v in q["w2"]]
+    blob = struct.pack("<HH", N_IN, hidden) + struct.pack(f"<{len(vals)}h", *vals) + struct.pack("<i", int(q["b2"][0]))
+    return base64.b64encode(blob).decode("ascii")
+
+
+def verify(text, q, X, n=500):
+    """Бот (чистый Python, инкрементальный аккумулятор) против NumPy на n позициях."""
+    net = _main._decode_nnue(text)
+    ref = q_output(q, X[:n])
+    bad = 0
+    for i in range(min(n, len(X))):
+        acc = list(net[1])
+        for c in range(64):
+            p = int(X[i, c])
+            if p:
+                acc = _main.nnue_push(acc, c % 4, (c // 4) % 4, c // 16, p, net)
+        if _main.nnue_output(acc, net) != int(ref[i]):
+            bad += 1
+    return bad
+
+
+def embed(path, text):
+    replace_section(path, "NNUE_WEIGHTS", wrap_string("_NNUE_B64", text), tool="train_nnue.py")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Обучение NNUE-оценки для main.py")
+    ap.add_argument("--positions", action="append", default=[], help="positions.jsonl из selfplay.py")
+    ap.add_argument("--games", action="append", default=[], help="bb.txt или JSONL партий (только исход)")
+    ap.add_argument("--lambda", dest="lam", type=float, default=0.5, help="Вес оценки поиска в цели (0..1)")
+    ap.add_argument("--score-scale", type=float, default=400.0, help="sigmoid(оценка / score-scale) для цели")
+    ap.add_argument("--hidden", type=int, default=32)
+    ap.add_argument("--epochs", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=256)
+    ap.add_argument("--lr", type=float, default=2e-3)
+    ap.add_argument("--scale", type=float, default=400.0, help="Целый выход бота = scale × выход сети")
+    ap.add_argument("--holdout", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="Сохранить base64 и метаданные в JSON")
+    ap.add_argument("--embed", action="append", default=[], help="Вшить веса в файл бота (секция NNUE_WEIGHTS)")
+    args = ap.parse_args()
+
+    parts = []
+    if args.positions:
+        parts.append(load_positions(args.positions, args.score_scale, args.lam))
+    if args.games:
+        parts.append(load_game_positions(args.games))
+    if not parts or not sum(len(t) for _X, t in parts):
+        print("Нет позиций")
+        return 1
+    X = np.concatenate([p[0] for p in parts])
+    t = np.concatenate([p[1] for p in parts])
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(t))
+    n_hold = int(len(t) * args.holdout)
+    hold, tr = order[:n_hold], order[n_hold:]
+    X_tr, t_tr = augment(X[tr], t[tr])
+    F_tr, F_hold = one_hot(X_tr), one_hot(X[hold])
+    print(f"{len(tr)} позиций ×8 симметрий = {len(t_tr)}, контроль {n_hold}; hidden={args.hidden}")
+
+    t0 = time.perf_counter()
+    net = train(init_net(args.hidden, rng), F_tr, t_tr, args.epochs, args.batch, args.lr, rng, F_hold, t[hold])
+    print(f"  обучение {time.perf_counter() - t0:.1f} с")
+
+    q = quantize(net, args.scale)
+    text = encode(q)
+    X_chk = X[hold] if n_hold else X
+    t_chk = t[hold] if n_hold else t
+    q_loss = float(np.mean((_sigmoid(q_output(q, X_chk) / args.scale) - t_chk) ** 2))
+    print(f"  квантованная: loss={q_loss:.5f} (float {mse(net, one_hot(X_chk), t_chk):.5f}), "
+          f"{len(text) * 3 // 4} байт")
+    bad = verify(text, q, X_chk)
+    print(f"  сверка с main.nnue_output: {'OK' if not bad else f'РАСХОЖДЕНИЙ {bad}'}")
+    if bad:
+        return 1
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"hidden": args.hidden, "scale": args.scale, "loss": q_loss, "positions": len(t),
+                       "nnue_b64": text}, f, indent=1)
+    for path in args.embed:
+        embed(path, text)
+        print(f"Вшито в {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
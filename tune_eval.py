@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Texel-подбор весов eval_board (main.py / mainGPT5ninght.py) по исходам партий.
+- Позиции берутся из логов сервера (bb.txt) и JSONL арены/selfplay
+  (games.load_games); метка — исход партии для стороны хода (1 / 0.5 / 0).
+  Позиции, где у кого-то есть мгновенная победа, пропускаются (не «тихие»).
+- Оценка без побед линейна: w · f, где f — разности «моих» и «чужих»
+  открытых линий с 1/2/3 камнями, центра и высоты (как в eval_board).
+- Предсказание исхода: sigmoid(score / K). K подбирается под текущие веса,
+  затем веса минимизируют среднеквадратичную ошибку: координатный спуск
+  по целым шагам (--method cd, классический Texel) или градиентный (--method gd).
+- --embed main.py --embed mainGPT5ninght.py переписывает секцию EVAL_WEIGHTS,
+  которую читает eval_board.
+
+Пример:
+  python tune_eval.py --source bb.txt --source games.jsonl --holdout 0.2
+  python tune_eval.py --source bb.txt --init mainGPT5ninght.py --embed mainGPT5ninght.py
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+
+import bitboard
+import local_driver
+from arena import P1, P2, replay_moves
+from codegen import replace_section
+from games import load_games
+
+sys.modules.setdefault("framework", local_driver)
+
+import mainGPT5ninght  # noqa: E402
+
+FEATURES = ("line1", "line2", "line3", "center", "height")
+
+
+# ---------------- признаки ----------------
+
+def features(board, me):
+    """f такие, что eval_board(board, me) == w · f (если на доске нет победы)."""
+    f = [0, 0, 0, 0, 0]
+    for z in range(4):
+        for y in range(4):
+            for x in range(4):
+                p = board[z][y][x]
+                if p == 0:
+                    continue
+                sign = 1 if p == me else -1
+                f[3] += sign * (3 - int(abs(x - 1.5) + abs(y - 1.5)))
+                f[4] += sign * z
+    for line in mainGPT5ninght.LINES:
+        mine = theirs = 0
+        for (x, y, z) in line:
+            v = board[z][y][x]
+            if v == me:
+                mine += 1
+            elif v != 0:
+                theirs += 1
+        if mine and not theirs and mine < 4:
+            f[mine - 1] += 1
+        elif theirs and not mine and theirs < 4:
+            f[theirs - 1] -= 1
+    return f
+
+
+def load_dataset(sources, min_ply=4):
+    """[(f, y)]: признаки позиции со стороны хода и исход для неё."""
+    data = []
+    for path in sources:
+        for rec in load_games(path):
+            winner = rec.get("winner", 0)
+            moves = [tuple(m) for m in rec["moves"]]
+            for ply in range(min_ply, len(moves)):
+                board, player, w = replay_moves(moves[:ply])
+                if w:
+                    break
+                pos = bitboard.Position.from_board(board, player)
+                if pos.winning_columns(P1) or pos.winning_columns(P2):
+                    continue
+                y = 0.5 if winner not in (P1, P2) else (1.0 if winner == player else 0.0)
+                data.append((features(board, player), y))
+    return data
+
+
+# ---------------- модель ----------------
+
+def _sigmoid(s, k):
+    t = s / k
+    if t < -60:
+        return 0.0
+    if t > 60:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-t))
+
+
+def loss(data, w, k):
+    err = 0.0
+    for f, y in data:
+        s = f[0] * w[0] + f[1] * w[1] + f[2] * w[2] + f[3] * w[3] + f[4] * w[4]
+        err += (y - _sigmoid(s, k)) ** 2
+    return err / len(data) if data else 0.0
+
+
+def fit_k(data, w, lo=10.0, hi=5000.0, iters=60):
+    """Масштаб сигмоиды под текущие веса (золотое сечение по log K)."""
+    a, b = math.log(lo), math.log(hi)
+    g = (math.sqrt(5) - 1) / 2
+    c, d = b - g * (b - a), a + g * (b - a)
+    fc, fd = loss(data, w, math.exp(c)), loss(data, w, math.exp(d))
+    for _ in range(iters):
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - g * (b - a)
+            fc = loss(data, w, math.exp(c))
+        else:
+            a, c, fc = c, d, fd
+            d = a + g * (b - a)
+            fd = loss(data, w, math.exp(d))
+    return math.exp((a + b) / 2)
+
+
+def tune_cd(data, w, k, steps=(16, 4, 1), max_rounds=50, verbose=False):
+    """Координатный спуск по целым шагам (Texel): ±step, пока ошибка падает."""
+    w = list(w)
+    best = loss(data, w, k)
+    for step in steps:
+        for rnd in range(max_rounds):
+            improved = False
+            for i in range(len(w)):
+                for delta in (step, -step):
+                    cand = list(w)
+                    cand[i] = max(0, cand[i] + delta)
+                    if cand[i] == w[i]:
+                        continue
+                    e = loss(data, cand, k)
+                    if e < best:
+                        best, w, improved = e, cand, True
+                        break
+            if verbose:
+                print(f"  step {step} round {rnd + 1}: loss={best:.6f} w={w}")
+            if not improved:
+                break
+    return w, best
+
+
+def tune_gd(data, w, k, lr=2000.0, iters=500, verbose=False):
+    """Полный градиентный спуск по MSE; веса округляются до целых в конце."""
+    w = [float(v) for v in w]
+    n = len(data)
+    for it in range(iters):
+        grad = [0.0] * len(w)
+        for f, y in data:
+            s = sum(fi * wi for fi, wi in zip(f, w))
+            p = _sigmoid(s, k)
+            g = -2.0 * (y - p) * p * (1.0 - p) / k / n
+            for i, fi in enumerate(f):
+                grad[i] += g * fi
+        w = [max(0.0, wi - lr * gi) for wi, gi in zip(w, grad)]
+        if verbose and (it + 1) % 50 == 0:
+            print(f"  iter {it + 1}: loss={loss(data, w, k):.6f} w={[round(v, 1) for v in w]}")
+    w = [int(round(v)) for v in w]
+    return w, loss(data, w, k)
+
+
+def read_weights(bot_path):
+    """Текущая EVAL_WEIGHTS из файла бота (без импорта)."""
+    with open(bot_path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("EVAL_WEIGHTS = "):
+                return list(json.loads(line.split("=", 1)[1].strip().replace("(", "[").replace(")", "]")))
+    raise ValueError(f"{bot_path}: EVAL_WEIGHTS not found")
+
+
+def embed(path, w):
+    replace_section(path, "EVAL_WEIGHTS", f"EVAL_WEIGHTS = ({', '.join(str(int(v)) for v in w)})\n",
+                    tool="tune_eval.py")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Texel-подбор весов eval_board")
+    ap.add_argument("--source", action="append", default=[], help="bb.txt-лог или JSONL партий (можно несколько)")
+    ap.add_argument("--init", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "mainGPT5ninght.py"),
+                    help="Бот, чьи EVAL_WEIGHTS берутся стартовыми")
+    ap.add_argument("--method", choices=("cd", "gd"), default="cd")
+    ap.add_argument("--min-ply", type=int, default=4, help="Пропустить дебютные позиции")
+    ap.add_argument("--holdout", type=float, default=0.0, help="Доля позиций для контроля переобучения")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="Сохранить результат в JSON")
+    ap.add_argument("--embed", action="append", default=[], help="Вшить веса в файл бота (секция EVAL_WEIGHTS)")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    data = load_dataset(args.source or ["bb.txt"], args.min_ply)
+    if not data:
+        print("Нет позиций")
+        return 1
+    random.Random(args.seed).shuffle(data)
+    n_hold = int(len(data) * args.holdout)
+    hold, train = data[:n_hold], data[n_hold:]
+
+    w0 = read_weights(args.init)
+    k = fit_k(train, w0)
+    print(f"{len(train)} позиций (+{len(hold)} контроль), K={k:.1f}")
+    print(f"  старт {dict(zip(FEATURES, w0))}: loss={loss(train, w0, k):.6f}"
+          + (f" контроль={loss(hold, w0, k):.6f}" if hold else ""))
+
+    if args.method == "cd":
+        w, e = tune_cd(train, w0, k, verbose=args.verbose)
+    else:
+        w, e = tune_gd(train, w0, k, verbose=args.verbose)
+    print(f"  итог  {dict(zip(FEATURES, w))}: loss={e:.6f}"
+          + (f" контроль={loss(hold, w, k):.6f}" if hold else ""))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"features": FEATURES, "weights": w, "k": k, "loss": e,
+                       "positions": len(train), "sources": args.source}, f, indent=1)
+    for path in args.embed:
+        embed(path, w)
+        print(f"Вшито в {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Подбор параметров сокращений/продлений (SEARCH_PARAMS mainGPT5ninght) на арене.
+- Каждый вариант — переопределения ключей SEARCH_PARAMS; под него пишется
+  обёртка-бот (подкласс MyAI с search_params), чтобы арена грузила её как
+  обычный файл бота в отдельном процессе на ход.
+- Вариант играет против базовых параметров пары партий из одинаковых
+  случайных дебютов со сменой цвета; печатается очко, ±1σ и оценка Elo.
+
+Пример:
+  python tune_search.py --variant "no_ext:threat_ext=0,singular_ext=0" \\
+      --variant "lmr_soft:lmr_div=3.0" --pairs 10 --cpu 0.5
+  python tune_search.py --list
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+
+from arena import EMPTY, P1, P2, close_fork_servers, game_record, play_game, replay_moves
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ENGINE = os.path.join(HERE, "mainGPT5ninght.py")
+
+_WRAPPER = '''# автогенерировано tune_search.py — не править
+import sys
+sys.path.insert(0, {engine_dir!r})
+import {module} as _engine
+
+
+class MyAI(_engine.MyAI):
+    def __init__(self):
+        super().__init__(cpu_limit={cpu!r}, search_params={params!r})
+'''
+
+
+def parse_variant(text):
+    """'name:key=val,key=val' → (name, {key: число})."""
+    name, _, body = text.partition(":")
+    params = {}
+    for item in filter(None, (p.strip() for p in body.split(","))):
+        k, _, v = item.partition("=")
+        params[k.strip()] = float(v) if "." in v or "e" in v.lower() else int(v)
+    return name.strip(), params
+
+
+def write_wrapper(out_dir, name, engine_path, params, cpu):
+    path = os.path.join(out_dir, f"tune_{name}.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(_WRAPPER.format(
+            engine_dir=os.path.dirname(os.path.abspath(engine_path)),
+            module=os.path.splitext(os.path.basename(engine_path))[0],
+            cpu=cpu, params=params,
+        ))
+    return path
+
+
+def random_opening(rng, plies):
+    moves = []
+    for _ in range(plies):
+        board, _p, w = replay_moves(moves)
+        legal = [(x, y) for y in range(4) for x in range(4) if board[3][y][x] == EMPTY]
+        if w != EMPTY or not legal:
+            break
+        moves.append(rng.choice(legal))
+    return moves
+
+
+def elo(score):
+    if score <= 0.0:
+        return -float("inf")
+    if score >= 1.0:
+        return float("inf")
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def run_match(var_path, base_path, pairs, opening_plies, seed, per_move, record=None, verbose=False, anytime=False,
+              fork_server=False):
+    """Очки варианта (win=1, draw=0.5) по 2*pairs партиям."""
+    rng = random.Random(seed)
+    results = []
+    for i in range(pairs):
+        opening = random_opening(rng, opening_plies)
+        for var_color in (P1, P2):
+            black, white = (var_path, base_path) if var_color == P1 else (base_path, var_path)
+            moves = []
+            w, plies, reason, t1, t2, f1, f2 = play_game(black, white, first_player=1, per_move_sec=per_move,
+                                                         moves_out=moves, opening=opening, anytime=anytime,
+                                                         fork_server=fork_server)
+            pts = 0.5 if w == 0 else (1.0 if w == var_color else 0.0)
+            results.append(pts)
+            if record is not None:
+                record.write(json.dumps(game_record(os.path.basename(black), os.path.basename(white), moves,
+                                                    w, reason, per_move, (t1, t2), (f1, f2))) + "\n")
+            if verbose:
+                print(f"  пара {i + 1} {'чёрными' if var_color == P1 else 'белыми'}: {pts} ({plies} ходов, {reason})")
+    return results
+
+
+def main():
+    import mainGPT5ninght
+
+    ap = argparse.ArgumentParser(description="Подбор SEARCH_PARAMS на арене")
+    ap.add_argument("--variant", action="append", default=[], help='"имя:ключ=значение,..." (можно несколько)')
+    ap.add_argument("--base", default="", help='Переопределения для базового бота ("ключ=значение,...")')
+    ap.add_argument("--engine", default=DEFAULT_ENGINE)
+    ap.add_argument("--pairs", type=int, default=10, help="Пар партий (цвета меняются) на вариант")
+    ap.add_argument("--opening-plies", type=int, default=4, help="Случайных ходов дебюта")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--cpu", type=float, default=1.0, help="CPU-лимит бота на ход (cpu_limit)")
+    ap.add_argument("--per-move", type=float, default=10.0, help="Таймаут арены на ход, с")
+    ap.add_argument("--record", default="", help="Дописать партии в JSONL")
+    ap.add_argument("--anytime", action="store_true", help="По таймауту арены играть best-so-far бота (arena --anytime)")
+    ap.add_argument("--fork-server", action="store_true", help="Ходы через fork шаблонного процесса (arena --fork-server)")
+    ap.add_argument("--list", action="store_true", help="Показать SEARCH_PARAMS и выйти")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    if args.list:
+        for k, v in mainGPT5ninght.SEARCH_PARAMS.items():
+            print(f"{k} = {v}")
+        return 0
+    if not args.variant:
+        ap.error("нужен хотя бы один --variant")
+
+    variants = [parse_variant(v) for v in args.variant]
+    _n, base_params = parse_variant("base:" + args.base)
+    for name, params in variants + [("base", base_params)]:
+        unknown = set(params) - set(mainGPT5ninght.SEARCH_PARAMS)
+        if unknown:
+            ap.error(f"{name}: неизвестные параметры {sorted(unknown)}")
+
+    out_dir = tempfile.mkdtemp(prefix="tune_search_")
+    base_path = write_wrapper(out_dir, "base", args.engine, base_params, args.cpu)
+    record = open(args.record, "a", encoding="utf-8") if args.record else None
+    try:
+        for name, params in variants:
+            var_path = write_wrapper(out_dir, name, args.engine, params, args.cpu)
+            print(f"{name} {params} vs base {base_params}: {args.pairs} пар")
+            res = run_match(var_path, base_path, args.pairs, args.opening_plies, args.seed,
+                            args.per_move, record, args.verbose, args.anytime, args.fork_server)
+            n = len(res)
+            score = sum(res) / n
+            sd = math.sqrt(sum((r - score) ** 2 for r in res) / n / n) if n > 1 else 0.0
+            print(f"  {sum(res)}/{n} = {score:.3f} ± {sd:.3f}  Elo {elo(score):+.0f} "
+                  f"[{elo(max(0.0, score - 2 * sd)):+.0f}, {elo(min(1.0, score + 2 * sd)):+.0f}]")
+    finally:
+        close_fork_servers()
+        if record is not None:
+            record.close()
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        from multiprocessing import set_start_method
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+    sys.exit(main())